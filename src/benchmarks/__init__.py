@@ -0,0 +1,43 @@
+"""
+Benchmarks for the credit risk service, run from ``src`` with ``python -m benchmarks.<name>``.
+
+Benchmarks that need the database run against a throwaway test database created with the
+configured settings, so they never touch real data.
+"""
+import os
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "creditAPI.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Create the test database for the duration of the block"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(function, repeat=5):
+    """Best wall time of ``repeat`` calls, in seconds"""
+    import time
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,62 @@
+"""
+Compare NeighbourImputer with the notebook's KNNImputer.
+
+Reports the imputation error on held-out rows, the per-row transform latency and the pickled size
+of each fitted imputer. Uses the numerical columns of credit_data.csv when a path is given and a
+correlated synthetic matrix otherwise.
+
+    python -m benchmarks.imputation [--data research/data/credit_data.csv]
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+from sklearn.impute import KNNImputer, SimpleImputer
+
+from calculate.scoring.features import NUMERICAL_FEATURES
+from calculate.scoring.imputation import NeighbourImputer, masked_rmse
+
+
+def load_matrix(path, rows):
+    if path:
+        from calculate.scoring.cleaning import load_training_data
+
+        columns = list(NUMERICAL_FEATURES.values())
+        frame = load_training_data(path, usecols=columns, drop_incomplete=True)
+        return frame[columns].to_numpy()[:rows]
+    rng = np.random.default_rng(1)
+    latent = rng.normal(size=(rows, 3))
+    return latent @ rng.normal(size=(3, len(NUMERICAL_FEATURES))) + 0.3 * rng.normal(size=(rows, len(NUMERICAL_FEATURES)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", help="Path to credit_data.csv")
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    X = load_matrix(args.data, args.rows)
+    # Standardise so the error is comparable across columns
+    X = (X - X.mean(axis=0)) / X.std(axis=0)
+    single = X[:1].copy()
+    single[0, 0] = np.nan
+
+    print(f"{'imputer':<20}{'rmse':>10}{'row latency':>16}{'pickle size':>16}")
+    for name, imputer in [
+        ("KNNImputer", KNNImputer(n_neighbors=2)),
+        ("NeighbourImputer", NeighbourImputer(n_neighbors=2)),
+        ("SimpleImputer mean", SimpleImputer()),
+    ]:
+        error = masked_rmse(imputer, X)
+        imputer.fit(X)
+        start = time.perf_counter()
+        for _ in range(100):
+            imputer.transform(single)
+        latency = (time.perf_counter() - start) / 100
+        size = len(pickle.dumps(imputer))
+        print(f"{name:<20}{error:>10.3f}{latency * 1000:>13.3f} ms{size / 1024:>13.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
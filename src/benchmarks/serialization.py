@@ -0,0 +1,55 @@
+"""
+Compare the ModelSerializer list path with the fast read path.
+
+Both render the same rows to bytes, the benchmark fails if the outputs differ.
+
+    python -m benchmarks.serialization [--rows 10000]
+"""
+import argparse
+
+from benchmarks import setup_django, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from calculate.api.rendering import render_rows
+    from calculate.api.serializers import CreditParametersSerializer
+    from calculate.models import CreditParameters
+    from calculate.tests.factories import CreditParametersFactory
+    from users.models import User
+
+    with test_database():
+        users = User.objects.bulk_create(
+            User(email=f"bench{n}@example.com", first_name="Bench", last_name="User", password="!")
+            for n in range(args.rows)
+        )
+        CreditParameters.objects.bulk_create(
+            CreditParametersFactory.build(user=user, payment_behaviour="low_spend_small_value_payments")
+            for user in users
+        )
+        queryset = CreditParameters.objects.all()
+
+        def serializer_path():
+            return JSONRenderer().render(CreditParametersSerializer(queryset.all(), many=True).data)
+
+        def fast_path():
+            return render_rows(queryset.all(), CreditParametersSerializer)
+
+        if serializer_path() != fast_path():
+            raise SystemExit("Fast path output differs from the serializer output")
+
+        slow, fast = timed(serializer_path), timed(fast_path)
+        print(f"rows: {args.rows}")
+        print(f"ModelSerializer + JSONRenderer: {slow * 1000:9.1f} ms")
+        print(f"fast read path:                 {fast * 1000:9.1f} ms")
+        print(f"speedup:                        {slow / fast:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Measure process startup and first-score latency.
+
+Each measurement runs in a fresh interpreter, so import and model load costs are not hidden by
+earlier runs:
+
+- import: django.setup() and loading the URLconf, and which heavy libraries that pulled in
+- cold score: the first score in a process that was not warmed, as a first request would see it
+- warm: loader.warm(), as run by CalculateConfig.ready under gunicorn preload
+- warm score: a score after warming
+
+    python -m benchmarks.startup [--repeat 3]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+PROBE = """
+import json, os, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "creditAPI.settings")
+start = time.perf_counter()
+import django
+django.setup()
+import creditAPI.urls
+imported = time.perf_counter() - start
+heavy = sorted(name for name in ("numpy", "pandas", "scipy", "sklearn") if name in sys.modules)
+
+from calculate.scoring import loader
+
+def score():
+    start = time.perf_counter()
+    loader.score_records(loader.load_model(), [loader.WARMUP_RECORD])
+    return time.perf_counter() - start
+
+result = {"import": imported, "heavy": heavy}
+if sys.argv[1] == "cold":
+    result["cold score"] = score()
+else:
+    start = time.perf_counter()
+    loader.warm()
+    result["warm"] = time.perf_counter() - start
+    result["warm score"] = score()
+print(json.dumps(result))
+"""
+
+
+def probe(mode):
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE, mode], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [probe(mode) for _ in range(args.repeat) for mode in ("cold", "warm")]
+    print(f"heavy modules imported at startup: {', '.join(runs[0]['heavy']) or 'none'}")
+    for name in ("import", "cold score", "warm", "warm score"):
+        best = min(run[name] for run in runs if name in run)
+        print(f"{name + ':':<12} {best * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
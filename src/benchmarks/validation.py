@@ -0,0 +1,49 @@
+"""
+Compare validating records one CreditParametersSerializer at a time with the batch validator.
+
+Both validate the same records, the benchmark fails if they disagree on which records are valid.
+
+    python -m benchmarks.validation [--rows 10000]
+"""
+import argparse
+import logging
+
+from benchmarks import setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from calculate.api.serializers import CreditParametersSerializer
+    from calculate.api.validation import compile_validator
+    from calculate.scoring.loader import WARMUP_RECORD
+
+    # The serializer logs every record, which would dominate its timing
+    logging.disable(logging.CRITICAL)
+    rows = [
+        {**WARMUP_RECORD, "age": "thirty"} if n % 10 == 0 else {**WARMUP_RECORD, "annual_income": str(n)}
+        for n in range(args.rows)
+    ]
+
+    def serializer_path():
+        return [CreditParametersSerializer(data=row).is_valid() for row in rows]
+
+    def batch_path():
+        _, errors = compile_validator(CreditParametersSerializer).validate(rows)
+        return [index not in errors for index in range(len(rows))]
+
+    if serializer_path() != batch_path():
+        raise SystemExit("Batch validator disagrees with the serializer")
+
+    slow, fast = timed(serializer_path, repeat=3), timed(batch_path, repeat=3)
+    print(f"rows: {args.rows}")
+    print(f"CreditParametersSerializer per record: {slow * 1000:9.1f} ms")
+    print(f"batch validator:                       {fast * 1000:9.1f} ms")
+    print(f"speedup:                               {slow / fast:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
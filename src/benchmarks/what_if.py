@@ -0,0 +1,52 @@
+"""
+Compare scoring a what-if grid one scenario at a time with scoring the whole grid in one call.
+
+The per-scenario path is timed on a sample of the grid and extrapolated. Both must agree on the
+scores of the sampled points.
+
+    python -m benchmarks.what_if [--size 100]
+"""
+import argparse
+import logging
+
+from benchmarks import setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100, help="values per axis, the grid has size**2 points")
+    parser.add_argument("--sample", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    import numpy as np
+
+    from calculate.scoring.loader import WARMUP_RECORD, load_model, score_records
+    from calculate.scoring.scenarios import grid_points, score_grid
+
+    # score_records logs every call, which would dominate the per-scenario timing
+    logging.disable(logging.CRITICAL)
+    model = load_model()
+    axes = [
+        ("credit_utilization_ratio", np.linspace(0, 100, args.size).round(2).tolist()),
+        ("number_of_delayed_payment", list(range(args.size))),
+    ]
+    points = grid_points(axes)
+    sample = np.random.default_rng(0).choice(len(points), size=min(args.sample, len(points)), replace=False)
+    records = [{**WARMUP_RECORD, **{field: value for (field, _), value in zip(axes, points[i])}} for i in sample]
+
+    grid, _, _ = score_grid(model, WARMUP_RECORD, axes)
+    single = [score_records(model, [record])[0][0] for record in records]
+    if list(grid.ravel()[sample]) != single:
+        raise SystemExit("Grid scores disagree with scoring each scenario")
+
+    slow = timed(lambda: [score_records(model, [record]) for record in records], repeat=1) * len(points) / len(sample)
+    fast = timed(lambda: score_grid(model, WARMUP_RECORD, axes), repeat=5)
+    print(f"grid points: {len(points)}")
+    print(f"one score_records call per scenario (extrapolated): {slow * 1000:9.1f} ms")
+    print(f"score_grid:                                         {fast * 1000:9.1f} ms")
+    print(f"speedup:                                            {slow / fast:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Admission control for expensive endpoints.
+
+A limiter lets a fixed number of requests run at once and parks a bounded number of others in a
+FIFO queue. Requests that find the queue full, or that wait longer than the queue timeout, are
+shed with a 503 and a Retry-After header straight away instead of piling up behind slow work.
+Limits are per process, like the counters in helpers.metrics.
+"""
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The service is busy, retry later."
+    default_code = "service_overloaded"
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns ``wait`` into a Retry-After header
+        self.wait = wait
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO wait queue.
+
+    A finishing request hands its slot directly to the oldest waiter, so waiters are admitted in
+    arrival order and a newcomer can never overtake the queue.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout, retry_after=1):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.metrics = counters(f"admission.{name}")
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queue = deque()
+
+    def _shed(self, reason):
+        self.metrics.incr("shed")
+        self.metrics.incr(f"shed_{reason}")
+        logger.warning(f"Shedding {self.name} request: {reason.replace('_', ' ')}")
+        raise ServiceOverloaded(self.retry_after)
+
+    def acquire(self):
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queue:
+                self._active += 1
+                self.metrics.incr("admitted")
+                return
+            if len(self._queue) >= self.max_queue:
+                self._shed("queue_full")
+            waiter = threading.Event()
+            self._queue.append(waiter)
+            self.metrics.incr("queued")
+
+        if not waiter.wait(self.queue_timeout):
+            with self._lock:
+                # The slot may have been handed over between the timeout and taking the lock
+                if not waiter.is_set():
+                    self._queue.remove(waiter)
+                    self._shed("timeout")
+        self.metrics.incr("admitted")
+
+    def release(self):
+        with self._lock:
+            if self._queue:
+                self._queue.popleft().set()
+            else:
+                self._active -= 1
+
+    @contextmanager
+    def admit(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._lock:
+            state = {"active": self._active, "waiting": len(self._queue)}
+        return {
+            **self.metrics.snapshot(),
+            **state,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+scoring_admission = AdmissionController(
+    "scoring",
+    max_concurrent=getattr(settings, "CREDIT_SCORING_MAX_CONCURRENCY", 4),
+    max_queue=getattr(settings, "CREDIT_SCORING_MAX_QUEUE", 16),
+    queue_timeout=getattr(settings, "CREDIT_SCORING_QUEUE_TIMEOUT", 2.0),
+    retry_after=getattr(settings, "CREDIT_SCORING_RETRY_AFTER", 1),
+)
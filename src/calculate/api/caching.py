@@ -0,0 +1,139 @@
+"""
+Read-through cache for serialized CreditParameters payloads.
+
+Entries live in a Django cache (``CREDIT_PARAMETERS_CACHE_ALIAS``) under keys that include a
+generation token. Writes replace the token instead of deleting entries, so a read that raced a
+write can only ever populate a key nobody asks for again.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+
+
+class ResponseCache:
+    """
+    Pluggable read-through cache with stampede protection.
+
+    Concurrent misses on one key are coalesced: threads of the same process wait on a striped
+    local lock, and processes race for a short-lived lock key in the cache itself. Losers poll for
+    the winner's result and only compute it themselves if it never shows up.
+    """
+
+    def __init__(self, namespace, alias="default", timeout=300, lock_timeout=10, wait_timeout=2, poll_interval=0.02):
+        self.namespace = namespace
+        self.alias = alias
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.metrics = counters(f"cache.{namespace}")
+        self._locks = [threading.Lock() for _ in range(64)]
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation(self, scope):
+        key = f"{self.namespace}:generation:{scope}"
+        generation = self.cache.get(key)
+        if generation is None:
+            self.cache.add(key, uuid.uuid4().hex, timeout=None)
+            generation = self.cache.get(key)
+        return generation
+
+    def key(self, scope, *parts):
+        suffix = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+        return f"{self.namespace}:{scope}:{self._generation(scope)}:{suffix}"
+
+    def get(self, key):
+        """Return the cached value for ``key`` or ``None``, counting a hit if found"""
+        value = self.cache.get(key)
+        if value is not None:
+            self.metrics.incr("hits")
+        return value
+
+    def get_or_set(self, key, compute):
+        value = self.cache.get(key)
+        if value is not None:
+            self.metrics.incr("hits")
+            return value
+
+        with self._locks[hash(key) % len(self._locks)]:
+            value = self.cache.get(key)
+            if value is not None:
+                self.metrics.incr("coalesced_hits")
+                return value
+
+            lock_key = f"{key}:lock"
+            if not self.cache.add(lock_key, 1, timeout=self.lock_timeout):
+                value = self._wait_for(key)
+                if value is not None:
+                    self.metrics.incr("coalesced_hits")
+                    return value
+                # The lock holder is slow or died, serve the request rather than fail it
+                logger.warning(f"Timed out waiting for cache fill of {key}")
+                self.metrics.incr("lock_timeouts")
+
+            self.metrics.incr("misses")
+            try:
+                value = compute()
+                self.cache.set(key, value, timeout=self.timeout)
+            finally:
+                self.cache.delete(lock_key)
+            return value
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self.cache.get(key)
+            if value is not None:
+                return value
+        return None
+
+    def invalidate(self, *scopes):
+        """
+        Retire every entry under ``scopes``.
+
+        The generation is replaced now and again once the surrounding transaction commits, so a
+        read that loaded pre-commit data in between cannot outlive the write.
+        """
+
+        def bump():
+            self.cache.set_many({f"{self.namespace}:generation:{scope}": uuid.uuid4().hex for scope in scopes}, None)
+
+        bump()
+        transaction.on_commit(bump)
+        self.metrics.incr("invalidations")
+
+    def stats(self):
+        values = self.metrics.snapshot()
+        hits = values.get("hits", 0) + values.get("coalesced_hits", 0)
+        lookups = hits + values.get("misses", 0)
+        return {**values, "hit_rate": hits / lookups if lookups else 0.0}
+
+
+credit_parameters_cache = ResponseCache(
+    "credit-parameters",
+    alias=getattr(settings, "CREDIT_PARAMETERS_CACHE_ALIAS", "default"),
+    timeout=getattr(settings, "CREDIT_PARAMETERS_CACHE_TIMEOUT", 300),
+)
+
+
+def detail_scope(pk):
+    return f"detail:{pk}"
+
+
+def invalidate_credit_parameters(*pks):
+    """Drop the cached list pages, and the cached records ``pks`` if given"""
+    credit_parameters_cache.invalidate("list", *(detail_scope(pk) for pk in pks))
@@ -0,0 +1,64 @@
+"""
+Conditional GET support for credit parameter resources.
+
+Validators are derived from ``updated_at`` alone, so a matching If-None-Match is answered with a
+304 before any row is loaded into a model instance or serialized.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def _digest(*parts):
+    return hashlib.md5(":".join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def instance_validators(queryset, pk):
+    """
+    Return ``(etag, last_modified)`` for a single record, or ``None`` if it does not exist.
+
+    Only the ``updated_at`` column is fetched.
+    """
+    try:
+        row = queryset.filter(pk=pk).values_list("pk", "updated_at").first()
+    except (TypeError, ValueError, ValidationError):
+        return None
+    if row is None:
+        return None
+    pk, updated_at = row
+    return instance_etag(pk, updated_at), updated_at
+
+
+def instance_etag(pk, updated_at):
+    return f'"{_digest(pk, updated_at.isoformat())}"'
+
+
+def collection_etag(queryset):
+    """
+    Weak ETag for a collection of records.
+
+    Built from the row count and the latest ``updated_at``, which between them change on every
+    create, update and delete.
+    """
+    summary = queryset.aggregate(count=Count("pk"), latest=Max("updated_at"))
+    latest = summary["latest"].isoformat() if summary["latest"] else ""
+    return f'W/"{_digest(summary["count"], latest)}"'
+
+
+def conditional_response(request, etag, last_modified=None):
+    """Return a 304/412 response if the request's preconditions allow it, else ``None``"""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
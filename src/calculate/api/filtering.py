@@ -0,0 +1,143 @@
+"""
+Server-side filtering and ordering for the credit parameters list and export.
+
+Only the parameters below are understood, and each maps onto a predicate or sort that one of the
+composite indexes declared on CreditParameters can serve:
+
+- ``credit_score`` and ``occupation``: one value or a comma separated list
+- ``age_min``, ``age_max``, ``annual_income_min``, ``annual_income_max``: inclusive bounds, within
+  what the column can hold
+- ``ordering``: one of ORDERING, prefixed with ``-`` for descending
+
+Sorts always end on the primary key, so pages of equal keys come back in a stable order and the
+sort is read straight off the ``(key, id)`` index instead of sorting in memory.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.backends.base.operations import BaseDatabaseOperations
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from calculate.models import CreditParameters, CreditStatus
+
+ORDERING_PARAM = "ordering"
+# Sort key to the columns it orders by, each the leading columns of an index on CreditParameters
+ORDERING = {
+    "age": ("age", "id"),
+    "annual_income": ("annual_income", "id"),
+    "created_at": ("created_at", "id"),
+}
+IN_FILTERS = {
+    "credit_score": CreditStatus.values,
+    "occupation": None,
+}
+RANGE_FILTERS = {
+    "age": int,
+    "annual_income": Decimal,
+}
+
+
+def _values(params, name, allowed):
+    values = [value.strip() for raw in params.getlist(name) for value in raw.split(",") if value.strip()]
+    if allowed is not None:
+        invalid = sorted(set(values) - set(allowed))
+        if invalid:
+            raise ValidationError({name: f"Unknown values: {', '.join(invalid)}. Choose from {', '.join(allowed)}."})
+    return values
+
+
+def _limits(column):
+    """Exclusive bounds of the values ``column`` can hold, the same on every database"""
+    field = CreditParameters._meta.get_field(column)
+    if field.get_internal_type() == "DecimalField":
+        limit = Decimal(10) ** (field.max_digits - field.decimal_places)
+        return -limit, limit
+    # SQLite stores any integer, so use the range of the column on the other backends
+    low, high = BaseDatabaseOperations.integer_field_ranges[field.get_internal_type()]
+    return low - 1, high + 1
+
+
+def _bound(params, name, column, convert):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        bound = convert(value)
+    except (ValueError, InvalidOperation):
+        raise ValidationError({name: f"'{value}' is not a valid {'integer' if convert is int else 'number'}."})
+    if isinstance(bound, Decimal) and not bound.is_finite():
+        raise ValidationError({name: f"'{value}' is not a finite number."})
+    low, high = _limits(column)
+    if not low < bound < high:
+        raise ValidationError({name: f"'{value}' is out of range for {column.replace('_', ' ')}."})
+    return bound
+
+
+def ordering_fields(value):
+    """``order_by`` arguments for an ``ordering`` parameter, raising ValidationError if it is not allowed"""
+    descending = value.startswith("-")
+    columns = ORDERING.get(value.lstrip("-"))
+    if columns is None:
+        allowed = ", ".join(f"{key}, -{key}" for key in ORDERING)
+        raise ValidationError({ORDERING_PARAM: f"Cannot order by '{value}'. Choose from {allowed}."})
+    return [f"-{column}" if descending else column for column in columns]
+
+
+class CreditParametersFilterBackend(BaseFilterBackend):
+    """Applies the allow-listed filter and ordering query parameters"""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        conditions = {}
+        for name, allowed in IN_FILTERS.items():
+            values = _values(params, name, allowed)
+            if len(values) == 1:
+                conditions[name] = values[0]
+            elif values:
+                conditions[f"{name}__in"] = values
+        for name, convert in RANGE_FILTERS.items():
+            lower, upper = _bound(params, f"{name}_min", name, convert), _bound(params, f"{name}_max", name, convert)
+            if lower is not None:
+                conditions[f"{name}__gte"] = lower
+            if upper is not None:
+                conditions[f"{name}__lte"] = upper
+        if conditions:
+            queryset = queryset.filter(**conditions)
+
+        ordering = params.get(ORDERING_PARAM)
+        if ordering:
+            queryset = queryset.order_by(*ordering_fields(ordering))
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [
+            {
+                "name": name,
+                "required": False,
+                "in": "query",
+                "description": f"Only records with one of these comma separated {name.replace('_', ' ')} values",
+                "schema": {"type": "string"},
+            }
+            for name in IN_FILTERS
+        ]
+        for name, convert in RANGE_FILTERS.items():
+            for bound, word in (("min", "at least"), ("max", "at most")):
+                parameters.append(
+                    {
+                        "name": f"{name}_{bound}",
+                        "required": False,
+                        "in": "query",
+                        "description": f"Only records with {name.replace('_', ' ')} {word} this",
+                        "schema": {"type": "integer" if convert is int else "number"},
+                    }
+                )
+        parameters.append(
+            {
+                "name": ORDERING_PARAM,
+                "required": False,
+                "in": "query",
+                "description": "Sort key, prefixed with - for descending",
+                "schema": {"type": "string", "enum": [f"{p}{key}" for key in ORDERING for p in ("", "-")]},
+            }
+        )
+        return parameters
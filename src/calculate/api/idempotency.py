@@ -0,0 +1,143 @@
+"""
+Idempotency-Key support for requests that must not be processed twice.
+
+The first request with a key claims it by inserting an IdempotencyKey row, runs, and stores its
+response on the row. Retries with the same key and body get the stored response back without
+running the handler again. Reusing a key for a different request is rejected.
+
+A claim is a lease of IDEMPOTENCY_KEY_LEASE seconds. If the worker running the request dies,
+its row stays pending, and a retry after the lease has run out takes the key over instead of
+getting 409 until the key expires. The lease is meant to outlast any request, as a handler still
+running when it is taken over runs twice.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from calculate.models import IdempotencyKey
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("idempotency")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = "idempotency_key_in_progress"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+def request_fingerprint(request):
+    """SHA-256 of the method, path and canonical JSON body of ``request``"""
+    body = json.dumps(request.data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{request.method}\n{request.path}\n{body}".encode()).hexdigest()
+
+
+def _claim(key, fingerprint):
+    """
+    Return ``(record, created)``, inserting a pending record unless a live one exists. A pending
+    record for the same request whose lease has run out is taken over, and counts as created.
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_LEASE", 120))
+    record = IdempotencyKey.objects.filter(key=key, expires_at__gt=now).first()
+    if record is not None:
+        if record.is_complete or record.fingerprint != fingerprint:
+            return record, False
+        # Only one retry wins the takeover of an abandoned claim
+        taken = IdempotencyKey.objects.filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lte=now), pk=record.pk, status_code__isnull=True
+        ).update(locked_until=locked_until)
+        if taken:
+            metrics.incr("taken_over")
+            logger.warning(f"Taking over Idempotency-Key {key}, abandoned by its first request")
+            record.locked_until = locked_until
+        return record, bool(taken)
+
+    ttl = timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+    IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                key=key, fingerprint=fingerprint, expires_at=now + ttl, locked_until=locked_until
+            )
+            return record, True
+    except IntegrityError:
+        # A concurrent request claimed the key first
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is None:
+            raise IdempotencyKeyInProgress()
+        return record, False
+
+
+def idempotent(request, handler):
+    """
+    Run ``handler()`` at most once per Idempotency-Key header value.
+
+    Without the header the handler simply runs. Responses below 500 are stored and replayed. If
+    the handler raises or returns a server error the key is released so the client can retry.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({IDEMPOTENCY_HEADER: f"Must be at most {MAX_KEY_LENGTH} characters."})
+
+    fingerprint = request_fingerprint(request)
+    record, created = _claim(key, fingerprint)
+    if not created:
+        if record.fingerprint != fingerprint:
+            metrics.incr("reused")
+            logger.warning(f"Idempotency-Key {key} reused for a different request")
+            raise IdempotencyKeyReused()
+        if not record.is_complete:
+            metrics.incr("in_progress")
+            raise IdempotencyKeyInProgress()
+        metrics.incr("replays")
+        logger.info(f"Replaying stored response for Idempotency-Key {key}")
+        return Response(record.response_body, status=record.status_code, headers={REPLAYED_HEADER: "true"})
+
+    try:
+        response = handler()
+    except Exception:
+        record.delete()
+        raise
+    if response.status_code >= 500:
+        record.delete()
+        return response
+
+    record.status_code = response.status_code
+    record.response_body = response.data
+    record.save(update_fields=["status_code", "response_body", "updated_at"])
+    metrics.incr("stored")
+    return response
+
+
+def purge_expired(now=None, batch_size=1000):
+    """Delete expired IdempotencyKey rows in batches and return how many were removed"""
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        pks = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,33 @@
+"""
+Request parsers for columnar batch scoring, see calculate.columnar.
+
+Each parser reads its body into a pyarrow Table. They are only installed when pyarrow is, so a
+worker without it answers Arrow and Parquet bodies with 415 Unsupported Media Type.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from calculate import columnar
+
+
+class TableParser(BaseParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return columnar.read_table(stream.read(), self.media_type)
+        except columnar.ColumnarError as e:
+            raise ParseError(str(e))
+
+
+class ArrowStreamParser(TableParser):
+    media_type = columnar.ARROW_STREAM
+
+
+class ArrowFileParser(TableParser):
+    media_type = columnar.ARROW_FILE
+
+
+class ParquetParser(TableParser):
+    media_type = columnar.PARQUET
+
+
+TABLE_PARSERS = [ArrowStreamParser, ArrowFileParser, ParquetParser] if columnar.available() else []
@@ -0,0 +1,257 @@
+"""
+Fast read path for serializing many CreditParameters rows.
+
+A serializer's readable fields are compiled once into a plan of (output name, database column,
+converter) entries. Rows are then fetched as tuples with ``values_list`` and converted without
+building field objects or model instances per row. The converters reproduce the DRF field
+representations, and the encoder reproduces JSONRenderer's output, so the bytes are identical to
+the ModelSerializer path.
+
+A nested ``many=True`` ModelSerializer over a reverse foreign key, such as the loans of a record,
+is read like ``prefetch_related`` would: one query for the related rows of each chunk of rows.
+"""
+import decimal
+import functools
+import itertools
+import json
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import NamedTuple
+
+from django.utils import timezone
+from rest_framework import fields, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+LINE_SEPARATORS = (("\u2028", "\\u2028"), ("\u2029", "\\u2029"))
+
+
+def _decimal_converter(field):
+    if field.decimal_places is None or field.normalize_output or field.localize:
+        return field.to_representation
+    if not getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+        return field.to_representation
+    quantum = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return "{:f}".format(value.quantize(quantum, rounding=rounding, context=context))
+
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != fields.ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if timezone.is_aware(value):
+            value = value.astimezone(field_timezone)
+        else:
+            value = field.enforce_timezone(value)
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def _choice_converter(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        if value == "":
+            return value
+        return choices.get(str(value), value)
+
+    return convert
+
+
+def _converter(field):
+    # Exact type checks, a subclass may override to_representation
+    field_type = type(field)
+    if field_type is fields.UUIDField and field.uuid_format == "hex_verbose":
+        return str
+    if field_type in (fields.CharField, fields.EmailField):
+        return str
+    if field_type is fields.IntegerField:
+        return int
+    if field_type is fields.DecimalField:
+        return _decimal_converter(field)
+    if field_type is fields.DateTimeField:
+        return _datetime_converter(field)
+    if field_type is fields.ChoiceField:
+        return _choice_converter(field)
+    return field.to_representation
+
+
+def _column(model, source):
+    # "user.id" is served from the user_id column, so no join or lazy load is needed
+    parts = source.split(".")
+    if len(parts) == 1:
+        return model._meta.get_field(source).attname
+    if len(parts) == 2:
+        relation = model._meta.get_field(parts[0])
+        if relation.many_to_one or relation.one_to_one:
+            if relation.target_field.name == parts[1] or (parts[1] == "pk" and relation.target_field.primary_key):
+                return relation.attname
+    raise ValueError(f"Field source {source!r} is not supported by the fast read path")
+
+
+class Nested(NamedTuple):
+    """The plan column of a nested serializer: the related model, its foreign key column and its own plan"""
+
+    model: type
+    key: str
+    plan: tuple
+
+
+def _nested(model, name, field):
+    relation = model._meta.get_field(field.source)
+    if not (isinstance(field.child, serializers.ModelSerializer) and relation.one_to_many):
+        raise ValueError(f"Field {name!r} is not supported by the fast read path")
+    plan = compile_plan(type(field.child))
+    if any(isinstance(column, Nested) for column in plan[1]):
+        raise ValueError(f"Field {name!r} nests serializers more than one level deep")
+    return Nested(relation.related_model, relation.field.attname, plan)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_plan(serializer_class):
+    """
+    Return ``(names, columns, converters)`` for the readable fields of a ModelSerializer. The
+    column of a nested serializer is a Nested, and its converter None.
+    """
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    names, columns, converters = [], [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        names.append(name)
+        if isinstance(field, serializers.ListSerializer):
+            columns.append(_nested(model, name, field))
+            converters.append(None)
+            continue
+        if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+            raise ValueError(f"Field {name!r} is not supported by the fast read path")
+        columns.append(_column(model, field.source))
+        converters.append(_converter(field))
+    return tuple(names), tuple(columns), tuple(converters)
+
+
+def _related_rows(nested, keys):
+    """Representation dicts of the ``nested`` rows of the parents ``keys``, grouped by parent key"""
+    names, columns, converters = nested.plan
+    plan = tuple(zip(names, converters))
+    queryset = nested.model.objects.filter(**{f"{nested.key}__in": keys}).order_by("pk")
+    groups = defaultdict(list)
+    for key, *row in queryset.values_list(nested.key, *columns):
+        groups[key].append(
+            {name: None if value is None else convert(value) for (name, convert), value in zip(plan, row)}
+        )
+    return groups
+
+
+def iter_rows(queryset, serializer_class, chunk_size=2000):
+    """Yield representation dicts of ``queryset`` in serializer field order"""
+    names, columns, converters = compile_plan(serializer_class)
+    # Related rows are read per chunk below, a prefetch would not apply to values_list anyway
+    queryset = queryset.prefetch_related(None)
+    if not any(isinstance(column, Nested) for column in columns):
+        plan = tuple(zip(names, converters))
+        for row in queryset.values_list(*columns).iterator(chunk_size=chunk_size):
+            yield {name: None if value is None else convert(value) for (name, convert), value in zip(plan, row)}
+        return
+
+    flat = [column for column in columns if not isinstance(column, Nested)]
+    rows = queryset.values_list(*flat, queryset.model._meta.pk.attname).iterator(chunk_size=chunk_size)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        keys = [row[-1] for row in chunk]
+        related = {
+            name: _related_rows(column, keys) for name, column in zip(names, columns) if isinstance(column, Nested)
+        }
+        for row in chunk:
+            values = iter(row)
+            item = {}
+            for name, convert in zip(names, converters):
+                if convert is None:
+                    item[name] = related[name].get(row[-1], [])
+                else:
+                    value = next(values)
+                    item[name] = None if value is None else convert(value)
+            yield item
+
+
+def encode(data):
+    """Encode JSON-native data exactly like DRF's JSONRenderer with the default settings"""
+    if orjson is not None:
+        body = orjson.dumps(data)
+        if b"\xe2\x80\xa8" in body or b"\xe2\x80\xa9" in body:
+            body = body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return body
+    text = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    for character, escaped in LINE_SEPARATORS:
+        text = text.replace(character, escaped)
+    return text.encode()
+
+
+def render_rows(queryset, serializer_class, chunk_size=2000):
+    """Render ``queryset`` as the JSON array a ``many=True`` serializer and JSONRenderer would produce"""
+    return encode(list(iter_rows(queryset, serializer_class, chunk_size)))
+
+
+def stream_rows(queryset, serializer_class, chunk_size=2000):
+    """Yield the bytes of render_rows chunk by chunk, holding at most ``chunk_size`` rows"""
+    yield b"["
+    batch, first = [], True
+    for row in iter_rows(queryset, serializer_class, chunk_size):
+        batch.append(row)
+        if len(batch) == chunk_size:
+            yield (b"" if first else b",") + encode(batch)[1:-1]
+            batch, first = [], False
+    if batch:
+        yield (b"" if first else b",") + encode(batch)[1:-1]
+    yield b"]"
+
+
+class RenderedJSON(Sequence):
+    """
+    A JSON array rendered ahead of time.
+
+    FastJSONRenderer writes the bytes out untouched. Code that reads ``response.data`` still sees
+    a sequence of dicts, decoded on first access.
+    """
+
+    def __init__(self, body):
+        self.body = body
+
+    @functools.cached_property
+    def _items(self):
+        return json.loads(self.body)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, RenderedJSON) and self.get_indent(accepted_media_type, renderer_context or {}) is None:
+            return data.body
+        return super().render(data, accepted_media_type, renderer_context)
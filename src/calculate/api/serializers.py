@@ -1,22 +1,37 @@
 import logging
+import math
+from collections.abc import Mapping
 
+from django.db import transaction
 from rest_framework import serializers
 
-from calculate.models import CreditParameters
+from calculate.api.validation import compile_validator
+from calculate.models import CreditLoans, CreditParameters
 from users.models import User
 
 logger = logging.getLogger("credit_serializers")
 
+MAX_LOANS = 50
+
+
+class CreditLoansSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CreditLoans
+        fields = ["id", "loan_type"]
+
 
 class CreditParametersSerializer(serializers.ModelSerializer):
     user = serializers.EmailField(write_only=True, required=False, allow_blank=True)
     user_id = serializers.IntegerField(source='user.id', read_only=True)
+    # Written with the record in one transaction, see create and update; omitted loans are left as they are
+    loans = CreditLoansSerializer(many=True, required=False, max_length=MAX_LOANS)
     
     class Meta:
         model = CreditParameters
         fields = "__all__"
         extra_kwargs = {
-            'credit_score': {'required': False}
+            'credit_score': {'required': False},
+            'score_source': {'read_only': True},
         }
 
     categorical_fields = [
@@ -71,7 +86,7 @@ class CreditParametersSerializer(serializers.ModelSerializer):
         if user_email:
             # Check if user exists and set ID, otherwise remove from data
             try:
-                user = User.objects.get(email=user_email)
+                user = User.objects.get(email=user_email, deleted__isnull=True)
                 logger.info(f"Found existing user with email {user_email}, ID: {user.id}")
                 # Remove the email field so it doesn't interfere with model validation
                 data = data.copy()
@@ -96,3 +111,136 @@ class CreditParametersSerializer(serializers.ModelSerializer):
         logger.info("Successfully converted all numerical fields")
         return super().to_internal_value(data)
 
+    @staticmethod
+    def write_loans(instance, loans):
+        """Insert ``loans`` for ``instance`` with one bulk_create"""
+        CreditLoans.objects.bulk_create(CreditLoans(credit_check=instance, **loan) for loan in loans)
+
+    def create(self, validated_data):
+        loans = validated_data.pop("loans", [])
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            self.write_loans(instance, loans)
+        return instance
+
+    def update(self, instance, validated_data):
+        loans = validated_data.pop("loans", None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if loans is not None:
+                # The given loans replace the record's loans
+                instance.loans.all().delete()
+                self.write_loans(instance, loans)
+        return instance
+
+
+
+BULK_UPDATE_LIMIT = 5000
+BATCH_VALIDATE_LIMIT = 5000
+BATCH_SCORE_LIMIT = 5000
+# Tables are scored without a Python object per row, so they can be far longer than JSON lists
+COLUMNAR_SCORE_LIMIT = 1_000_000
+
+
+class CreditParametersChangeSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    changes = serializers.DictField(allow_empty=False)
+
+    def validate_changes(self, changes):
+        # Loans are a nested collection, replaced through an update of their record
+        fields = set(compile_validator(CreditParametersSerializer).fields) - {"loans"}
+        unknown = sorted(set(changes) - fields)
+        if unknown:
+            raise serializers.ValidationError(f"Fields cannot be bulk updated: {', '.join(unknown)}.")
+        return changes
+
+
+class CreditParametersBulkUpdateSerializer(serializers.Serializer):
+    updates = CreditParametersChangeSerializer(many=True, allow_empty=False, max_length=BULK_UPDATE_LIMIT)
+    rescore = serializers.BooleanField(default=False)
+
+    def validate_updates(self, updates):
+        seen, duplicates = set(), set()
+        for update in updates:
+            (duplicates if update["id"] in seen else seen).add(update["id"])
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate ids: {', '.join(sorted(map(str, duplicates)))}.")
+
+        # All changes are validated together, with the numerical rounding of to_internal_value
+        validated, errors = compile_validator(CreditParametersSerializer).validate(
+            [update["changes"] for update in updates], partial=True
+        )
+        if errors:
+            raise serializers.ValidationError(
+                [{"changes": errors[index]} if index in errors else {} for index in range(len(updates))]
+            )
+        for update, changes in zip(updates, validated):
+            update["changes"] = changes
+        return updates
+
+
+WHAT_IF_MAX_POINTS = 100_000
+
+
+class CreditParametersWhatIfSerializer(serializers.Serializer):
+    """
+    One applicant and a grid of values for some of its numerical fields.
+
+    Each grid entry is a list of values or ``{"start", "stop", "num"}`` for ``num`` evenly spaced
+    values including both ends. The validated grid is a list of ``(field, values)`` axes.
+    """
+
+    applicant = serializers.DictField()
+    grid = serializers.DictField(allow_empty=False)
+
+    def validate_applicant(self, applicant):
+        validated, errors = compile_validator(CreditParametersSerializer).validate([applicant])
+        if errors:
+            raise serializers.ValidationError(errors[0])
+        return validated[0]
+
+    @staticmethod
+    def _axis(spec):
+        if isinstance(spec, Mapping):
+            try:
+                start, stop, num = float(spec["start"]), float(spec["stop"]), int(spec["num"])
+            except (KeyError, ValueError, TypeError):
+                raise serializers.ValidationError("Expected numbers start and stop and an integer num.")
+            if not 1 <= num <= WHAT_IF_MAX_POINTS:
+                raise serializers.ValidationError(f"num must be between 1 and {WHAT_IF_MAX_POINTS}.")
+            if num == 1:
+                return [start]
+            return [start + (stop - start) * step / (num - 1) for step in range(num)]
+        if not isinstance(spec, list) or not spec:
+            raise serializers.ValidationError("Expected a non-empty list of values or {start, stop, num}.")
+        try:
+            if any(isinstance(value, bool) for value in spec):
+                raise TypeError
+            return [float(value) for value in spec]
+        except (ValueError, TypeError):
+            raise serializers.ValidationError("Every value must be a number.")
+
+    def validate_grid(self, grid):
+        axes, errors = [], {}
+        for field, spec in grid.items():
+            if field not in CreditParametersSerializer.numerical_fields:
+                errors[field] = ["Only numerical fields can be varied."]
+                continue
+            try:
+                values = self._axis(spec)
+            except serializers.ValidationError as e:
+                errors[field] = e.detail
+                continue
+            if not all(math.isfinite(value) for value in values):
+                errors[field] = ["Every value must be a finite number."]
+                continue
+            axes.append((field, values))
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        points = math.prod(len(values) for _, values in axes)
+        if points > WHAT_IF_MAX_POINTS:
+            raise serializers.ValidationError(
+                f"The grid has {points} points, no more than {WHAT_IF_MAX_POINTS} are allowed."
+            )
+        return axes
@@ -0,0 +1,126 @@
+"""
+Batch validation of CreditParameters input.
+
+The writable fields of a serializer are compiled once into a validator of (name, source, check)
+columns. A batch is then validated column by column with the shared field instances, and every
+error of every row is collected instead of stopping at the first one. The checks reproduce
+CreditParametersSerializer.to_internal_value: numerical fields are coerced with
+``round(float(value), 2)`` before the field's own validation, and the messages are the field's.
+"""
+import decimal
+import functools
+import math
+from collections.abc import Mapping
+
+from rest_framework import fields
+from rest_framework.exceptions import ErrorDetail, ValidationError
+from rest_framework.settings import api_settings
+
+# Write-only fields the serializer handles itself instead of validating, see to_internal_value
+UNVALIDATED_FIELDS = ("user",)
+
+# Floats from 1e16 up are repr'd in exponent notation, which IntegerField rejects
+_INTEGER_REPR_LIMIT = 1e16
+
+
+def _decimal_check(field):
+    # DecimalField.to_internal_value for a float, skipping the string round trip checks
+    def check(value):
+        if not math.isfinite(value):
+            field.fail("invalid")
+        value = field.quantize(field.validate_precision(decimal.Decimal(repr(value))))
+        field.run_validators(value)
+        return value
+
+    return check
+
+
+def _integer_check(field):
+    # IntegerField.to_internal_value for a float: only integral values below the repr limit pass
+    def check(value):
+        if not (math.isfinite(value) and value.is_integer() and abs(value) < _INTEGER_REPR_LIMIT):
+            field.fail("invalid")
+        value = int(value)
+        field.run_validators(value)
+        return value
+
+    return check
+
+
+def _numerical_check(field):
+    # Exact type checks, a subclass may override to_internal_value
+    field_type = type(field)
+    if field_type is fields.DecimalField and not field.localize:
+        run = _decimal_check(field)
+    elif field_type is fields.IntegerField:
+        run = _integer_check(field)
+    else:
+        run = field.run_validation
+
+    def check(value):
+        try:
+            value = round(float(value), 2)
+        except (ValueError, TypeError, OverflowError):
+            raise ValidationError("Must be a number.")
+        return run(value)
+
+    return check
+
+
+class BatchValidator:
+    """Validate many input dicts against the writable fields of a serializer in one pass"""
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        numerical = set(getattr(serializer_class, "numerical_fields", ()))
+        self.fields = {
+            name: field
+            for name, field in serializer.fields.items()
+            if not field.read_only and name not in UNVALIDATED_FIELDS
+        }
+        self.columns = tuple(
+            (name, field, _numerical_check(field) if name in numerical else field.run_validation)
+            for name, field in self.fields.items()
+        )
+        self.invalid_message = serializer.error_messages["invalid"]
+
+    def validate(self, rows, partial=False):
+        """
+        Validate ``rows`` and return ``(validated, errors)``.
+
+        ``validated`` holds a dict of internal values keyed by field source for each row, or None
+        when the row has errors. ``errors`` maps the index of each invalid row to its errors in the
+        ``{field: [messages]}`` shape of ``serializer.errors``. With ``partial`` missing fields are
+        skipped, as for a partial update.
+        """
+        rows = list(rows)
+        validated, errors = [], {}
+        for index, row in enumerate(rows):
+            if isinstance(row, Mapping):
+                validated.append({})
+            else:
+                validated.append(None)
+                message = self.invalid_message.format(datatype=type(row).__name__)
+                errors[index] = {api_settings.NON_FIELD_ERRORS_KEY: [ErrorDetail(message, code="invalid")]}
+
+        present = [(index, row) for index, row in enumerate(rows) if validated[index] is not None]
+        for name, field, check in self.columns:
+            required = field.required and not partial
+            for index, row in present:
+                try:
+                    if name in row:
+                        validated[index][field.source] = check(row[name])
+                    elif required:
+                        field.fail("required")
+                except ValidationError as e:
+                    errors.setdefault(index, {})[name] = e.detail
+
+        for index in errors:
+            validated[index] = None
+        return validated, errors
+
+
+@functools.lru_cache(maxsize=None)
+def compile_validator(serializer_class):
+    """Return the BatchValidator for ``serializer_class``, built on first use"""
+    return BatchValidator(serializer_class)
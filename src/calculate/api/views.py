@@ -0,0 +1,111 @@
+from django.db import connection
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from calculate import outbox
+from calculate.api.admission import scoring_admission
+from calculate.api.caching import credit_parameters_cache
+from calculate.models import CreditParameters
+from calculate.scoring import loader
+from calculate.scoring.registry import registry
+from helpers.metrics import snapshot
+
+
+class MetricsView(APIView):
+    """
+    In-process counters of the serving worker, including response cache hit rates, admission state and
+    the load time and hit counts of each credit model.
+    """
+
+    def get(self, request):
+        from calculate.scoring import prediction_cache
+
+        predictions = prediction_cache.shared()
+        return Response({
+            "counters": snapshot(),
+            "caches": {
+                credit_parameters_cache.namespace: credit_parameters_cache.stats(),
+                "predictions": predictions.stats() if predictions is not None else None,
+            },
+            "admission": {scoring_admission.name: scoring_admission.stats()},
+            "models": registry.stats(),
+        })
+
+
+class PortfolioView(APIView):
+    """
+    Score distribution, exposure by score band and credit utilization quantiles over the whole book.
+
+    Computed in one streaming pass by calculate.portfolio and cached until the next write.
+    """
+
+    def get(self, request):
+        # Imported here, as numpy is not needed at startup
+        from calculate import portfolio
+
+        key = credit_parameters_cache.key("list", "portfolio")
+        return Response(credit_parameters_cache.get_or_set(key, portfolio.aggregate))
+
+
+class DriftView(APIView):
+    """
+    Input drift of the requests scored by this worker against each model's training data: PSI and
+    Kolmogorov-Smirnov distance per feature, and the features past CREDIT_DRIFT_PSI_ALERT.
+
+    Only models exported with their training data carry the reference histograms.
+    """
+
+    def get(self, request):
+        from calculate.scoring.drift import monitor
+
+        return Response(monitor.stats())
+
+
+class OutboxView(APIView):
+    """Write-behind outbox backlog on this host and the state of this worker's drain thread."""
+
+    def get(self, request):
+        return Response(outbox.stats())
+
+
+class OutboxEntryView(APIView):
+    """Whether a record accepted in write-behind mode is still queued, has failed or has been written."""
+
+    def get(self, request, pk):
+        entry = outbox.entry_status(pk)
+        if entry is None:
+            if not CreditParameters.all_objects.filter(pk=pk).exists():
+                raise NotFound()
+            entry = {"state": "written", "attempts": None, "error": None}
+        return Response({"id": str(pk), **entry})
+
+
+class LivenessView(APIView):
+    """The process is up and serving requests."""
+
+    def get(self, request):
+        return Response({"status": "ok"})
+
+
+class ReadinessView(APIView):
+    """
+    The worker can score requests: the credit model is warm and the database answers.
+
+    A worker started without preloading warms the model on its first probe.
+    """
+
+    def get(self, request):
+        model_ready = loader.warm()
+        try:
+            connection.ensure_connection()
+            database_ready = True
+        except Exception:
+            database_ready = False
+
+        ready = model_ready and database_ready
+        return Response(
+            {"status": "ready" if ready else "unavailable", "model": loader.status(), "database": database_ready},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
@@ -1,18 +1,56 @@
 import logging
-import pickle
-import os
-import pandas as pd
+import time
+import uuid
+from collections import defaultdict
 
+from django.conf import settings
 from django.db import transaction, IntegrityError
-from rest_framework import viewsets
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
 
-from calculate.api.serializers import CreditParametersSerializer
-from calculate.models import CreditParameters
-from users.models import User
+from calculate.api.admission import scoring_admission
+from calculate.api.caching import credit_parameters_cache, detail_scope, invalidate_credit_parameters
+from calculate.api.etags import (
+    collection_etag,
+    conditional_response,
+    instance_etag,
+    instance_validators,
+    set_validators,
+)
+from calculate.api.filtering import CreditParametersFilterBackend
+from calculate.api.idempotency import idempotent
+from calculate.api.parsers import TABLE_PARSERS
+from calculate.api.rendering import FastJSONRenderer, RenderedJSON, encode, iter_rows, stream_rows
+from calculate.api.serializers import (
+    BATCH_SCORE_LIMIT,
+    BATCH_VALIDATE_LIMIT,
+    COLUMNAR_SCORE_LIMIT,
+    CreditParametersBulkUpdateSerializer,
+    CreditParametersSerializer,
+    CreditParametersWhatIfSerializer,
+)
+from calculate.api.validation import compile_validator
+from calculate import columnar, outbox
+from calculate.models import CreditParameters, CreditStatus
+from calculate.scoring import history
+from calculate.scoring.features import FEATURE_COLUMNS
+from calculate.scoring.deadline import reconcile_later, score_within
+from calculate.scoring.loader import score_records
+from calculate.scoring.registry import UnknownModel, registry
+from calculate.scoring.scenarios import encode_scores, score_grid
+from users.models import User, split_name
 
 logger = logging.getLogger("credit_parameters")
 
+BULK_UPDATE_BATCH_SIZE = 500
+
 
 class CreditParametersViewSet(viewsets.ModelViewSet):
     """
@@ -22,8 +60,16 @@ class CreditParametersViewSet(viewsets.ModelViewSet):
     It uses the CreditParameters model and the CreditParametersSerializer for serialization.
 
     Methods:
+        - list / export: Read through the fast path in calculate.api.rendering, which renders rows
+          straight from the database into the same JSON the serializer would produce. Both take the
+          allow-listed filter and ordering parameters of calculate.api.filtering.
+        - create: Honours an Idempotency-Key header, replaying the stored response for retries, and
+          runs under the scoring admission limit in calculate.api.admission. With CREDIT_WRITE_BEHIND
+          it responds 202 once the record is scored and leaves the write to calculate.outbox.
         - perform_create(serializer): Creates a new CreditParameters object. It predicts the credit score
           based on the provided data using a pre-trained model and saves the prediction to the object.
+          A model slower than CREDIT_SCORING_BUDGET is replaced by the rule engine and reconciled later.
+          The model is picked per request by region, tenant or header, see calculate.scoring.registry.
 
     Attributes:
         - log: A logger for recording events related to credit parameters.
@@ -31,37 +77,311 @@ class CreditParametersViewSet(viewsets.ModelViewSet):
         - serializer_class: The serializer class to be used for data serialization.
     """
 
-    queryset = CreditParameters.objects.all()
+    # Reads through the serializer show each record's loans, loaded in one query per page of records
+    queryset = CreditParameters.objects.prefetch_related("loans")
     serializer_class = CreditParametersSerializer
+    filter_backends = [CreditParametersFilterBackend]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def list(self, request, *args, **kwargs):
         logger.info("Fetching list of credit parameters")
-        response = super().list(request, *args, **kwargs)
-        logger.info(f"Retrieved {len(response.data)} credit parameter records")
-        return response
+        queryset = self.filter_queryset(self.get_queryset())
+        key = credit_parameters_cache.key("list", sorted(request.query_params.lists()))
+        entry = credit_parameters_cache.get(key)
+        if entry is None:
+            etag = collection_etag(queryset)
+            not_modified = conditional_response(request, etag)
+            if not_modified is not None:
+                logger.info("Credit parameter list not modified")
+                return not_modified
+
+            def load():
+                rows = list(iter_rows(queryset, self.get_serializer_class()))
+                return {"etag": etag, "count": len(rows), "body": encode(rows)}
+
+            entry = credit_parameters_cache.get_or_set(key, load)
+        else:
+            not_modified = conditional_response(request, entry["etag"])
+            if not_modified is not None:
+                logger.info("Credit parameter list not modified")
+                return not_modified
+
+        logger.info(f"Retrieved {entry['count']} credit parameter records")
+        return set_validators(Response(RenderedJSON(entry["body"])), entry["etag"])
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream every credit parameter record as one JSON array, in the list representation."""
+        logger.info("Exporting credit parameters")
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = collection_etag(queryset)
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            logger.info("Credit parameter export not modified")
+            return not_modified
+
+        response = StreamingHttpResponse(
+            stream_rows(queryset, self.get_serializer_class()), content_type="application/json"
+        )
+        response["Content-Disposition"] = 'attachment; filename="credit-parameters.json"'
+        return set_validators(response, etag)
 
     def retrieve(self, request, *args, **kwargs):
         logger.info(f"Fetching credit parameter with ID: {kwargs.get('pk')}")
         try:
-            response = super().retrieve(request, *args, **kwargs)
+            pk = self._normalise_pk(kwargs.get("pk"))
+            key = credit_parameters_cache.key(detail_scope(pk)) if pk else None
+            entry = credit_parameters_cache.get(key) if key else None
+            if entry is None:
+                validators = instance_validators(self.get_queryset(), kwargs.get("pk"))
+                if validators:
+                    not_modified = conditional_response(request, *validators)
+                    if not_modified is not None:
+                        logger.info(f"Credit parameter {kwargs.get('pk')} not modified")
+                        return not_modified
+
+                def load():
+                    instance = self.get_object()
+                    return {
+                        "etag": instance_etag(instance.pk, instance.updated_at),
+                        "last_modified": instance.updated_at,
+                        "data": dict(self.get_serializer(instance).data),
+                    }
+
+                entry = credit_parameters_cache.get_or_set(key, load) if key else load()
+            else:
+                not_modified = conditional_response(request, entry["etag"], entry["last_modified"])
+                if not_modified is not None:
+                    logger.info(f"Credit parameter {kwargs.get('pk')} not modified")
+                    return not_modified
+
             logger.info(f"Successfully retrieved credit parameter {kwargs.get('pk')}")
-            return response
+            return set_validators(Response(entry["data"]), entry["etag"], entry["last_modified"])
         except Exception as e:
             logger.error(f"Failed to retrieve credit parameter {kwargs.get('pk')}: {str(e)}")
             raise
 
+    def create(self, request, *args, **kwargs):
+        def admitted_create():
+            # Requests beyond the concurrency limit queue briefly, or are shed with a 503
+            with scoring_admission.admit():
+                if settings.CREDIT_WRITE_BEHIND:
+                    return self._create_write_behind(request)
+                return super(CreditParametersViewSet, self).create(request, *args, **kwargs)
+
+        # Retries carrying the same Idempotency-Key get the stored response instead of a second prediction
+        return idempotent(request, admitted_create)
+
+    def _create_write_behind(self, request):
+        """
+        Validate and score a new record, queue it in the outbox and respond 202 with its score.
+
+        The user and the record are written by the outbox worker, see calculate.outbox. The
+        Location header points at the queued record's status. A user with credit parameters, or
+        with a create still queued, is refused with 400.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_email = request.data.get("user")
+        if not user_email:
+            raise ValidationError({"user": "This field is required."})
+        # The conflict the insert would hit, checked before the client is told the record is accepted
+        if CreditParameters.objects.filter(user__email=user_email).exists():
+            raise ValidationError({"user": f"Credit parameters already exist for user with email '{user_email}'."})
+
+        model = self._scoring_model()
+        inputs = dict(serializer.validated_data)
+        start = time.perf_counter()
+        scores, source, late = score_within(registry.loader(model), [inputs])
+        seconds = time.perf_counter() - start
+        record_id = uuid.uuid4()
+        fields = {**inputs, "credit_score": str(scores[0]), "score_source": source}
+        try:
+            outbox.enqueue(record_id, user_email, request.data.get("name", ""), fields, seconds, late, model)
+        except outbox.AlreadyQueued as e:
+            raise ValidationError({"user": str(e)})
+        logger.info(f"Queued credit parameter {record_id} with {source} score {scores[0]}")
+
+        return Response(
+            {"id": str(record_id), "credit_score": str(scores[0]), "score_source": source, "status": "queued"},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": reverse("outbox-entry", args=[record_id])},
+        )
+
+    @action(detail=False, methods=["patch"], url_path="bulk")
+    def bulk_partial_update(self, request):
+        """
+        Apply partial updates to many credit parameter records in one request.
+
+        The body is ``{"updates": [{"id": ..., "changes": {...}}, ...], "rescore": false}``. Targets
+        are loaded in one query and written with one bulk_update per distinct set of changed
+        fields. With ``rescore`` the changed rows are scored again in a single pass. The request
+        is applied entirely or not at all.
+        """
+        serializer = CreditParametersBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updates = serializer.validated_data["updates"]
+        rescore = serializer.validated_data["rescore"]
+        logger.info(f"Bulk updating {len(updates)} credit parameters (rescore={rescore})")
+
+        model_name = self._scoring_model() if rescore else None
+        model = registry.get(model_name) if rescore else None
+        with transaction.atomic():
+            targets = self.get_queryset().select_for_update().in_bulk([update["id"] for update in updates])
+            missing = [str(update["id"]) for update in updates if update["id"] not in targets]
+            if missing:
+                raise ValidationError({"updates": f"Credit parameters not found: {', '.join(missing)}."})
+
+            now = timezone.now()
+            groups = defaultdict(list)
+            for update in updates:
+                instance = targets[update["id"]]
+                for field, value in update["changes"].items():
+                    setattr(instance, field, value)
+                instance.updated_at = now
+                groups[tuple(sorted(update["changes"]))].append(instance)
+
+            source = None
+            if rescore:
+                instances = [targets[update["id"]] for update in updates]
+                records = [
+                    {
+                        **{name: getattr(instance, name) for name in FEATURE_COLUMNS},
+                        "loans": [loan.loan_type for loan in instance.loans.all()],
+                    }
+                    for instance in instances
+                ]
+                start = time.perf_counter()
+                scores, source = score_records(model, records)
+                seconds = time.perf_counter() - start
+                version = registry.version(model_name)
+                history.record([instance.pk for instance in instances], records, scores, source, seconds, version)
+                for instance, score in zip(instances, scores):
+                    instance.credit_score = str(score)
+                    instance.score_source = source
+
+            for fields, instances in groups.items():
+                fields = {*fields, "updated_at", *(["credit_score", "score_source"] if rescore else [])}
+                CreditParameters.objects.bulk_update(instances, sorted(fields), batch_size=BULK_UPDATE_BATCH_SIZE)
+            invalidate_credit_parameters(*targets)
+
+        logger.info(f"Bulk updated {len(updates)} credit parameters in {len(groups)} field groups")
+        return Response({"updated": len(updates), "rescored": len(updates) if rescore else 0, "score_source": source})
+
+    @action(detail=False, methods=["post"], url_path="validate")
+    def validate_batch(self, request):
+        """
+        Validate a list of credit parameter records without saving or scoring them.
+
+        Every record is checked in one pass and all of its errors are reported, keyed by the
+        record's position in the list: ``{"valid": 2, "invalid": 1, "errors": {"1": {...}}}``.
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError({"non_field_errors": "Expected a list of records."})
+        if len(rows) > BATCH_VALIDATE_LIMIT:
+            raise ValidationError(
+                {"non_field_errors": f"Ensure this list has no more than {BATCH_VALIDATE_LIMIT} records."}
+            )
+
+        _, errors = compile_validator(CreditParametersSerializer).validate(rows)
+        logger.info(f"Validated {len(rows)} credit parameters, {len(errors)} invalid")
+        return Response({"valid": len(rows) - len(errors), "invalid": len(errors), "errors": errors})
+
+    def _scoring_model(self):
+        """Name of the registry model that scores this request, see calculate.scoring.registry"""
+        try:
+            return registry.route(self.request.headers)
+        except UnknownModel as e:
+            raise ValidationError({"model": f"{e}."})
+
+    @action(detail=False, methods=["post"], url_path="what-if")
+    def what_if(self, request):
+        """
+        Score one applicant over a grid of numerical feature values, without saving anything.
+
+        The body is ``{"applicant": {...}, "grid": {"credit_utilization_ratio": [10, 50, 90],
+        "outstanding_debt": {"start": 0, "stop": 5000, "num": 50}}}``. Every combination is scored
+        in one predict call. ``scores`` is nested like the grid, in the order of ``axes``, and holds
+        indexes into ``labels``.
+        """
+        serializer = CreditParametersWhatIfSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        applicant, axes = serializer.validated_data["applicant"], serializer.validated_data["grid"]
+        model = self._scoring_model()
+
+        with scoring_admission.admit():
+            start = time.perf_counter()
+            scores, source, values = score_grid(registry.get(model), applicant, axes)
+            seconds = time.perf_counter() - start
+        codes, labels = encode_scores(scores, CreditStatus.values)
+        logger.info(f"Scored a what-if grid of {scores.size} points with {source} in {seconds:.3f}s")
+        return Response(
+            {
+                "axes": [{"field": field, "values": axis.tolist()} for (field, _), axis in zip(axes, values)],
+                "labels": labels,
+                "scores": codes.tolist(),
+                "points": scores.size,
+                "score_source": source,
+            }
+        )
+
+    @action(detail=False, methods=["post"], url_path="score", parser_classes=[JSONParser, *TABLE_PARSERS])
+    def score_batch(self, request):
+        """
+        Score many records without saving them.
+
+        A JSON list of records is validated like ``validate`` and answered with
+        ``{"scores": [...], "score_source": ...}``. An Arrow IPC stream or file, or a Parquet file,
+        is read as a table (see calculate.columnar) and answered with an Arrow IPC stream of its
+        ``id`` column, if it has one, and a ``credit_score`` column.
+        """
+        model = self._scoring_model()
+        if columnar.is_table(request.data):
+            table = request.data
+            if len(table) > COLUMNAR_SCORE_LIMIT:
+                raise ValidationError(
+                    {"non_field_errors": f"Ensure the table has no more than {COLUMNAR_SCORE_LIMIT} rows."}
+                )
+            with scoring_admission.admit():
+                start = time.perf_counter()
+                try:
+                    scores, source = columnar.score_table(registry.get(model), table)
+                except columnar.ColumnarError as e:
+                    raise ValidationError({"non_field_errors": str(e)})
+                seconds = time.perf_counter() - start
+            logger.info(f"Scored a table of {len(table)} rows with {source} in {seconds:.3f}s")
+            body = columnar.write_table(columnar.scores_table(table, scores, source), columnar.ARROW_STREAM)
+            return HttpResponse(body, content_type=columnar.ARROW_STREAM)
+
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError({"non_field_errors": "Expected a list of records."})
+        if len(rows) > BATCH_SCORE_LIMIT:
+            raise ValidationError(
+                {"non_field_errors": f"Ensure this list has no more than {BATCH_SCORE_LIMIT} records."}
+            )
+        records, errors = compile_validator(CreditParametersSerializer).validate(rows)
+        if errors:
+            raise ValidationError({"errors": errors})
+        with scoring_admission.admit():
+            start = time.perf_counter()
+            scores, source = score_records(registry.get(model), records)
+            seconds = time.perf_counter() - start
+        logger.info(f"Scored {len(records)} records with {source} in {seconds:.3f}s")
+        return Response({"scores": [str(score) for score in scores], "score_source": source})
+
+    @staticmethod
+    def _normalise_pk(pk):
+        try:
+            return str(uuid.UUID(str(pk)))
+        except ValueError:
+            return None
+
     def perform_create(self, serializer):
         logger.info("Starting credit score prediction for new parameters")
+        model = self._scoring_model()
         try:
-            filename = "credit_model.sav"
-            
-            if not os.path.exists(filename):
-                logger.error(f"Model file not found: {filename}")
-                raise FileNotFoundError(f"Model file {filename} not found")
-            
-            logger.info(f"Loading credit model from {filename}")
-            model = pickle.load(open(filename, "rb"))
-            
             # Check if we need to create a user
             user_email = self.request.data.get('user')
             user_obj = None
@@ -69,15 +389,12 @@ class CreditParametersViewSet(viewsets.ModelViewSet):
             # Try to get existing user or create new one
             if user_email:
                 try:
-                    user_obj = User.objects.get(email=user_email)
+                    user_obj = User.objects.get(email=user_email, deleted__isnull=True)
                     logger.info(f"Using existing user with email {user_email}, ID: {user_obj.id}")
                 except User.DoesNotExist:
                     logger.info(f"Creating new user with email: {user_email}")
                     # Extract name from the form data
-                    name = self.request.data.get('name', '')
-                    name_parts = name.split(' ', 1)
-                    first_name = name_parts[0] if len(name_parts) > 0 else 'User'
-                    last_name = name_parts[1] if len(name_parts) > 1 else ''
+                    first_name, last_name = split_name(self.request.data.get('name', ''))
                     
                     user_obj = User.objects.create_user(
                         email=user_email,
@@ -95,70 +412,33 @@ class CreditParametersViewSet(viewsets.ModelViewSet):
             user_id = user_obj.id
             logger.info(f"Predicting credit score for user: {user_id}")
             
-            # Convert data to DataFrame with correct column names for the model
-            # Map our field names to the training data column names
-            model_data = {
-                'Name': data.get('name'),
-                'Occupation': data.get('occupation'),
-                'Delay_from_due_date': data.get('delay_from_due_date'),
-                'Credit_Mix': data.get('credit_mix'),
-                'Payment_of_Min_Amount': data.get('payment_of_minimum_amount'),
-                'Payment_Behaviour': data.get('payment_behaviour'),
-                'Changed_Credit_Limit': data.get('changed_credit_limit'),
-                'Age': float(data.get('age')),
-                'Annual_Income': float(data.get('annual_income')),
-                'Monthly_Inhand_Salary': float(data.get('monthly_in_hand_salary')),
-                'Num_Bank_Accounts': float(data.get('number_of_bank_accounts')),
-                'Num_Credit_Card': float(data.get('number_of_credit_cards')),
-                'Interest_Rate': float(data.get('interest_rate')),
-                'Num_of_Loan': float(data.get('number_of_loans')),
-                'Num_of_Delayed_Payment': float(data.get('number_of_delayed_payment')),
-                'Num_Credit_Inquiries': float(data.get('num_credit_inquiries')),
-                'Outstanding_Debt': float(data.get('outstanding_debt')),
-                'Credit_Utilization_Ratio': float(data.get('credit_utilization_ratio')),
-                'Total_EMI_per_month': float(data.get('total_emi_per_month')),
-                'Amount_invested_monthly': float(data.get('amount_invested_monthly')),
-                'Monthly_Balance': float(data.get('monthly_balance'))
-            }
-            
-            # Create DataFrame with single row
-            df = pd.DataFrame([model_data])
-            logger.info(f"Prepared data for prediction: {df.shape}")
-            
-            try:
-                credit_prediction = model.predict(df)
-                # Get the first prediction result
-                credit_score = credit_prediction[0] if len(credit_prediction) > 0 else "standard"
-            except ValueError as ve:
-                # Model expects preprocessed data with different feature count
-                # This happens because the saved model doesn't include the preprocessing pipeline
-                logger.warning(f"Model prediction failed (likely missing preprocessor): {str(ve)}")
-                logger.info("Using rule-based fallback for credit score prediction")
-                
-                # Simple rule-based fallback
-                # Calculate a basic score based on key factors
-                credit_util = float(data.get('credit_utilization_ratio', 0))
-                delayed_payments = int(data.get('number_of_delayed_payment', 0))
-                credit_mix = str(data.get('credit_mix', '')).lower()
-                
-                if delayed_payments > 10 or credit_util > 80:
-                    credit_score = "poor"
-                elif delayed_payments <= 2 and credit_util < 30 and credit_mix in ['good', 'standard']:
-                    credit_score = "good"
-                else:
-                    credit_score = "standard"
-                
+            # Score a copy of the data within the latency budget, falling back to the rule engine
+            inputs = dict(data)
+            start = time.perf_counter()
+            scores, source, late = score_within(registry.loader(model), [inputs])
+            seconds = time.perf_counter() - start
+            credit_score = str(scores[0])
+            if source == "rules":
+                # The saved model doesn't include the preprocessing pipeline, so it rejects the raw features
+                logger.warning("Model prediction failed (likely missing preprocessor)")
                 logger.info(f"Fallback prediction: {credit_score}")
+            elif source == "deadline":
+                logger.info(f"Deadline fallback prediction: {credit_score}, the model result will be reconciled")
             
             logger.info(
-                f"User {user_id} has a predicted credit score of {credit_score}"
+                f"User {user_id} has a predicted credit score of {credit_score} from model {model}"
             )
             
             with transaction.atomic():
                 data["credit_score"] = credit_score
                 # Always pass user object explicitly
                 try:
-                    serializer.save(user=user_obj)
+                    serializer.save(user=user_obj, score_source=source)
+                    history.record(
+                        [serializer.instance.pk], [inputs], scores, source, seconds, registry.version(model)
+                    )
+                    if late is not None:
+                        reconcile_later(serializer.instance.pk, late, inputs, model)
                     logger.info(f"Successfully saved credit parameters for user {user_id}")
                 except IntegrityError:
                     logger.error(f"Integrity error: User {user_id} already has credit parameters")
@@ -179,7 +459,7 @@ class CreditParametersViewSet(viewsets.ModelViewSet):
             user_email = self.request.data.get('user')
             if user_email:
                 try:
-                    user_obj = User.objects.get(email=user_email)
+                    user_obj = User.objects.get(email=user_email, deleted__isnull=True)
                     logger.info(f"Updating with existing user email: {user_email}")
                     serializer.save(user=user_obj)
                 except User.DoesNotExist:
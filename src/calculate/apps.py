@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CalculateConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "calculate"
+
+    def ready(self):
+        from calculate import signals  # noqa: F401
+        from calculate.scoring.registry import registry
+
+        # A bad route fails the deploy rather than every request it matches
+        registry.check_routes()
+
+        if settings.CREDIT_MODEL_PRELOAD:
+            from calculate.scoring import loader, prediction_cache
+
+            # Created before gunicorn forks, so the workers share one cache
+            prediction_cache.shared()
+            loader.warm()
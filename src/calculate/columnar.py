@@ -0,0 +1,308 @@
+"""
+Columnar batch scoring: Arrow IPC or Parquet tables in, an Arrow column of scores out.
+
+A table's columns are matched to the feature schema by CreditParameters field name. Numerical
+columns are cast to float64 by Arrow and the selected columns become the model input frame in one
+conversion, with text left in Arrow-backed string columns, so no Python object is built per row.
+Numerical columns that arrive as text, as in the raw credit_data.csv, are parsed by clean_frame
+like any request. Loan type counts are read from columns named like the LOAN_TYPE_FEATURES keys
+and count zero when absent. Other columns are ignored, except ``id``, which is copied next to the
+scores so they can be joined back.
+
+score_file scores a file a batch at a time. Offline it only writes the scores to another file;
+otherwise the scores are also written to the live CreditParameters records named by ``id``,
+with their score history, where the row's features are the record's.
+
+pyarrow is optional: without it tables cannot be read. It and numpy are imported by the functions
+that need them, so the API imports this module at startup without loading either.
+"""
+import decimal
+import importlib.util
+import logging
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from calculate.scoring.features import FEATURE_COLUMNS, LOAN_TYPE_FEATURES, NUMERICAL_FEATURES
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("columnar")
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+PARQUET = "application/vnd.apache.parquet"
+ID_COLUMN = "id"
+SCORE_COLUMN = "credit_score"
+# Batches of a file scored, and written to the database, together
+DEFAULT_BATCH_SIZE = 10_000
+
+
+class ColumnarError(ValueError):
+    """A table that cannot be read or scored"""
+
+
+def available():
+    """Whether pyarrow is installed, without importing it"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def is_table(data):
+    """Whether ``data`` is a pyarrow Table; pyarrow is already imported if it is one"""
+    pa = sys.modules.get("pyarrow")
+    return pa is not None and isinstance(data, pa.Table)
+
+
+def _require_pyarrow():
+    if not available():
+        raise ColumnarError("Arrow and Parquet input need pyarrow, which is not installed")
+
+
+def media_type(path):
+    """PARQUET for a ``.parquet`` path, ARROW_FILE for any other"""
+    return PARQUET if Path(path).suffix.lower() in (".parquet", ".pq") else ARROW_FILE
+
+
+def read_table(data, media_type):
+    """Read the Arrow IPC stream or file, or the Parquet file, in the bytes ``data``"""
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        if media_type == PARQUET:
+            return pq.read_table(pa.BufferReader(data))
+        if media_type == ARROW_FILE:
+            return pa.ipc.open_file(data).read_all()
+        return pa.ipc.open_stream(data).read_all()
+    except (pa.ArrowException, OSError) as e:
+        raise ColumnarError(f"Cannot read the table: {e}")
+
+
+def write_table(table, media_type):
+    """The bytes of ``table`` as an Arrow IPC stream or file, or a Parquet file"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    if media_type == PARQUET:
+        pq.write_table(table, sink)
+    else:
+        writer = pa.ipc.new_file if media_type == ARROW_FILE else pa.ipc.new_stream
+        with writer(sink, table.schema) as out:
+            out.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _feature(column, numerical):
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    if numerical and (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+        column = column.cast(pa.float64())
+    elif numerical and pa.types.is_decimal(column.type):
+        # Decimal to float casts check for precision loss, which cents cannot matter to here
+        column = column.cast(pa.float64(), safe=False)
+    return column
+
+
+def table_frame(table):
+    """
+    The model input frame of an Arrow table or record batch, as build_frame returns for records.
+    Raises ColumnarError when feature columns are missing.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    missing = [name for name in FEATURE_COLUMNS if name not in table.schema.names]
+    if missing:
+        raise ColumnarError(f"Missing columns: {', '.join(missing)}.")
+    features = pa.table(
+        {column: _feature(table[name], name in NUMERICAL_FEATURES) for name, column in FEATURE_COLUMNS.items()}
+    )
+    frame = features.to_pandas()
+    for name, column in LOAN_TYPE_FEATURES.items():
+        if name in table.schema.names:
+            counts = pc.fill_null(_feature(table[name], numerical=True).cast(pa.float64()), 0.0)
+            frame[column] = counts.to_numpy()
+        else:
+            frame[column] = 0.0
+    return frame
+
+
+def scores_table(table, scores, source):
+    """The ``id`` column of ``table``, if it has one, and the scores, with the score source in the metadata"""
+    import numpy as np
+    import pyarrow as pa
+
+    columns = {}
+    if ID_COLUMN in table.schema.names:
+        columns[ID_COLUMN] = table[ID_COLUMN]
+    columns[SCORE_COLUMN] = pa.array(np.asarray(scores).astype(str), type=pa.string())
+    return pa.table(columns, metadata={"score_source": source})
+
+
+def score_table(model, table, observe=True):
+    """Score the rows of an Arrow table or record batch, returning ``(scores, source)`` as score_records does"""
+    from calculate.scoring.loader import score_frame
+
+    scores, source = score_frame(model, table_frame(table), observe)
+    metrics.incr("rows", len(table))
+    return scores, source
+
+
+def _batches(path, batch_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if media_type(path) == PARQUET:
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+        return
+    try:
+        reader = pa.ipc.open_file(path)
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        batches = iter(pa.ipc.open_stream(pa.OSFile(str(path))))
+    # Batches are sliced to batch_size, whatever size their writer chose
+    for batch in batches:
+        for offset in range(0, len(batch), batch_size):
+            yield batch.slice(offset, batch_size)
+
+
+def _writer(path, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if media_type(path) == PARQUET:
+        return pq.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+
+def _record_id(value):
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def _canonical(record):
+    """
+    The features of a record dict as CreditParameters stores them, with ``loans`` as sorted loan
+    types, so equal inputs hash equal whatever their types in a file. None if a value is invalid.
+    """
+    from django.core.exceptions import ValidationError
+
+    from calculate.models import CreditParameters
+
+    values = {}
+    for name in FEATURE_COLUMNS:
+        field = CreditParameters._meta.get_field(name)
+        try:
+            value = field.to_python(record.get(name))
+            if isinstance(value, decimal.Decimal):
+                value = value.quantize(decimal.Decimal(1).scaleb(-field.decimal_places))
+        except (ValidationError, decimal.InvalidOperation):
+            return None
+        values[name] = value
+    values["loans"] = sorted(record.get("loans") or ())
+    return values
+
+
+def _table_records(table):
+    """The rows of ``table`` as record dicts, with loans from the loan type count columns"""
+    counts = [name for name in LOAN_TYPE_FEATURES if name in table.schema.names]
+    records = table.select([name for name in FEATURE_COLUMNS if name in table.schema.names]).to_pylist()
+    for record, row in zip(records, table.select(counts).to_pylist()):
+        record["loans"] = [name for name in counts for _ in range(int(row[name] or 0))]
+    return records
+
+
+def apply_scores(table, scores, source, seconds, model_version=None):
+    """
+    Write the scores of ``table`` to the live CreditParameters records named by its ``id`` column,
+    with one UPDATE per distinct score, and record their score history. Rows naming no live
+    record, or whose features are not the record's (see history.inputs_hash), are skipped, so a
+    record is never given a score for other inputs. Returns the number of records written.
+    """
+    import numpy as np
+    from django.db import transaction
+    from django.utils import timezone
+
+    from calculate.api.caching import invalidate_credit_parameters
+    from calculate.models import CreditLoans, CreditParameters
+    from calculate.scoring import history
+
+    if ID_COLUMN not in table.schema.names:
+        raise ColumnarError(f"Scores are written to the records named by an {ID_COLUMN!r} column.")
+    ids = np.array([_record_id(value) for value in table[ID_COLUMN].to_pylist()], dtype=object)
+    scores = np.asarray(scores).astype(str)
+    with transaction.atomic():
+        candidates = [pk for pk in ids if pk is not None]
+        stored = {
+            str(values.pop("id")): {**values, "loans": []}
+            for values in CreditParameters.objects.filter(pk__in=candidates).values("id", *FEATURE_COLUMNS)
+        }
+        loans = CreditLoans.objects.filter(credit_check_id__in=list(stored)).values_list("credit_check_id", "loan_type")
+        for pk, loan_type in loans:
+            stored[str(pk)]["loans"].append(loan_type)
+        # The inputs hash each record was last scored on, compared with its row's
+        hashes = {pk: history.inputs_hash(_canonical(values)) for pk, values in stored.items()}
+        records = [_canonical(record) for record in _table_records(table)]
+        written = np.array(
+            [
+                pk in hashes and record is not None and history.inputs_hash(record) == hashes[pk]
+                for pk, record in zip(ids, records)
+            ],
+            dtype=bool,
+        )
+        stale = sum(pk in hashes for pk in ids) - int(written.sum())
+        if stale:
+            metrics.incr("stale_rows", stale)
+            logger.warning(f"Skipped {stale} rows whose features differ from their credit parameter records")
+        now = timezone.now()
+        for score in np.unique(scores[written]):
+            CreditParameters.objects.filter(pk__in=ids[written & (scores == score)].tolist()).update(
+                credit_score=score, score_source=source, updated_at=now
+            )
+        indexes = np.flatnonzero(written)
+        scored = [records[index] for index in indexes]
+        history.record(ids[indexes].tolist(), scored, scores[indexes], source, seconds, model_version)
+        invalidate_credit_parameters(*ids[indexes].tolist())
+    return len(indexes)
+
+
+def score_file(model, source, target, batch_size=DEFAULT_BATCH_SIZE, offline=False, model_version=None):
+    """
+    Score the Arrow IPC or Parquet file ``source`` batch by batch and write scores_table to
+    ``target``, in the format its extension names. Unless ``offline``, the scores are also
+    written with apply_scores. Returns ``(rows, written)``, the rows scored and records written.
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+
+    rows = written = 0
+    writer = None
+    try:
+        for batch in _batches(source, batch_size):
+            start = time.perf_counter()
+            scores, source_name = score_table(model, batch)
+            seconds = time.perf_counter() - start
+            table = scores_table(batch, scores, source_name)
+            if writer is None:
+                writer = _writer(target, table.schema)
+            writer.write_table(table)
+            if not offline:
+                written += apply_scores(batch, scores, source_name, seconds, model_version)
+            rows += len(batch)
+            logger.info(f"Scored {rows} rows of {source} with {source_name}")
+        if writer is None:
+            # An empty source still gives a target, with no scores
+            writer = _writer(target, pa.schema([(SCORE_COLUMN, pa.string())]))
+    except pa.ArrowInvalid as e:
+        raise ColumnarError(f"Cannot read {source}: {e}")
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, written
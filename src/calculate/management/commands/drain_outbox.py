@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from calculate import outbox
+
+
+class Command(BaseCommand):
+    help = "Write every due write-behind outbox entry to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        processed = outbox.drain(options["batch_size"])
+        stats = outbox.stats()
+        summary = f"Processed {processed} outbox entries, {stats['pending']} pending, {stats['failed']} failed"
+        self.stdout.write(self.style.SUCCESS(summary))
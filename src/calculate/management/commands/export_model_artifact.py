@@ -0,0 +1,33 @@
+import pickle
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from calculate.scoring.artifact import ArtifactError, export_model
+from calculate.scoring.cleaning import load_training_data
+from calculate.scoring.features import FEATURE_COLUMNS
+
+
+class Command(BaseCommand):
+    help = "Convert a trusted pickled credit model into a memory-mappable model artifact directory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Directory to write manifest.json and the .npy arrays to")
+        parser.add_argument("--model", default=settings.CREDIT_MODEL_PATH, help="Pickled model to convert")
+        parser.add_argument(
+            "--training-data", help="credit_data.csv the model was trained on, for the input drift reference"
+        )
+
+    def handle(self, *args, **options):
+        with open(options["model"], "rb") as file:
+            model = pickle.load(file)
+        training_data = None
+        if options["training_data"]:
+            training_data = load_training_data(options["training_data"], usecols=list(FEATURE_COLUMNS.values()))
+        try:
+            manifest = export_model(model, options["output"], training_data)
+        except ArtifactError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {manifest['estimator']} artifact {manifest['version']} to {options['output']}")
+        )
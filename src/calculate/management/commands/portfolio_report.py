@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from calculate.portfolio import DEFAULT_CHUNK_SIZE, aggregate
+
+
+class Command(BaseCommand):
+    help = "Print portfolio risk aggregates over every credit parameter record, computed in one streaming pass"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Processes folding key ranges in parallel")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        report = aggregate(workers=options["workers"], chunk_size=options["chunk_size"])
+        self.stdout.write(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Aggregated {report['count']} credit parameter records"))
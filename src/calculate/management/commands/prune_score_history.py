@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from calculate.scoring.history import ensure_partitions, prune
+
+
+class Command(BaseCommand):
+    help = "Drop scoring history older than the retention period and create upcoming partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CREDIT_SCORE_EVENT_RETENTION_DAYS)
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        created = ensure_partitions()
+        dropped, deleted = prune(timezone.now() - timedelta(days=options["days"]), options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ensured {len(created)} partitions, dropped {len(dropped)} partitions and deleted {deleted} rows"
+            )
+        )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculate import columnar
+from calculate.scoring.registry import DEFAULT, UnknownModel, registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Score an Arrow IPC or Parquet file batch by batch and write the scores to another one, and to the records "
+        "named by its id column unless --offline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Arrow IPC or Parquet (.parquet) file of credit parameters")
+        parser.add_argument("target", help="Scores file, Parquet for a .parquet path and Arrow IPC otherwise")
+        parser.add_argument("--model", default=DEFAULT, help="Name of the registry model to score with")
+        parser.add_argument("--batch-size", type=int, default=columnar.DEFAULT_BATCH_SIZE)
+        parser.add_argument("--offline", action="store_true", help="Only write the target file, not the database")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            model = registry.get(options["model"])
+            rows, written = columnar.score_file(
+                model,
+                options["source"],
+                options["target"],
+                batch_size=options["batch_size"],
+                offline=options["offline"],
+                model_version=registry.version(options["model"]),
+            )
+        except (UnknownModel, columnar.ColumnarError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        seconds = time.perf_counter() - start
+        summary = f"Scored {rows} rows in {seconds:.1f}s"
+        if not options["offline"]:
+            summary += f", wrote {written} credit parameter records"
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from calculate.api.caching import invalidate_credit_parameters
+from calculate.synthetic import DEFAULT_BATCH_SIZE, load
+
+
+class Command(BaseCommand):
+    help = "Insert synthetic users and credit parameters drawn from the training data marginals, for load tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("rows", type=int, help="Number of users, each with one credit parameters record")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--seed", type=int, default=0, help="Same seed and batch size, same rows")
+        parser.add_argument("--method", choices=["auto", "copy", "bulk_create"], default="auto")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            rows = load(options["rows"], options["batch_size"], options["seed"], options["method"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        except IntegrityError as e:
+            raise CommandError(f"Rows of seed {options['seed']} are already loaded, use another --seed: {e}")
+        invalidate_credit_parameters()
+        seconds = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f"Inserted {rows} synthetic credit parameters in {seconds:.1f}s ({rows / seconds:.0f}/s)")
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.5 on 2026-10-19 10:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("calculate", "0004_remove_credit_history_age"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="creditparameters",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="created at",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="creditparameters",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="updated at"),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.5 on 2026-10-19 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("calculate", "0006_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="creditparameters",
+            name="score_source",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("model", "Model"),
+                    ("rules", "Rule engine"),
+                    ("deadline", "Rule engine, model over its latency budget"),
+                ],
+                max_length=20,
+                null=True,
+                verbose_name="score source",
+            ),
+        ),
+    ]
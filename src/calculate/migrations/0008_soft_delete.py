@@ -0,0 +1,33 @@
+# Generated by Django 4.1.5 on 2026-10-19 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("calculate", "0007_creditparameters_score_source"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="creditloans",
+            name="deleted",
+            field=models.DateTimeField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="creditloans",
+            name="deleted_by_cascade",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="creditparameters",
+            name="deleted",
+            field=models.DateTimeField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="creditparameters",
+            name="deleted_by_cascade",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.1.5 on 2026-10-19 10:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+TABLE = "calculate_creditscoreevent"
+
+# On PostgreSQL the table is range partitioned by month on scored_at. Rows outside the monthly
+# partitions created by calculate.scoring.history land in the default partition.
+POSTGRES_SQL = [
+    f"""
+    CREATE TABLE {TABLE} (
+        id bigserial NOT NULL,
+        credit_parameters_id uuid NOT NULL,
+        inputs_hash varchar(64) NOT NULL,
+        model_version varchar(64) NOT NULL,
+        score varchar(20) NOT NULL,
+        source varchar(20) NOT NULL,
+        latency_ms double precision NOT NULL,
+        scored_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, scored_at)
+    ) PARTITION BY RANGE (scored_at)
+    """,
+    f"CREATE INDEX {TABLE}_scored_at_brin ON {TABLE} USING brin (scored_at)",
+    f"CREATE INDEX {TABLE}_credit_parameters_id ON {TABLE} (credit_parameters_id)",
+    f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT",
+]
+
+
+def create_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(apps.get_model("calculate", "CreditScoreEvent"))
+        return
+    for sql in POSTGRES_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_table(apps, schema_editor):
+    # Dropping the partitioned table drops its partitions too
+    schema_editor.delete_model(apps.get_model("calculate", "CreditScoreEvent"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("calculate", "0008_soft_delete"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="CreditScoreEvent",
+                    fields=[
+                        ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                        ("inputs_hash", models.CharField(max_length=64)),
+                        ("model_version", models.CharField(blank=True, max_length=64)),
+                        (
+                            "score",
+                            models.CharField(
+                                choices=[
+                                    ("poor", "Poor Credit"),
+                                    ("standard", "Standard Credit"),
+                                    ("good", "Good Credit"),
+                                ],
+                                max_length=20,
+                            ),
+                        ),
+                        (
+                            "source",
+                            models.CharField(
+                                choices=[
+                                    ("model", "Model"),
+                                    ("rules", "Rule engine"),
+                                    (
+                                        "deadline",
+                                        "Rule engine, model over its latency budget",
+                                    ),
+                                ],
+                                max_length=20,
+                            ),
+                        ),
+                        ("latency_ms", models.FloatField()),
+                        (
+                            "scored_at",
+                            models.DateTimeField(default=django.utils.timezone.now),
+                        ),
+                        (
+                            "credit_parameters",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="score_events",
+                                to="calculate.creditparameters",
+                            ),
+                        ),
+                    ],
+                ),
+            ],
+        ),
+        migrations.RunPython(create_table, drop_table),
+    ]
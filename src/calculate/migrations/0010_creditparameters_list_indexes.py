@@ -0,0 +1,61 @@
+# Generated by Django 4.1.5 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("calculate", "0009_creditscoreevent"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="creditparameters",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["age", "id"],
+                name="credit_age_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="creditparameters",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["annual_income", "id"],
+                name="credit_income_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="creditparameters",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["created_at", "id"],
+                name="credit_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="creditparameters",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["credit_score", "age", "id"],
+                name="credit_score_age_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="creditparameters",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["credit_score", "annual_income", "id"],
+                name="credit_score_income_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="creditparameters",
+            index=models.Index(
+                condition=models.Q(("deleted__isnull", True)),
+                fields=["occupation", "age", "id"],
+                name="credit_occupation_age_idx",
+            ),
+        ),
+    ]
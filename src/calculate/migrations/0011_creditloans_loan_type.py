@@ -0,0 +1,47 @@
+# Generated by Django 4.1.5 on 2026-10-19 11:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("calculate", "0010_creditparameters_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="creditloans",
+            options={"ordering": ["id"]},
+        ),
+        migrations.AlterField(
+            model_name="creditloans",
+            name="credit_check",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="loans",
+                to="calculate.creditparameters",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="creditloans",
+            name="loan_type",
+            field=models.CharField(
+                choices=[
+                    ("auto_loan", "Auto Loan"),
+                    ("credit_builder_loan", "Credit Builder Loan"),
+                    ("personal_loan", "Personal Loan"),
+                    ("home_equity_loan", "Home Equity Loan"),
+                    ("mortgage_loan", "Mortgage Loan"),
+                    ("student_loan", "Student Loan"),
+                    ("debt_consolidation_loan", "Debt Consolidation Loan"),
+                    ("payday_loan", "Payday Loan"),
+                    ("non_specified_loan", "Not Specified"),
+                ],
+                default="non_specified_loan",
+                max_length=30,
+                verbose_name="loan type",
+            ),
+        ),
+    ]
@@ -1,9 +1,14 @@
 import uuid
 import logging
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from safedelete import HARD_DELETE
+from safedelete.models import SafeDeleteModel
 
+from helpers.base_model import BaseModel
 from users.models import User
 
 logger = logging.getLogger("credit_models")
@@ -15,6 +20,12 @@ class CreditStatus(models.TextChoices):
     GOOD = "good", _("Good Credit")
 
 
+class ScoreSource(models.TextChoices):
+    MODEL = "model", _("Model")
+    RULES = "rules", _("Rule engine")
+    DEADLINE = "deadline", _("Rule engine, model over its latency budget")
+
+
 class PaymentBehaviour(models.TextChoices):
     LSSV = "low_spend_small_value_payments", _("Low Spend and small value payments")
     LSMV = "low_spend_medium_value_payments", _("Low Spend and medium value payments")
@@ -24,7 +35,10 @@ class PaymentBehaviour(models.TextChoices):
     HSLV = "high_spend_large_value_payments", _("High Spend and large value payments")
 
 
-class CreditParameters(models.Model):
+class CreditParameters(SafeDeleteModel, BaseModel):
+    # Deleting a record directly removes it, soft deletion only happens by cascade from its User
+    _safedelete_policy = HARD_DELETE
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
@@ -62,6 +76,42 @@ class CreditParameters(models.Model):
         blank=True,
         null=True,
     )
+    score_source = models.CharField(
+        max_length=20,
+        choices=ScoreSource.choices,
+        verbose_name="score source",
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        # One index per sort key of calculate.api.filtering, plus the filter columns in front of the
+        # sorts they are combined with. They are partial like the live-user email constraint, so they
+        # only hold live rows and serve every "... AND deleted IS NULL" query the default manager runs
+        indexes = [
+            models.Index(fields=["age", "id"], condition=models.Q(deleted__isnull=True), name="credit_age_idx"),
+            models.Index(
+                fields=["annual_income", "id"], condition=models.Q(deleted__isnull=True), name="credit_income_idx"
+            ),
+            models.Index(
+                fields=["created_at", "id"], condition=models.Q(deleted__isnull=True), name="credit_created_idx"
+            ),
+            models.Index(
+                fields=["credit_score", "age", "id"],
+                condition=models.Q(deleted__isnull=True),
+                name="credit_score_age_idx",
+            ),
+            models.Index(
+                fields=["credit_score", "annual_income", "id"],
+                condition=models.Q(deleted__isnull=True),
+                name="credit_score_income_idx",
+            ),
+            models.Index(
+                fields=["occupation", "age", "id"],
+                condition=models.Q(deleted__isnull=True),
+                name="credit_occupation_age_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
@@ -81,7 +131,9 @@ class CreditParameters(models.Model):
             raise
 
 
-class CreditLoans(models.Model):
+class CreditLoans(SafeDeleteModel):
+    _safedelete_policy = HARD_DELETE
+
     class LoanTypes(models.TextChoices):
         AUTO = "auto_loan", _("Auto Loan")
         CREDIT_BUILDER = "credit_builder_loan", _("Credit Builder Loan")
@@ -93,10 +145,59 @@ class CreditLoans(models.Model):
         PAYDAY = "payday_loan", _("Payday Loan")
         NOT_SPECIFIED = "non_specified_loan", _("Not Specified")
 
-    credit_check = models.ForeignKey(CreditParameters, on_delete=models.CASCADE)
+    credit_check = models.ForeignKey(CreditParameters, on_delete=models.CASCADE, related_name="loans")
     loan_type = models.CharField(
-        max_length=20,
-        choices=CreditStatus.choices,
+        max_length=30,
+        choices=LoanTypes.choices,
         verbose_name="loan type",
         default=LoanTypes.NOT_SPECIFIED,
     )
+
+    class Meta:
+        # Loans are listed in the order they were written, by every read path
+        ordering = ["id"]
+
+
+class IdempotencyKey(BaseModel):
+    """
+    The stored outcome of a request sent with an ``Idempotency-Key`` header.
+
+    A row is inserted before the request is processed, with no status code, and completed with the
+    response afterwards. Rows expire after ``IDEMPOTENCY_KEY_TTL`` seconds. A row still pending at
+    ``locked_until`` was left by a worker that died, and the next retry takes it over.
+    """
+
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_complete(self):
+        return self.status_code is not None
+
+
+class CreditScoreEvent(models.Model):
+    """
+    One scoring of a CreditParameters record, kept as append-only history.
+
+    Events are written in batches by calculate.scoring.history. On PostgreSQL the table is range
+    partitioned by month on ``scored_at`` with a BRIN index, see migration 0009. The reference to
+    the record has no database constraint, so history outlives the records it describes.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    credit_parameters = models.ForeignKey(
+        CreditParameters,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="score_events",
+    )
+    inputs_hash = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=64, blank=True)
+    score = models.CharField(max_length=20, choices=CreditStatus.choices)
+    source = models.CharField(max_length=20, choices=ScoreSource.choices)
+    latency_ms = models.FloatField()
+    scored_at = models.DateTimeField(default=timezone.now)
@@ -0,0 +1,364 @@
+"""
+Durable local outbox for write-behind creates.
+
+With CREDIT_WRITE_BEHIND a create responds as soon as the record is validated and scored. The
+record is appended to a SQLite journal at CREDIT_OUTBOX_PATH, committed with ``synchronous=FULL``
+before the response is sent, and a background thread drains the journal into the database in
+batched transactions.
+
+Delivery is at least once. Entries are claimed with a lease and only removed once their batch has
+committed, so entries of a process that dies mid-batch are claimed again when the lease expires.
+Records get their primary key before they are queued, which makes a replayed create recognisable
+and harmless. An entry that fails because the database cannot be reached is retried until it
+can, with backoff capped at CREDIT_OUTBOX_MAX_BACKOFF seconds; only entries that fail otherwise,
+e.g. on an integrity error, count towards CREDIT_OUTBOX_MAX_ATTEMPTS and are then parked. A user
+has at most one pending create, a second is refused when it is queued. A late model score (see
+calculate.scoring.deadline) is queued as a second entry and applied after the create. Gunicorn
+workers on one host share the journal.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import InterfaceError, OperationalError, close_old_connections, transaction
+from django.utils import timezone
+
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("outbox")
+
+CREATE = "create"
+RECONCILE = "reconcile"
+# Errors of an unreachable database, which say nothing about the entry
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    record_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    user_email TEXT
+)
+"""
+# One pending create per user, so a second create is refused when it is queued rather than parked
+# when it is drained. Journals written before the column existed get it added by _journal.
+PENDING_USER_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS outbox_pending_user ON outbox (user_email) WHERE kind = 'create' AND failed = 0
+"""
+
+
+class NotWrittenYet(Exception):
+    """A late score arrived for a record whose create has not been drained yet"""
+
+
+class AlreadyQueued(Exception):
+    """A create is already queued for the user"""
+
+
+@dataclass
+class Entry:
+    id: str
+    record_id: str
+    kind: str
+    payload: dict
+    attempts: int
+
+
+def _path():
+    return str(getattr(settings, "CREDIT_OUTBOX_PATH", "outbox.sqlite3"))
+
+
+@contextmanager
+def _journal():
+    # A connection per operation keeps the journal safe across threads and forked workers
+    connection = sqlite3.connect(_path(), timeout=30, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.execute(SCHEMA)
+        if "user_email" not in {column[1] for column in connection.execute("PRAGMA table_info(outbox)")}:
+            try:
+                connection.execute("ALTER TABLE outbox ADD COLUMN user_email TEXT")
+            except sqlite3.OperationalError:
+                # Another worker added it first
+                pass
+        connection.execute(PENDING_USER_INDEX)
+        yield connection
+    finally:
+        connection.close()
+
+
+def _append(entry_id, record_id, kind, payload, user_email=None):
+    now = time.time()
+    # A replaced create would drop another user's pending create on PENDING_USER_INDEX
+    insert = "INSERT" if kind == CREATE else "INSERT OR REPLACE"
+    with _journal() as journal:
+        try:
+            journal.execute(
+                f"{insert} INTO outbox (id, record_id, kind, payload, enqueued_at, available_at, user_email) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry_id, record_id, kind, json.dumps(payload, cls=DjangoJSONEncoder), now, now, user_email),
+            )
+        except sqlite3.IntegrityError:
+            raise AlreadyQueued(f"A create is already queued for user with email '{user_email}'.")
+    metrics.incr(f"enqueued_{kind}")
+    _wake_worker()
+
+
+def enqueue(record_id, email, name, fields, seconds, late=None, model="default"):
+    """
+    Queue the create of CreditParameters ``record_id`` with the validated and scored ``fields``.
+
+    The user is resolved from ``email`` and ``name`` when the entry is drained. ``seconds`` is the
+    scoring latency and ``model`` the registry model that scored it, for the scoring history. A
+    still running model Future in ``late`` queues the model's score once it arrives. Raises
+    AlreadyQueued if a create for ``email`` is still pending.
+    """
+    from calculate.scoring.registry import registry
+    from users.models import User
+
+    record_id = str(record_id)
+    payload = {
+        "user": email,
+        "name": name,
+        "fields": fields,
+        "seconds": seconds,
+        "model_version": registry.version(model),
+    }
+    _append(record_id, record_id, CREATE, payload, User.objects.normalize_email(email))
+    if late is not None:
+        late.add_done_callback(lambda future: _enqueue_late(record_id, fields, future, model))
+
+
+def _enqueue_late(record_id, fields, future, model):
+    from calculate.scoring.registry import registry
+
+    try:
+        scores, source, seconds = future.result()
+    except Exception as e:
+        metrics.incr("late_failures")
+        logger.error(f"Late model score for credit parameter {record_id} failed: {str(e)}", exc_info=True)
+        return
+    payload = {
+        "credit_score": str(scores[0]),
+        "score_source": source,
+        "seconds": seconds,
+        "fields": fields,
+        "model_version": registry.version(model),
+    }
+    _append(f"{record_id}:{RECONCILE}", record_id, RECONCILE, payload)
+
+
+def _claim(limit, lease):
+    now = time.time()
+    with _journal() as journal:
+        journal.execute("BEGIN IMMEDIATE")
+        try:
+            rows = journal.execute(
+                "SELECT id, record_id, kind, payload, attempts FROM outbox "
+                "WHERE failed = 0 AND available_at <= ? ORDER BY enqueued_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            journal.executemany("UPDATE outbox SET available_at = ? WHERE id = ?", [(now + lease, r[0]) for r in rows])
+            journal.execute("COMMIT")
+        except BaseException:
+            journal.execute("ROLLBACK")
+            raise
+    return [
+        Entry(entry_id, record_id, kind, json.loads(payload), attempts)
+        for entry_id, record_id, kind, payload, attempts in rows
+    ]
+
+
+def _complete(entries):
+    with _journal() as journal:
+        journal.executemany("DELETE FROM outbox WHERE id = ?", [(entry.id,) for entry in entries])
+
+
+def _retry(entry, error):
+    attempts = entry.attempts + 1
+    # Entries that keep failing are parked for inspection, unless the database was unreachable
+    transient = isinstance(error, TRANSIENT_ERRORS)
+    failed = not transient and attempts >= getattr(settings, "CREDIT_OUTBOX_MAX_ATTEMPTS", 5)
+    # Exponential backoff from one second
+    backoff = min(2 ** min(entry.attempts, 32), getattr(settings, "CREDIT_OUTBOX_MAX_BACKOFF", 60))
+    available_at = time.time() + backoff
+    with _journal() as journal:
+        journal.execute(
+            "UPDATE outbox SET attempts = ?, failed = ?, last_error = ?, available_at = ? WHERE id = ?",
+            (attempts, int(failed), str(error), available_at, entry.id),
+        )
+    metrics.incr("failed" if failed else "retried")
+    log = logger.error if failed else logger.warning
+    log(f"Outbox {entry.kind} of credit parameter {entry.record_id} failed (attempt {attempts}): {error}")
+
+
+def _write(entries):
+    """Apply ``entries`` to the database in one transaction"""
+    from calculate.api.caching import invalidate_credit_parameters
+    from calculate.models import CreditLoans, CreditParameters, ScoreSource
+    from calculate.scoring import history
+    from users.models import User
+
+    creates = [entry for entry in entries if entry.kind == CREATE]
+    reconciles = [entry for entry in entries if entry.kind == RECONCILE]
+    with transaction.atomic():
+        ids = [entry.record_id for entry in creates]
+        # A create replayed after its batch committed finds its row already there
+        existing = {str(pk) for pk in CreditParameters.all_objects.filter(pk__in=ids).values_list("pk", flat=True)}
+        fresh = [entry for entry in creates if entry.record_id not in existing]
+        if fresh:
+            users = User.objects.resolve_many([(entry.payload["user"], entry.payload["name"]) for entry in fresh])
+            records = [
+                CreditParameters(
+                    id=entry.record_id,
+                    user=users[User.objects.normalize_email(entry.payload["user"])],
+                    **{
+                        name: CreditParameters._meta.get_field(name).to_python(value)
+                        for name, value in entry.payload["fields"].items()
+                        if name != "loans"
+                    },
+                )
+                for entry in fresh
+            ]
+            CreditParameters.objects.bulk_create(records)
+            CreditLoans.objects.bulk_create(
+                CreditLoans(credit_check=record, loan_type=loan["loan_type"])
+                for entry, record in zip(fresh, records)
+                for loan in entry.payload["fields"].get("loans", ())
+            )
+            for entry, record in zip(fresh, records):
+                history.record(
+                    [record.pk],
+                    [entry.payload["fields"]],
+                    [record.credit_score],
+                    record.score_source,
+                    entry.payload["seconds"],
+                    entry.payload.get("model_version"),
+                )
+
+        for entry in reconciles:
+            payload = entry.payload
+            updated = CreditParameters.objects.filter(pk=entry.record_id, score_source=ScoreSource.DEADLINE).update(
+                credit_score=payload["credit_score"], score_source=payload["score_source"], updated_at=timezone.now()
+            )
+            if updated:
+                history.record(
+                    [entry.record_id],
+                    [payload["fields"]],
+                    [payload["credit_score"]],
+                    payload["score_source"],
+                    payload["seconds"],
+                    payload.get("model_version"),
+                )
+            elif not CreditParameters.all_objects.filter(pk=entry.record_id).exists():
+                raise NotWrittenYet(f"Credit parameter {entry.record_id} has not been written yet")
+        invalidate_credit_parameters(*[entry.record_id for entry in reconciles])
+    return len(fresh)
+
+
+def drain_once(batch_size=None):
+    """Write one batch of due entries to the database and return how many entries were processed"""
+    batch_size = batch_size or getattr(settings, "CREDIT_OUTBOX_BATCH_SIZE", 200)
+    entries = _claim(batch_size, getattr(settings, "CREDIT_OUTBOX_LEASE", 30))
+    if not entries:
+        return 0
+    try:
+        _write(entries)
+        _complete(entries)
+    except TRANSIENT_ERRORS as e:
+        # The whole batch waits for the database to come back
+        for entry in entries:
+            _retry(entry, e)
+    except Exception:
+        # Retry one by one, so a single bad entry does not hold back the rest of its batch
+        for entry in entries:
+            try:
+                _write([entry])
+                _complete([entry])
+            except Exception as e:
+                _retry(entry, e)
+    metrics.incr("processed", len(entries))
+    return len(entries)
+
+
+def drain(batch_size=None):
+    """Drain every due entry and return how many were processed"""
+    total = 0
+    while processed := drain_once(batch_size):
+        total += processed
+    return total
+
+
+def entry_status(record_id):
+    """The queued create of ``record_id`` as ``{"state", "attempts", "error"}``, or None if it is not queued"""
+    with _journal() as journal:
+        row = journal.execute(
+            "SELECT failed, attempts, last_error FROM outbox WHERE id = ?", (str(record_id),)
+        ).fetchone()
+    if row is None:
+        return None
+    failed, attempts, error = row
+    return {"state": "failed" if failed else "queued", "attempts": attempts, "error": error}
+
+
+def stats():
+    with _journal() as journal:
+        pending, failed, oldest = journal.execute(
+            "SELECT SUM(failed = 0), SUM(failed = 1), MIN(CASE WHEN failed = 0 THEN enqueued_at END) FROM outbox"
+        ).fetchone()
+    return {
+        "pending": pending or 0,
+        "failed": failed or 0,
+        "oldest_pending_seconds": None if oldest is None else round(time.time() - oldest, 3),
+        "worker_running": _worker is not None and _worker.is_alive(),
+    }
+
+
+_worker = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def _run():
+    while True:
+        try:
+            processed = drain_once()
+        except Exception as e:
+            logger.error(f"Outbox drain failed: {str(e)}", exc_info=True)
+            processed = 0
+        finally:
+            close_old_connections()
+        if not processed:
+            _wake.wait(getattr(settings, "CREDIT_OUTBOX_POLL_INTERVAL", 1.0))
+            _wake.clear()
+
+
+def start_worker():
+    """Start this process's drain thread, if it is not running. Forked workers start their own."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name=f"outbox-{os.getpid()}", daemon=True)
+            _worker.start()
+            logger.info(f"Started outbox worker draining {_path()}")
+
+
+def _wake_worker():
+    if getattr(settings, "CREDIT_OUTBOX_WORKER", True):
+        start_worker()
+        _wake.set()
@@ -0,0 +1,253 @@
+"""
+Pickle-free, memory-mappable credit model artifacts.
+
+An artifact is a directory holding ``manifest.json`` and one ``.npy`` file per array. The manifest
+records the format, the input schema and category maps, and a SHA-256 for every array plus one
+over the manifest itself, all of which are checked at load. Arrays are opened with
+``mmap_mode="r"``: loading takes milliseconds, nothing is unpickled, and every worker on a host
+shares one copy of the weights and imputation reference rows through the page cache.
+
+export_model writes an artifact for a fitted linear classifier, on its own or behind the
+ColumnTransformer built by calculate.scoring.preprocessing. ArtifactModel.predict reproduces the
+fitted pipeline with numpy alone; the one-hot encoded columns are never materialised, their
+weights are gathered per category instead. Given the training data, the manifest also holds the
+reference histograms calculate.scoring.drift compares scored inputs with.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from calculate.scoring.drift import DriftReference, summarise
+
+FORMAT = "credit-model/1"
+MANIFEST = "manifest.json"
+# Rows imputed per distance matrix, bounding its size to rows x reference rows
+IMPUTE_CHUNK = 1024
+
+
+class ArtifactError(Exception):
+    """The artifact is incomplete, corrupt or not in a supported format"""
+
+
+def _digest(manifest):
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _step(pipeline, name, expected):
+    step = pipeline.named_steps.get(name)
+    if type(step).__name__ != expected:
+        raise ArtifactError(f"Expected a {expected} as step {name!r}, got {type(step).__name__}")
+    return step
+
+
+def _export_preprocessor(preprocessor, arrays):
+    transformers = {name: (pipeline, list(columns)) for name, pipeline, columns in preprocessor.transformers_}
+    if set(transformers) - {"remainder"} != {"categoricals", "numericals"}:
+        raise ArtifactError("Only the ColumnTransformer from calculate.scoring.preprocessing can be exported")
+
+    offset = 0
+    categorical_pipeline, categorical_columns = transformers["categoricals"]
+    imputer = _step(categorical_pipeline, "imputer_categoric", "SimpleImputer")
+    onehot = _step(categorical_pipeline, "onehot", "OneHotEncoder")
+    if onehot.drop is not None or onehot.handle_unknown != "ignore":
+        raise ArtifactError("The one-hot encoder must keep every category and ignore unknown ones")
+    categorical = []
+    for column, fill, categories in zip(categorical_columns, imputer.statistics_, onehot.categories_):
+        categorical.append(
+            {"column": column, "fill": _python(fill), "categories": categories.tolist(), "offset": offset}
+        )
+        offset += len(categories)
+
+    numerical_pipeline, numerical_columns = transformers["numericals"]
+    neighbours = _step(numerical_pipeline, "imputer_numeric", "NeighbourImputer")
+    robust = _step(numerical_pipeline, "robust", "RobustScaler")
+    standard = _step(numerical_pipeline, "standard", "StandardScaler")
+    # ((x - c) / s - m) / t is folded into one (x - center) / scale
+    robust_center = robust.center_ if robust.with_centering else 0.0
+    robust_scale = robust.scale_ if robust.with_scaling else 1.0
+    standard_mean = standard.mean_ if standard.with_mean else 0.0
+    standard_scale = standard.scale_ if standard.with_std else 1.0
+    size = len(numerical_columns)
+    arrays["numerical_center"] = np.broadcast_to(robust_center + standard_mean * robust_scale, size)
+    arrays["numerical_scale"] = np.broadcast_to(robust_scale * standard_scale, size)
+    arrays["imputer_fill"] = neighbours.fill_values_
+    arrays["imputer_reference"] = neighbours.reference_
+    return {
+        "categorical": categorical,
+        "numerical": {"columns": numerical_columns, "offset": offset},
+        "imputer": {
+            "n_neighbors": neighbours.n_neighbors,
+            "oversample": neighbours.oversample,
+            "n_passes": neighbours.n_passes,
+        },
+    }
+
+
+def export_model(estimator, directory, training_data=None):
+    """
+    Write ``estimator`` as an artifact in ``directory`` and return its manifest.
+
+    ``estimator`` is a fitted linear classifier with ``coef_``, ``intercept_`` and ``classes_``,
+    or a Pipeline of the preprocessing ColumnTransformer followed by one. ``training_data``, the
+    cleaned frame it was fitted on, is summarised into the drift reference histograms.
+    """
+    from sklearn.pipeline import Pipeline
+
+    preprocessor, classifier = None, estimator
+    if isinstance(estimator, Pipeline):
+        if len(estimator.steps) != 2:
+            raise ArtifactError("Only a preprocessor followed by a classifier can be exported")
+        (_, preprocessor), (_, classifier) = estimator.steps
+    if not all(hasattr(classifier, name) for name in ("coef_", "intercept_", "classes_")):
+        raise ArtifactError(f"{type(classifier).__name__} is not a fitted linear classifier")
+
+    arrays = {"coef": classifier.coef_, "intercept": classifier.intercept_}
+    schema = _export_preprocessor(preprocessor, arrays) if preprocessor is not None else None
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "format": FORMAT,
+        "estimator": type(classifier).__name__,
+        "classes": [_python(label) for label in classifier.classes_],
+        "n_features": int(classifier.coef_.shape[1]),
+        "schema": schema,
+        "drift": summarise(training_data) if training_data is not None else None,
+        "arrays": {},
+    }
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        np.save(directory / f"{name}.npy", array, allow_pickle=False)
+        manifest["arrays"][name] = {
+            "file": f"{name}.npy",
+            "shape": list(array.shape),
+            "sha256": _file_digest(directory / f"{name}.npy"),
+        }
+    manifest["version"] = _digest(manifest)[:12]
+    manifest["checksum"] = _digest(manifest)
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_artifact(path, mmap=True):
+    """
+    Load the artifact in directory ``path``, or whose manifest is ``path``, verifying every checksum.
+
+    Raises ArtifactError if anything does not match the manifest.
+    """
+    path = Path(path)
+    directory = path if path.is_dir() else path.parent
+    try:
+        manifest = json.loads((directory / MANIFEST).read_text())
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read the manifest in {directory}: {e}") from e
+    if manifest.get("format") != FORMAT:
+        raise ArtifactError(f"Unsupported model artifact format {manifest.get('format')!r}")
+    checksum = manifest.pop("checksum", None)
+    if checksum != _digest(manifest):
+        raise ArtifactError(f"Manifest checksum mismatch in {directory}")
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        if Path(spec["file"]).name != spec["file"]:
+            raise ArtifactError(f"Array file {spec['file']!r} is outside the artifact directory")
+        file = directory / spec["file"]
+        if not file.is_file() or _file_digest(file) != spec["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {file}")
+        arrays[name] = np.load(file, mmap_mode="r" if mmap else None, allow_pickle=False)
+        if list(arrays[name].shape) != spec["shape"]:
+            raise ArtifactError(f"Unexpected shape {arrays[name].shape} for {file}")
+    return ArtifactModel(manifest, arrays)
+
+
+class ArtifactModel:
+    """A loaded artifact, scoring cleaned input frames like the exported estimator's ``predict``"""
+
+    def __init__(self, manifest, arrays):
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.classes_ = np.asarray(manifest["classes"])
+        self.n_features_in_ = manifest["n_features"]
+        self.schema = manifest["schema"]
+        self.arrays = arrays
+        drift = manifest.get("drift")
+        self.drift_reference = DriftReference(drift, self.version) if drift else None
+        if self.schema is not None:
+            self._category_indexes = [
+                {category: index for index, category in enumerate(spec["categories"])}
+                for spec in self.schema["categorical"]
+            ]
+
+    def predict(self, frame):
+        scores = self.decision_function(frame)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def decision_function(self, frame):
+        coef, intercept = self.arrays["coef"], self.arrays["intercept"]
+        if self.schema is None:
+            # Without a schema the artifact takes model features directly, like the bare estimator
+            if frame.shape[1] != self.n_features_in_:
+                raise ValueError(f"X has {frame.shape[1]} features, but the model is expecting {self.n_features_in_}")
+            scores = np.asarray(frame, dtype=np.float64) @ coef.T + intercept
+        else:
+            numerical = self.schema["numerical"]
+            values = frame[numerical["columns"]].to_numpy(dtype="float64", na_value=np.nan)
+            values = (self._impute(values) - self.arrays["numerical_center"]) / self.arrays["numerical_scale"]
+            start = numerical["offset"]
+            scores = values @ coef[:, start : start + values.shape[1]].T + intercept
+            for spec, index in zip(self.schema["categorical"], self._category_indexes):
+                column = frame[spec["column"]].astype(object)
+                column = column.where(column.notna(), spec["fill"])
+                positions = np.fromiter((index.get(value, -1) for value in column), dtype=np.intp, count=len(column))
+                known = positions >= 0
+                # One-hot columns contribute their weight where the category is known, nothing otherwise
+                scores[known] += coef[:, spec["offset"] + positions[known]].T
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def _impute(self, X):
+        # NeighbourImputer.transform with an exact brute-force search in place of its KD-tree
+        X = np.array(X, dtype=np.float64, copy=True)
+        missing = np.isnan(X)
+        rows = np.flatnonzero(missing.any(axis=1))
+        if not len(rows):
+            return X
+        fill, reference = self.arrays["imputer_fill"], self.arrays["imputer_reference"]
+        if not len(reference):
+            X[missing] = np.broadcast_to(fill, X.shape)[missing]
+            return X
+
+        settings = self.schema["imputer"]
+        n_neighbors = settings["n_neighbors"]
+        n_candidates = min(len(reference), n_neighbors * settings["oversample"])
+        reference_norms = (reference**2).sum(axis=1)
+        for chunk in np.array_split(rows, max(1, -(-len(rows) // IMPUTE_CHUNK))):
+            incomplete, incomplete_mask = X[chunk], missing[chunk]
+            estimate = np.where(incomplete_mask, fill, incomplete)
+            for _ in range(settings["n_passes"]):
+                distances = (estimate**2).sum(axis=1)[:, None] - 2 * estimate @ reference.T + reference_norms
+                candidates = np.argpartition(distances, n_candidates - 1, axis=1)[:, :n_candidates]
+                # Candidates in distance order, as returned by KDTree.query
+                order = np.argsort(np.take_along_axis(distances, candidates, axis=1), axis=1, kind="stable")
+                donors = reference[np.take_along_axis(candidates, order, axis=1)]
+                observed = np.where(incomplete_mask[:, None, :], 0.0, donors - incomplete[:, None, :]) ** 2
+                nearest_order = np.argsort(observed.sum(axis=2), axis=1, kind="stable")[:, :n_neighbors]
+                nearest = np.take_along_axis(donors, nearest_order[:, :, None], axis=1)
+                estimate = np.where(incomplete_mask, nearest.mean(axis=1), incomplete)
+            X[chunk] = estimate
+        return X
@@ -0,0 +1,166 @@
+"""
+Vectorized cleaning of credit data.
+
+The same rules are applied to the training data read from credit_data.csv and to the frames
+built for scoring requests, so both sides of the model see identically normalised values.
+"""
+import numpy as np
+import pandas as pd
+
+STRIP_CHARS = '_ ,"'
+MISSING_SENTINELS = [
+    "",
+    "_",
+    "-",
+    "-333333333333333333333333333",
+    "nan",
+    "__10000__",
+    "!@9#%8",
+    "#F%$D@*&8",
+    "na",
+]
+MAX_AGE = 110
+
+# Columns parsed as numbers by clean_frame
+NUMERIC_COLUMNS = [
+    "Age",
+    "Annual_Income",
+    "Monthly_Inhand_Salary",
+    "Num_Bank_Accounts",
+    "Num_Credit_Card",
+    "Interest_Rate",
+    "Num_of_Loan",
+    "Delay_from_due_date",
+    "Num_of_Delayed_Payment",
+    "Changed_Credit_Limit",
+    "Num_Credit_Inquiries",
+    "Outstanding_Debt",
+    "Credit_Utilization_Ratio",
+    "Total_EMI_per_month",
+    "Amount_invested_monthly",
+    "Monthly_Balance",
+]
+ROUNDED_COLUMNS = [
+    "Annual_Income",
+    "Monthly_Inhand_Salary",
+    "Credit_Utilization_Ratio",
+    "Total_EMI_per_month",
+    "Amount_invested_monthly",
+    "Monthly_Balance",
+]
+# Loan type count columns, see features.LOAN_TYPE_FEATURES, and how each type is spelled in Type_of_Loan
+# once hyphens are read as spaces, e.g. "Auto Loan, Credit-Builder Loan, and Not Specified"
+LOAN_TYPE_LABELS = {
+    "Auto_Loan": "Auto Loan",
+    "Credit_Builder_Loan": "Credit Builder Loan",
+    "Personal_Loan": "Personal Loan",
+    "Home_Equity_Loan": "Home Equity Loan",
+    "Mortgage_Loan": "Mortgage Loan",
+    "Student_Loan": "Student Loan",
+    "Debt_Consolidation_Loan": "Debt Consolidation Loan",
+    "Payday_Loan": "Payday Loan",
+    "Not_Specified_Loan": "Not Specified",
+}
+
+# Dtypes used to read credit_data.csv, columns holding junk values are read as text and parsed later
+RAW_DTYPES = {
+    "ID": "str",
+    "Customer_ID": "str",
+    "Month": "str",
+    "Name": "str",
+    "Age": "str",
+    "SSN": "str",
+    "Occupation": "str",
+    "Annual_Income": "str",
+    "Monthly_Inhand_Salary": "float64",
+    "Num_Bank_Accounts": "float64",
+    "Num_Credit_Card": "float64",
+    "Interest_Rate": "float64",
+    "Num_of_Loan": "str",
+    "Type_of_Loan": "str",
+    "Delay_from_due_date": "float64",
+    "Num_of_Delayed_Payment": "str",
+    "Changed_Credit_Limit": "str",
+    "Num_Credit_Inquiries": "float64",
+    "Credit_Mix": "str",
+    "Outstanding_Debt": "str",
+    "Credit_Utilization_Ratio": "float64",
+    "Credit_History_Age": "str",
+    "Payment_of_Min_Amount": "str",
+    "Total_EMI_per_month": "float64",
+    "Amount_invested_monthly": "str",
+    "Payment_Behaviour": "str",
+    "Monthly_Balance": "str",
+    "Credit_Score": "str",
+}
+DEFAULT_CHUNKSIZE = 50_000
+
+
+def clean_frame(frame):
+    """
+    Normalise a frame of training-named columns in place and return it.
+
+    Text cells are stripped of stray '_ ,"' characters and junk placeholders become NaN, numeric
+    columns are parsed as float64 (unparseable values become NaN), monetary columns are rounded
+    to 2dp, impossible ages are dropped and Type_of_Loan is counted into one column per loan type.
+    Columns missing from the frame are skipped, so this works equally for a raw CSV chunk and for
+    a single scoring request.
+    """
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype == object or isinstance(values.dtype, pd.StringDtype):
+            stripped = values.str.strip(STRIP_CHARS)
+            # Non-string cells come back as NaN from .str, keep them as they were
+            values = stripped.where(stripped.notna(), values)
+            frame[column] = values.mask(values.isin(MISSING_SENTINELS))
+
+    if "Age" in frame.columns and frame["Age"].dtype.kind not in "iuf":
+        # Negative ages are typos in the source data, the notebook removed the sign
+        frame["Age"] = frame["Age"].str.replace("-", "", regex=False)
+
+    for column in NUMERIC_COLUMNS:
+        if column in frame.columns:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("float64")
+
+    if "Age" in frame.columns:
+        age = np.abs(frame["Age"].to_numpy())
+        frame["Age"] = np.where(age > MAX_AGE, np.nan, age)
+
+    rounded = [column for column in ROUNDED_COLUMNS if column in frame.columns]
+    if rounded:
+        frame[rounded] = frame[rounded].round(2)
+
+    if "Credit_History_Age" in frame.columns:
+        history = frame["Credit_History_Age"]
+        frame["Credit_History_Age"] = history.str[:2] + history.str[13:15]
+
+    if "Type_of_Loan" in frame.columns:
+        # The same loan type counts build_frame takes from a request's loans
+        loans = frame["Type_of_Loan"].fillna("").astype(str).str.replace("-", " ", regex=False)
+        for column, label in LOAN_TYPE_LABELS.items():
+            frame[column] = loans.str.count(label).astype("float64")
+
+    return frame
+
+
+def read_training_data(path, chunksize=DEFAULT_CHUNKSIZE, usecols=None, drop_incomplete=False):
+    """
+    Stream credit_data.csv as cleaned chunks of at most ``chunksize`` rows.
+
+    With ``drop_incomplete`` rows holding any missing value are discarded chunk by chunk, matching
+    the notebook's pre-processing filter without materialising the raw file.
+    """
+    columns = usecols if usecols is not None else list(RAW_DTYPES)
+    dtype = {column: RAW_DTYPES[column] for column in columns if column in RAW_DTYPES}
+    reader = pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize)
+    for chunk in reader:
+        chunk = clean_frame(chunk)
+        if drop_incomplete:
+            chunk = chunk[chunk.notna().all(axis=1)]
+        yield chunk
+
+
+def load_training_data(path, chunksize=DEFAULT_CHUNKSIZE, usecols=None, drop_incomplete=False):
+    """Read and clean the whole training file, see read_training_data."""
+    chunks = list(read_training_data(path, chunksize, usecols, drop_incomplete))
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,137 @@
+"""
+Latency budget for model scoring.
+
+Model scoring runs on a small thread pool. If it has not finished within the budget the caller gets
+the rule engine's scores straight away, and the model keeps running. Once the record is committed
+its late result is written back by reconcile_later.
+
+Late runs still hold their place in the pool, so at most CREDIT_SCORING_WORKERS plus
+CREDIT_SCORING_BACKLOG runs are in flight. Past that a slow model would only build a backlog, and
+requests are scored by the rule engine without submitting a run.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("scoring")
+
+_executor = None
+_in_flight = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _get_executor():
+    global _executor, _in_flight
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, "CREDIT_SCORING_WORKERS", 4)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring")
+            _in_flight = threading.BoundedSemaphore(workers + getattr(settings, "CREDIT_SCORING_BACKLOG", 4))
+        return _executor, _in_flight
+
+
+def _rule_scores(records):
+    from calculate.scoring.cleaning import clean_frame
+    from calculate.scoring.features import build_frame
+    from calculate.scoring.rules import rule_scores
+
+    return rule_scores(clean_frame(build_frame(records)))
+
+
+def score_within(load, records, budget=None):
+    """
+    Score ``records`` with the model returned by ``load()``, waiting at most ``budget`` seconds.
+
+    Returns ``(scores, source, late)``. Within budget ``late`` is None and source is "model" or
+    "rules" as from predict_scores. Over budget the rule engine scores are returned with source
+    "deadline" and ``late`` is the still running model Future. Model loading counts against the
+    budget, so a model being loaded or reloaded does not stall the request either. When the pool
+    has its fill of runs in flight the rule engine scores are returned with source "rules", and
+    no run is submitted.
+    """
+    from calculate.scoring.loader import score_records
+
+    budget = getattr(settings, "CREDIT_SCORING_BUDGET", 1.0) if budget is None else budget
+    executor, in_flight = _get_executor()
+    if not in_flight.acquire(blocking=False):
+        metrics.incr("saturated_fallbacks")
+        logger.warning("Model scoring has a full backlog of late runs, using the rule engine")
+        return _rule_scores(records), "rules", None
+
+    def run():
+        # Released before the Future completes, so whoever waits on it finds the place free
+        try:
+            start = time.perf_counter()
+            scores, source = score_records(load(), records)
+            return scores, source, time.perf_counter() - start
+        finally:
+            in_flight.release()
+
+    try:
+        future = executor.submit(run)
+    except BaseException:
+        in_flight.release()
+        raise
+    try:
+        scores, source, _ = future.result(timeout=budget)
+    except FutureTimeoutError:
+        metrics.incr("deadline_fallbacks")
+        logger.warning(f"Model scoring exceeded its {budget}s budget, using the rule engine")
+        return _rule_scores(records), "deadline", future
+    metrics.incr(f"source_{source}")
+    return scores, source, None
+
+
+def reconcile_later(pk, late, inputs, model="default"):
+    """
+    Write the late model result for record ``pk`` once the current transaction commits.
+
+    Only records still marked as scored under the deadline are updated, so a later edit or
+    rescore is never overwritten. ``inputs`` are the scored fields and ``model`` the name of the
+    registry model that scored them, for the scoring history.
+    """
+
+    def schedule():
+        _pending.add(late)
+        late.add_done_callback(lambda future: _reconcile(pk, future, inputs, model))
+
+    transaction.on_commit(schedule)
+
+
+def _reconcile(pk, future, inputs, model):
+    from calculate.api.caching import invalidate_credit_parameters
+    from calculate.models import CreditParameters, ScoreSource
+    from calculate.scoring import history
+    from calculate.scoring.registry import registry
+
+    try:
+        scores, source, seconds = future.result()
+        updated = CreditParameters.objects.filter(pk=pk, score_source=ScoreSource.DEADLINE).update(
+            credit_score=str(scores[0]), score_source=source, updated_at=timezone.now()
+        )
+        if updated:
+            invalidate_credit_parameters(pk)
+            history.record([pk], [inputs], scores, source, seconds, registry.version(model))
+        metrics.incr("reconciled")
+        logger.info(f"Reconciled late {source} score {scores[0]} for credit parameter {pk}")
+    except Exception as e:
+        metrics.incr("reconcile_failures")
+        logger.error(f"Failed to reconcile late score for credit parameter {pk}: {str(e)}", exc_info=True)
+    finally:
+        _pending.discard(future)
+        close_old_connections()
+
+
+def pending():
+    """Late model results that have not been reconciled yet"""
+    return list(_pending)
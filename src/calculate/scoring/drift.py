@@ -0,0 +1,240 @@
+"""
+Drift of the scored inputs away from the model's training distribution.
+
+export_model summarises the training data of every feature into fixed buckets: the deciles of
+each numerical feature, and the most frequent categories of each categorical one plus a bucket
+for all others. Every feature also has a bucket for missing values. The training counts ship in
+the artifact manifest and are loaded as the model's DriftReference.
+
+score_records adds each cleaned input frame to histograms over the same buckets. Every scoring
+thread owns its histograms, so the request path takes no lock and does one vectorised bucket
+lookup per frame, and memory does not grow with the number of requests. The histograms of all
+threads are summed when read. A read may miss a frame that is being added; no count is lost.
+
+report() compares the summed counts with the training counts by population stability index (PSI)
+and, for numerical features, the Kolmogorov-Smirnov distance between the binned distributions.
+The scoring path also checks them every CREDIT_DRIFT_INTERVAL seconds and logs the features whose
+PSI exceeds CREDIT_DRIFT_PSI_ALERT. Like the metrics, histograms are kept per worker process.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from calculate.scoring.features import CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("drift")
+
+BUCKETS = 10
+MAX_CATEGORIES = 20
+# Free-text or identifying columns whose distribution says nothing about drift
+EXCLUDED_COLUMNS = {"Name"}
+# Periodic checks wait for this many scored rows, PSI over a handful of rows is mostly noise
+MIN_ROWS = 100
+
+
+def _python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def summarise(frame, buckets=BUCKETS, max_categories=MAX_CATEGORIES):
+    """Summarise the cleaned training ``frame`` into the reference histograms stored in the manifest"""
+    numerical = []
+    for column in NUMERICAL_FEATURES.values():
+        values = frame[column].to_numpy(dtype="float64", na_value=np.nan)
+        present = values[~np.isnan(values)]
+        quantiles = np.linspace(0, 1, buckets + 1)[1:-1]
+        edges = np.unique(np.quantile(present, quantiles)) if len(present) else np.empty(0)
+        numerical.append({"column": column, "edges": edges.tolist()})
+
+    categorical = []
+    for column in CATEGORICAL_FEATURES.values():
+        if column in EXCLUDED_COLUMNS:
+            continue
+        frequent = frame[column].value_counts(dropna=True).index[:max_categories]
+        categorical.append({"column": column, "categories": [_python(value) for value in frequent]})
+
+    summary = {"rows": len(frame), "numerical": numerical, "categorical": categorical}
+    reference = DriftReference(summary, version=None)
+    counts = reference.bucket_counts(frame)
+    for spec, (start, stop) in zip(numerical + categorical, reference.slices):
+        spec["counts"] = counts[start:stop].tolist()
+    return summary
+
+
+class DriftReference:
+    """
+    The training histograms of one model, and the bucket layout shared by every histogram of its
+    inputs: one flat array with the buckets of each feature in turn.
+    """
+
+    def __init__(self, summary, version):
+        self.version = version
+        self.rows = summary["rows"]
+        self.numerical = summary["numerical"]
+        self.categorical = summary["categorical"]
+        self.columns = [spec["column"] for spec in self.numerical + self.categorical]
+
+        # Numerical feature i has len(edges) + 1 value buckets and then its missing bucket
+        sizes = [len(spec["edges"]) + 2 for spec in self.numerical]
+        # Categorical features have a bucket per category, one for any other value and one for missing
+        sizes += [len(spec["categories"]) + 2 for spec in self.categorical]
+        bounds = np.concatenate([[0], np.cumsum(sizes)]).astype(np.intp)
+        self.size = int(bounds[-1])
+        self.slices = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        width = max((len(spec["edges"]) for spec in self.numerical), default=0)
+        self._edges = np.full((len(self.numerical), width), np.inf)
+        for index, spec in enumerate(self.numerical):
+            self._edges[index, : len(spec["edges"])] = spec["edges"]
+        self._numerical_offsets = bounds[: len(self.numerical)]
+        # Every feature's last bucket holds its missing values
+        self._missing = bounds[1:] - 1
+        self._categories = [
+            {category: index for index, category in enumerate(spec["categories"])} for spec in self.categorical
+        ]
+
+        self.counts = None
+        if all("counts" in spec for spec in self.numerical + self.categorical):
+            self.counts = np.concatenate([spec["counts"] for spec in self.numerical + self.categorical])
+
+    def bucket_counts(self, frame):
+        """Histogram of the cleaned ``frame`` as a flat array of ``size`` bucket counts"""
+        import pandas as pd
+
+        # One conversion of the whole frame is far cheaper than selecting columns one at a time
+        table = frame.to_numpy(dtype=object)[:, frame.columns.get_indexer(self.columns)]
+        numerical = len(self.numerical)
+        values = table[:, :numerical].astype(np.float64)
+        # A value's bucket is the number of edges at or below it, padding edges are never reached
+        buckets = (values[:, :, None] >= self._edges[None, :, :]).sum(axis=2) + self._numerical_offsets
+        buckets = np.where(np.isnan(values), self._missing[:numerical], buckets)
+
+        categories = table[:, numerical:]
+        positions = np.empty(categories.shape, dtype=np.intp)
+        for index, (lookup, (start, _)) in enumerate(zip(self._categories, self.slices[numerical:])):
+            # Values outside the reference categories go to the bucket after them
+            positions[:, index] = [start + lookup.get(value, len(lookup)) for value in categories[:, index]]
+        positions = np.where(pd.isna(categories), self._missing[numerical:], positions)
+        return np.bincount(np.concatenate([buckets.ravel(), positions.ravel()]), minlength=self.size)
+
+    def compare(self, counts, rows):
+        """Drift statistics of ``rows`` scored inputs with bucket ``counts`` against the training data"""
+        features = {}
+        for column, (start, stop), numerical in zip(
+            self.columns, self.slices, [True] * len(self.numerical) + [False] * len(self.categorical)
+        ):
+            expected, observed = self.counts[start:stop], counts[start:stop]
+            features[column] = {
+                "psi": psi(expected, observed) if rows else None,
+                # The missing bucket sits outside the ordering of the values
+                "ks": ks_distance(expected[:-1], observed[:-1]) if numerical else None,
+                "missing_share": float(observed[-1] / rows) if rows else None,
+            }
+        alert = getattr(settings, "CREDIT_DRIFT_PSI_ALERT", 0.25)
+        return {
+            "rows": rows,
+            "reference_rows": self.rows,
+            "features": features,
+            "alerts": sorted(column for column, stats in features.items() if (stats["psi"] or 0) > alert),
+        }
+
+
+def psi(expected, observed):
+    """Population stability index of two histograms over the same buckets, empty buckets smoothed"""
+    expected = (np.asarray(expected, dtype=np.float64) + 0.5) / (np.sum(expected) + 0.5 * len(expected))
+    observed = (np.asarray(observed, dtype=np.float64) + 0.5) / (np.sum(observed) + 0.5 * len(observed))
+    return float(np.sum((observed - expected) * np.log(observed / expected)))
+
+
+def ks_distance(expected, observed):
+    """Largest gap between the cumulative distributions of two histograms, None if either is empty"""
+    expected_total, observed_total = np.sum(expected), np.sum(observed)
+    if not expected_total or not observed_total:
+        return None
+    gaps = np.cumsum(observed) / observed_total - np.cumsum(expected) / expected_total
+    return float(np.abs(gaps).max())
+
+
+class DriftMonitor:
+    """Per-thread histograms of the scored inputs of each model version, summed on read"""
+
+    def __init__(self):
+        self._local = threading.local()
+        # Registration is the only locked step, once per thread and model
+        self._lock = threading.Lock()
+        self._histograms = []
+        self._next_check = 0.0
+        self.last_check = None
+
+    def observe(self, model, frame):
+        """Add the cleaned input ``frame`` scored by ``model``, a no-op without a drift reference"""
+        reference = getattr(model, "drift_reference", None)
+        if not isinstance(reference, DriftReference) or reference.counts is None or not len(frame):
+            return
+        histograms = self._local.__dict__.get(reference.version)
+        if histograms is None:
+            histograms = self._register(reference)
+        # Bucket counts then the number of rows, updated in place by this thread only
+        histograms[:-1] += reference.bucket_counts(frame)
+        histograms[-1] += len(frame)
+
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + getattr(settings, "CREDIT_DRIFT_INTERVAL", 300)
+            self.check()
+
+    def _register(self, reference):
+        histograms = np.zeros(reference.size + 1, dtype=np.int64)
+        self._local.__dict__[reference.version] = histograms
+        with self._lock:
+            self._histograms.append((reference, histograms))
+        return histograms
+
+    def report(self):
+        """Drift statistics per model version, over the inputs scored by every thread of this worker"""
+        with self._lock:
+            histograms = list(self._histograms)
+        totals = {}
+        for reference, counts in histograms:
+            if reference.version in totals:
+                totals[reference.version][1] += counts
+            else:
+                totals[reference.version] = [reference, counts.copy()]
+        return {
+            version: reference.compare(counts[:-1], int(counts[-1])) for version, (reference, counts) in totals.items()
+        }
+
+    def check(self):
+        """Evaluate report() and log the features drifting past CREDIT_DRIFT_PSI_ALERT"""
+        report = self.report()
+        metrics.incr("checks")
+        for version, result in report.items():
+            if result["rows"] < MIN_ROWS:
+                continue
+            for column in result["alerts"]:
+                metrics.incr("alerts")
+                psi_value = result["features"][column]["psi"]
+                logger.warning(f"Input drift on {column} for model {version}: PSI {psi_value:.3f}")
+        self.last_check = {
+            "at": time.time(),
+            "alerts": {version: result["alerts"] for version, result in report.items()},
+        }
+        return report
+
+    def stats(self):
+        return {"models": self.report(), "last_check": self.last_check}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = []
+        self._local = threading.local()
+        self._next_check = 0.0
+        self.last_check = None
+
+
+monitor = DriftMonitor()
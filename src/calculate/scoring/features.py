@@ -0,0 +1,78 @@
+from collections.abc import Mapping
+
+# Map CreditParameters fields to the column names used in credit_data.csv
+CATEGORICAL_FEATURES = {
+    "name": "Name",
+    "occupation": "Occupation",
+    "delay_from_due_date": "Delay_from_due_date",
+    "credit_mix": "Credit_Mix",
+    "payment_of_minimum_amount": "Payment_of_Min_Amount",
+    "payment_behaviour": "Payment_Behaviour",
+    "changed_credit_limit": "Changed_Credit_Limit",
+}
+NUMERICAL_FEATURES = {
+    "age": "Age",
+    "annual_income": "Annual_Income",
+    "monthly_in_hand_salary": "Monthly_Inhand_Salary",
+    "number_of_bank_accounts": "Num_Bank_Accounts",
+    "number_of_credit_cards": "Num_Credit_Card",
+    "interest_rate": "Interest_Rate",
+    "number_of_loans": "Num_of_Loan",
+    "number_of_delayed_payment": "Num_of_Delayed_Payment",
+    "num_credit_inquiries": "Num_Credit_Inquiries",
+    "outstanding_debt": "Outstanding_Debt",
+    "credit_utilization_ratio": "Credit_Utilization_Ratio",
+    "total_emi_per_month": "Total_EMI_per_month",
+    "amount_invested_monthly": "Amount_invested_monthly",
+    "monthly_balance": "Monthly_Balance",
+}
+FEATURE_COLUMNS = {**CATEGORICAL_FEATURES, **NUMERICAL_FEATURES}
+# Map CreditLoans.LoanTypes values to the loan type count columns, which cleaning derives from the
+# Type_of_Loan column of credit_data.csv
+LOAN_TYPE_FEATURES = {
+    "auto_loan": "Auto_Loan",
+    "credit_builder_loan": "Credit_Builder_Loan",
+    "personal_loan": "Personal_Loan",
+    "home_equity_loan": "Home_Equity_Loan",
+    "mortgage_loan": "Mortgage_Loan",
+    "student_loan": "Student_Loan",
+    "debt_consolidation_loan": "Debt_Consolidation_Loan",
+    "payday_loan": "Payday_Loan",
+    "non_specified_loan": "Not_Specified_Loan",
+}
+
+
+def loan_type_counts(records):
+    """
+    Count each record's loans per type, as a float64 array with one column per LOAN_TYPE_FEATURES entry.
+
+    A record's ``loans`` are CreditLoans dicts or loan type values. Records without loans count none.
+    """
+    import numpy as np
+
+    positions = {loan_type: index for index, loan_type in enumerate(LOAN_TYPE_FEATURES)}
+    counts = np.zeros((len(records), len(positions)))
+    for row, record in enumerate(records):
+        for loan in record.get("loans") or ():
+            position = positions.get(loan["loan_type"] if isinstance(loan, Mapping) else loan)
+            if position is not None:
+                counts[row, position] += 1
+    return counts
+
+
+def build_frame(records):
+    """
+    Build a model input frame from an iterable of CreditParameters field dicts.
+
+    Columns are renamed to the training data names and numerical features are cast to float64.
+    The loan type counts of loan_type_counts are added as the LOAN_TYPE_FEATURES columns.
+    """
+    import pandas as pd
+
+    records = list(records)
+    frame = pd.DataFrame.from_records(records, columns=list(FEATURE_COLUMNS))
+    numerical = list(NUMERICAL_FEATURES)
+    frame[numerical] = frame[numerical].astype("float64")
+    frame = frame.rename(columns=FEATURE_COLUMNS)
+    frame[list(LOAN_TYPE_FEATURES.values())] = loan_type_counts(records)
+    return frame
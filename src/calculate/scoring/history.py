@@ -0,0 +1,218 @@
+"""
+Append-only history of every score written to a CreditParameters record.
+
+Events are buffered per process and written with a single bulk_create once
+CREDIT_SCORE_EVENT_BATCH_SIZE are waiting, or at the next event after the oldest has waited
+CREDIT_SCORE_EVENT_FLUSH_INTERVAL seconds, so scoring never waits on a history insert per record.
+The buffer is flushed at exit; a crashed process loses at most its unwritten batch.
+
+On PostgreSQL the table is range partitioned by month on ``scored_at`` (migration 0009).
+ensure_partitions creates the monthly partitions ahead of the events, and prune drops whole
+partitions past the retention period instead of deleting rows from them.
+"""
+import atexit
+import hashlib
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from calculate.scoring.features import FEATURE_COLUMNS, loan_type_counts
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("score_history")
+
+TABLE = "calculate_creditscoreevent"
+PARTITION_PATTERN = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def inputs_hash(record):
+    """SHA-256 of a record's feature values, equal for records that were scored on equal inputs"""
+    values = "\x1f".join(str(record.get(column)) for column in FEATURE_COLUMNS)
+    if record.get("loans"):
+        # Only records with loans hash them, so the hashes of records without loans are unchanged
+        counts = loan_type_counts([record])[0]
+        values += "\x1f" + ",".join(str(int(count)) for count in counts)
+    return hashlib.sha256(values.encode()).hexdigest()
+
+
+def _month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def ensure_partitions(now=None, months_ahead=1):
+    """
+    Create the monthly partitions from the current month to ``months_ahead`` months on, if they
+    do not exist yet. Returns the partition names; a no-op returning [] except on PostgreSQL.
+    """
+    if connection.vendor != "postgresql":
+        return []
+    month = _month_start(now or timezone.now())
+    names = []
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            upper = _next_month(month)
+            names.append(partition_name(month))
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {names[-1]} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+            month = upper
+    return names
+
+
+def _partitions():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [TABLE],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _delete_before(before, batch_size):
+    from calculate.models import CreditScoreEvent
+
+    deleted = 0
+    while True:
+        pks = list(CreditScoreEvent.objects.filter(scored_at__lt=before).values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += CreditScoreEvent.objects.filter(pk__in=pks).delete()[0]
+
+
+def prune(before, batch_size=10000):
+    """
+    Remove the events scored before ``before`` and return ``(dropped partitions, deleted rows)``.
+
+    On PostgreSQL every monthly partition that ends on or before ``before`` is dropped, so events
+    expire a whole month at a time; only stray rows in the default partition are deleted. Other
+    databases delete the rows in batches.
+    """
+    dropped = []
+    if connection.vendor == "postgresql":
+        for name in sorted(_partitions()):
+            match = PARTITION_PATTERN.match(name)
+            if not match:
+                continue
+            # Partition bounds are UTC month starts, see ensure_partitions
+            if _next_month(datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)) <= before:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+    deleted = _delete_before(before, batch_size)
+    metrics.incr("partitions_dropped", len(dropped))
+    metrics.incr("rows_deleted", deleted)
+    logger.info(f"Pruned scoring history before {before}: dropped {len(dropped)} partitions, deleted {deleted} rows")
+    return dropped, deleted
+
+
+class EventBuffer:
+    """Thread-safe buffer of unsaved CreditScoreEvent instances, written in batches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._oldest = None
+        self._partitioned_until = None
+
+    def add(self, events):
+        with self._lock:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.extend(events)
+            due = len(self._events) >= getattr(settings, "CREDIT_SCORE_EVENT_BATCH_SIZE", 100) or (
+                time.monotonic() - self._oldest >= getattr(settings, "CREDIT_SCORE_EVENT_FLUSH_INTERVAL", 5.0)
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered events and return how many were written"""
+        from calculate.models import CreditScoreEvent
+
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return 0
+        try:
+            now = timezone.now()
+            # Partitions for this month and the next are created once per month and process
+            if self._partitioned_until is None or now >= self._partitioned_until:
+                ensure_partitions(now)
+                self._partitioned_until = _next_month(_month_start(now))
+            CreditScoreEvent.objects.bulk_create(events)
+        except Exception as e:
+            metrics.incr("write_failures")
+            logger.error(f"Failed to write {len(events)} scoring history events: {str(e)}", exc_info=True)
+            return 0
+        metrics.incr("written", len(events))
+        return len(events)
+
+    def clear(self):
+        with self._lock:
+            self._events, self._oldest, self._partitioned_until = [], None, None
+
+
+_buffer = EventBuffer()
+atexit.register(_buffer.flush)
+
+
+def record(pks, records, scores, source, seconds, model_version=None):
+    """
+    Buffer one event per scored record once the current transaction commits.
+
+    ``seconds`` is the time taken to score ``records`` together and is divided evenly between
+    them. ``model_version`` defaults to the default model's (see calculate.scoring.registry) for
+    model scores and is always blank for rule engine scores.
+    """
+    from calculate.models import CreditScoreEvent, ScoreSource
+    from calculate.scoring.loader import model_version as loaded_version
+
+    if source != ScoreSource.MODEL:
+        model_version = ""
+    elif model_version is None:
+        model_version = loaded_version() or ""
+    latency_ms = seconds * 1000 / max(len(pks), 1)
+    scored_at = timezone.now()
+    events = [
+        CreditScoreEvent(
+            credit_parameters_id=pk,
+            inputs_hash=inputs_hash(inputs),
+            model_version=model_version,
+            score=str(score),
+            source=source,
+            latency_ms=latency_ms,
+            scored_at=scored_at,
+        )
+        for pk, inputs, score in zip(pks, records, scores)
+    ]
+    transaction.on_commit(lambda: _buffer.add(events))
+
+
+def flush():
+    """Write the buffered events of this process now"""
+    return _buffer.flush()
+
+
+def clear():
+    """Drop the buffered events of this process without writing them"""
+    _buffer.clear()
@@ -0,0 +1,94 @@
+"""
+Bounded-cost nearest neighbour imputation for the numerical features.
+
+KNNImputer keeps the whole training matrix in the pickled pipeline and scans all of it for every
+row with a missing value. NeighbourImputer keeps a KD-tree over a capped sample of complete
+training rows instead, so the artifact stays small and each imputation is a log-time tree query.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.neighbors import KDTree
+
+
+class NeighbourImputer(TransformerMixin, BaseEstimator):
+    """
+    Impute missing values from the nearest complete rows of a reduced reference set.
+
+    Parameters:
+        - n_neighbors: Number of donors averaged for each missing value, as in KNNImputer.
+        - max_reference: Upper bound on the number of training rows kept in the index.
+        - oversample: Candidates fetched from the tree per donor before re-ranking them on the
+          observed features only.
+        - n_passes: Number of tree searches per row, each refining the previous estimate.
+        - leaf_size: KDTree leaf size.
+        - random_state: Seed used when sampling the reference set.
+    """
+
+    def __init__(self, n_neighbors=2, max_reference=2048, oversample=8, n_passes=2, leaf_size=40, random_state=0):
+        self.n_neighbors = n_neighbors
+        self.max_reference = max_reference
+        self.oversample = oversample
+        self.n_passes = n_passes
+        self.leaf_size = leaf_size
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float64)
+        self.n_features_in_ = X.shape[1]
+        # Per-field means seed the first search, and fill everything if no training row was complete
+        self.fill_values_ = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(X.shape[1])
+
+        reference = X[~np.isnan(X).any(axis=1)]
+        if len(reference) > self.max_reference:
+            rng = np.random.default_rng(self.random_state)
+            reference = reference[rng.choice(len(reference), self.max_reference, replace=False)]
+        self.reference_ = np.ascontiguousarray(reference)
+        self.tree_ = KDTree(self.reference_, leaf_size=self.leaf_size) if len(reference) else None
+        return self
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64, copy=True)
+        missing = np.isnan(X)
+        rows = np.flatnonzero(missing.any(axis=1))
+        if not len(rows):
+            return X
+        if self.tree_ is None:
+            X[missing] = np.broadcast_to(self.fill_values_, X.shape)[missing]
+            return X
+
+        incomplete = X[rows]
+        incomplete_mask = missing[rows]
+        n_candidates = min(len(self.reference_), self.n_neighbors * self.oversample)
+        # The first search puts missing coordinates at the field mean, each further pass searches
+        # again from the previous estimate. Candidates are re-ranked on the observed coordinates
+        # only, which is KNNImputer's nan_euclidean ordering.
+        estimate = np.where(incomplete_mask, self.fill_values_, incomplete)
+        for _ in range(self.n_passes):
+            candidates = self.tree_.query(estimate, k=n_candidates, return_distance=False)
+            donors = self.reference_[candidates]
+            distances = np.where(incomplete_mask[:, None, :], 0.0, donors - incomplete[:, None, :]) ** 2
+            order = np.argsort(distances.sum(axis=2), axis=1, kind="stable")[:, : self.n_neighbors]
+            nearest = np.take_along_axis(donors, order[:, :, None], axis=1)
+            estimate = np.where(incomplete_mask, nearest.mean(axis=1), incomplete)
+
+        X[rows] = estimate
+        return X
+
+
+def masked_rmse(imputer, X, missing_rate=0.1, holdout=0.3, random_state=0):
+    """
+    Fit ``imputer`` on part of the complete matrix ``X``, hide ``missing_rate`` of the cells of the
+    held-out rows and return the root mean squared error of the imputed values.
+    """
+    rng = np.random.default_rng(random_state)
+    X = np.asarray(X, dtype=np.float64)[rng.permutation(len(X))]
+    split = int(len(X) * (1 - holdout))
+    train, test = X[:split], X[split:]
+
+    mask = rng.random(test.shape) < missing_rate
+    # Keep at least one observed value per row, the notebook drops rows missing more than that
+    mask[mask.all(axis=1), 0] = False
+    damaged = test.copy()
+    damaged[mask] = np.nan
+    imputed = imputer.fit(train).transform(damaged)
+    return float(np.sqrt(np.mean((imputed[mask] - test[mask]) ** 2)))
@@ -0,0 +1,172 @@
+"""
+Process-wide credit model, loaded once and warmed before traffic arrives.
+
+Importing this module is cheap: pickle, pandas and scikit-learn are only imported when the model
+is loaded or a frame is scored. Under gunicorn with ``preload_app`` the master process warms the
+model from ``CalculateConfig.ready`` and forked workers share its memory pages.
+
+CREDIT_MODEL_PATH is either a model artifact directory (see calculate.scoring.artifact), which is
+memory-mapped and checksummed, or a legacy pickle file.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger("credit_parameters")
+
+# A typical applicant, used to exercise the cleaning and prediction code paths once at startup
+WARMUP_RECORD = {
+    "name": "Warm Up",
+    "occupation": "Engineer",
+    "delay_from_due_date": "0",
+    "credit_mix": "Standard",
+    "payment_of_minimum_amount": "Yes",
+    "payment_behaviour": "low_spend_small_value_payments",
+    "changed_credit_limit": "0",
+    "age": 30,
+    "annual_income": 50000.0,
+    "monthly_in_hand_salary": 4000.0,
+    "number_of_bank_accounts": 2,
+    "number_of_credit_cards": 1,
+    "interest_rate": 12.5,
+    "number_of_loans": 1,
+    "number_of_delayed_payment": 0,
+    "num_credit_inquiries": 0,
+    "outstanding_debt": 1000.0,
+    "credit_utilization_ratio": 10.5,
+    "total_emi_per_month": 500.0,
+    "amount_invested_monthly": 200.0,
+    "monthly_balance": 3000.0,
+}
+
+_lock = threading.Lock()
+_state = {"model": None, "version": None, "warm": False, "load_seconds": None, "warm_seconds": None, "error": None}
+
+
+def model_path():
+    return str(getattr(settings, "CREDIT_MODEL_PATH", "credit_model.sav"))
+
+
+def read_model(filename):
+    """
+    Read the model at ``filename`` and return ``(model, version, size)``, with ``size`` its
+    approximate footprint in bytes. Raises FileNotFoundError if it is missing and ArtifactError
+    if an artifact fails its checks.
+    """
+    import hashlib
+    import pickle
+
+    if not os.path.exists(filename):
+        logger.error(f"Model file not found: {filename}")
+        raise FileNotFoundError(f"Model file {filename} not found")
+
+    logger.info(f"Loading credit model from {filename}")
+    if os.path.isdir(filename):
+        from calculate.scoring.artifact import load_artifact
+
+        model = load_artifact(filename)
+        return model, model.version, sum(array.nbytes for array in model.arrays.values())
+
+    logger.warning("Loading a pickled credit model, convert it with export_model_artifact")
+    with open(filename, "rb") as file:
+        data = file.read()
+    return pickle.loads(data), hashlib.sha256(data).hexdigest()[:12], len(data)
+
+
+def load_model():
+    """
+    Return the credit model, loading it on first use. Raises FileNotFoundError if it is missing and
+    ArtifactError if an artifact fails its checks.
+    """
+    model = _state["model"]
+    if model is not None:
+        return model
+    with _lock:
+        if _state["model"] is None:
+            start = time.perf_counter()
+            model, version, _ = read_model(model_path())
+            # The version identifies the model in the scoring history
+            _state.update(model=model, version=version, load_seconds=time.perf_counter() - start)
+        return _state["model"]
+
+
+def model_version():
+    """Artifact version or short content hash of the loaded model file, None before it is loaded"""
+    return _state["version"]
+
+
+def score_records(model, records, observe=True):
+    """
+    Clean and score CreditParameters field dicts, returning ``(scores, source)`` as predict_scores
+    does. With ``observe`` the cleaned inputs are added to the input drift histograms. Model
+    scores are shared between workers through calculate.scoring.prediction_cache.
+    """
+    from calculate.scoring.features import build_frame
+
+    records = list(records)
+    return score_frame(model, build_frame(records), observe, records)
+
+
+def score_frame(model, frame, observe=True, records=None):
+    """score_records for a model input frame as built by build_frame, from ``records`` if given"""
+    from calculate.scoring import prediction_cache
+    from calculate.scoring.cleaning import clean_frame
+    from calculate.scoring.drift import monitor
+    from calculate.scoring.rules import predict_scores
+
+    frame = clean_frame(frame)
+    logger.info(f"Prepared data for prediction: {frame.shape}")
+    if observe:
+        monitor.observe(model, frame)
+    if records is None:
+        return predict_scores(model, frame)
+    return prediction_cache.predict(model, _version_of(model), records, frame)
+
+
+def _version_of(model):
+    # Artifacts carry their version, the default model's pickle is versioned by its content hash
+    version = getattr(model, "version", None)
+    if isinstance(version, str):
+        return version
+    return _state["version"] if model is _state["model"] else None
+
+
+def warm():
+    """
+    Load the model and score WARMUP_RECORD once, so the first real request pays no import or
+    load cost. Returns True when the model is warm; failures are logged and recorded in status().
+    """
+    if _state["warm"]:
+        return True
+    try:
+        start = time.perf_counter()
+        score_records(load_model(), [WARMUP_RECORD], observe=False)
+    except Exception as e:
+        logger.error(f"Failed to warm the credit model: {str(e)}", exc_info=True)
+        _state["error"] = str(e)
+        return False
+    _state.update(warm=True, warm_seconds=time.perf_counter() - start, error=None)
+    logger.info(f"Credit model warm after {_state['warm_seconds']:.2f}s")
+    return True
+
+
+def status():
+    """Model warm state for the readiness endpoint"""
+    return {
+        "path": model_path(),
+        "loaded": _state["model"] is not None,
+        "version": _state["version"],
+        "warm": _state["warm"],
+        "load_seconds": _state["load_seconds"],
+        "warm_seconds": _state["warm_seconds"],
+        "error": _state["error"],
+    }
+
+
+def reset():
+    """Forget the loaded model, the next load_model() call reads the file again"""
+    with _lock:
+        _state.update(model=None, version=None, warm=False, load_seconds=None, warm_seconds=None, error=None)
@@ -0,0 +1,257 @@
+"""
+Model scores shared by every worker on a host, in a fixed-size table in shared memory.
+
+The table is an open-addressed hash table of CREDIT_PREDICTION_CACHE_SLOTS slots in a
+``multiprocessing.shared_memory`` block. A slot holds the first 128 bits of a record's inputs
+hash (see history.inputs_hash), a hash of the model version and the score as an index into
+LABELS. A key lives in one of the PROBE slots from its home slot, so lookups and inserts look at
+a fixed window, and entries are only ever overwritten, never removed.
+
+Reads take no lock. Each slot has a sequence number that a writer makes odd before it changes
+the slot and even again after, and a batch of lookups copies its windows between two reads of
+their sequence numbers: a slot whose number changed, or was odd, is treated as a miss. numpy
+issues no memory barriers, so this relies on a writer's stores becoming visible in order, as
+they do on x86-64 and on no weaker memory model: on other machines shared() returns None and
+nothing is cached. Writers lock the stripes of the PROBE-slot regions their window touches, so
+two writers only wait for each other when their windows may overlap. A writer that cannot take
+its locks within LOCK_TIMEOUT, e.g. because a worker was killed holding one, does not cache that
+score, and then only tries that lock without waiting until it takes it again. When a window is
+full the writer evicts clock style: it sweeps the window from a point set by the key, clearing
+the reference bit that each hit sets, and takes the first slot whose bit was already clear.
+
+The block and its locks are created on first use. Under gunicorn with ``preload_app`` that is in
+the master process (see CalculateConfig.ready), so every forked worker shares them; a process
+that creates its own only shares with itself. Only model scores are cached, rule engine scores
+are cheap and would outlive the model coming back.
+"""
+import atexit
+import functools
+import hashlib
+import logging
+import multiprocessing
+import os
+import platform
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+from django.conf import settings
+
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("prediction_cache")
+
+LABELS = ("poor", "standard", "good")
+PROBE = 8
+STRIPES = 64
+# Seconds a writer waits for a stripe lock before it gives up on caching a score
+LOCK_TIMEOUT = 0.05
+# Machines whose stores become visible to other cores in program order, see the module docstring
+ORDERED_STORES = {"x86_64", "amd64"}
+SLOT = np.dtype(
+    [
+        ("sequence", "<u4"),
+        ("reference", "u1"),
+        ("code", "u1"),
+        ("padding", "u1", 2),
+        ("version", "<u8"),
+        ("key", "<u8", 2),
+    ]
+)
+
+
+def version_hash(version):
+    """A non-zero 64-bit hash of a model version string"""
+    digest = hashlib.blake2b(str(version).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") | 1
+
+
+def record_keys(records):
+    """The ``(n, 2)`` uint64 keys of CreditParameters field dicts, from their inputs hashes"""
+    from calculate.scoring.history import inputs_hash
+
+    digests = b"".join(bytes.fromhex(inputs_hash(record))[:16] for record in records)
+    return np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+
+
+class PredictionCache:
+    """See the module docstring"""
+
+    def __init__(self, slots):
+        # A whole number of lock regions, so a window wraps onto region 0
+        self.slots = max(PROBE, slots - slots % PROBE)
+        self._memory = shared_memory.SharedMemory(create=True, size=self.slots * SLOT.itemsize)
+        self._table = np.ndarray(self.slots, dtype=SLOT, buffer=self._memory.buf)
+        self._table[:] = 0
+        self._locks = [multiprocessing.Lock() for _ in range(STRIPES)]
+        self._offsets = np.arange(PROBE, dtype=np.uint64)
+        # Stripes whose lock this process last failed to take, tried without waiting
+        self._stuck = set()
+
+    def _windows(self, keys):
+        return ((keys[:, 0, None] % np.uint64(self.slots)) + self._offsets) % np.uint64(self.slots)
+
+    def get(self, keys, version):
+        """
+        Look up ``keys`` for model ``version``. Returns ``(hits, codes)``: a boolean array of the
+        keys found and, where found, their score codes.
+        """
+        windows = self._windows(keys).astype(np.intp)
+        before = self._table["sequence"][windows]
+        entries = self._table[windows]
+        after = self._table["sequence"][windows]
+        matches = (
+            (entries["key"][..., 0] == keys[:, 0, None])
+            & (entries["key"][..., 1] == keys[:, 1, None])
+            & (entries["version"] == np.uint64(version_hash(version)))
+            & (before == after)
+            & (before % 2 == 0)
+            & (before > 0)
+        )
+        hits = matches.any(axis=1)
+        positions = matches.argmax(axis=1)
+        rows = np.arange(len(keys))
+        self._table["reference"][windows[rows[hits], positions[hits]]] = 1
+        metrics.incr("hits", int(hits.sum()))
+        metrics.incr("misses", int(len(keys) - hits.sum()))
+        return hits, np.where(hits, entries["code"][rows, positions], 0)
+
+    def _stripes(self, home):
+        region = home // PROBE
+        regions = {region, (region + 1) % (self.slots // PROBE)}
+        return sorted({region % STRIPES for region in regions})
+
+    def put(self, keys, version, codes):
+        """
+        Store the score ``codes`` of ``keys`` for model ``version``. A key whose locks are not
+        taken within LOCK_TIMEOUT is not stored.
+        """
+        version = np.uint64(version_hash(version))
+        for key, window, code in zip(keys, self._windows(keys).astype(np.intp), codes):
+            held = []
+            try:
+                for stripe in self._stripes(int(window[0])):
+                    if not self._acquire(stripe):
+                        break
+                    held.append(stripe)
+                else:
+                    self._write(self._victim(key, window), key, version, code)
+            finally:
+                for stripe in reversed(held):
+                    self._locks[stripe].release()
+
+    def _acquire(self, stripe):
+        if stripe in self._stuck:
+            taken = self._locks[stripe].acquire(block=False)
+        else:
+            taken = self._locks[stripe].acquire(timeout=LOCK_TIMEOUT)
+        if taken:
+            self._stuck.discard(stripe)
+        else:
+            self._stuck.add(stripe)
+            metrics.incr("lock_timeouts")
+        return taken
+
+    def _victim(self, key, window):
+        # Called with the window's stripes locked
+        entries = self._table[window]
+        same = (entries["key"][:, 0] == key[0]) & (entries["key"][:, 1] == key[1])
+        if same.any():
+            return window[same.argmax()]
+        empty = entries["sequence"] == 0
+        if empty.any():
+            return window[empty.argmax()]
+        metrics.incr("evictions")
+        start = int(key[1] % np.uint64(PROBE))
+        for offset in range(PROBE):
+            index = window[(start + offset) % PROBE]
+            if not self._table["reference"][index]:
+                return index
+            self._table["reference"][index] = 0
+        return window[start]
+
+    def _write(self, index, key, version, code):
+        sequence = int(self._table["sequence"][index])
+        # Odd while the slot is being written; zero is kept for empty slots
+        self._table["sequence"][index] = (sequence + 1) % 2**32 or 1
+        self._table["key"][index] = key
+        self._table["version"][index] = version
+        self._table["code"][index] = code
+        self._table["reference"][index] = 1
+        self._table["sequence"][index] = (sequence + 2) % 2**32 or 2
+
+    def stats(self):
+        used = int(np.count_nonzero(self._table["sequence"]))
+        return {"slots": self.slots, "used": used, "bytes": self._memory.size, **metrics.snapshot()}
+
+    def clear(self):
+        self._table[:] = 0
+
+    def close(self):
+        """Release the block, unlinking it; only for a cache no other process uses"""
+        del self._table
+        self._memory.close()
+        self._memory.unlink()
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def shared():
+    """
+    The PredictionCache of this process, created on first use. None if CREDIT_PREDICTION_CACHE_SLOTS
+    is 0 or the machine does not keep stores in order.
+    """
+    global _cache
+    slots = getattr(settings, "CREDIT_PREDICTION_CACHE_SLOTS", 0)
+    if _cache is None and slots and ordered_stores():
+        with _lock:
+            if _cache is None:
+                _cache = PredictionCache(slots)
+                atexit.register(_release, _cache, os.getpid())
+    return _cache
+
+
+@functools.cache
+def ordered_stores():
+    """Whether the lock-free reads are safe on this machine, logged once when they are not"""
+    if platform.machine().lower() in ORDERED_STORES:
+        return True
+    logger.warning(f"Prediction cache disabled: lock-free reads are not safe on {platform.machine()}")
+    return False
+
+
+def _release(cache, pid):
+    # Forked workers run the exit handlers too, the block is the creating process's to unlink
+    if os.getpid() == pid:
+        cache.close()
+
+
+def predict(model, version, records, frame):
+    """
+    predict_scores for the cleaned ``frame`` of ``records``, with the scores of model ``version``
+    served from the shared cache where it has them. Only the other rows are predicted, and their
+    scores are cached. If the model falls back to the rules, every row is scored by the rules so
+    one source covers the batch.
+    """
+    from calculate.scoring.rules import predict_scores, rule_scores
+
+    cache = shared()
+    if cache is None or not isinstance(version, str) or not len(frame):
+        return predict_scores(model, frame)
+
+    keys = record_keys(records)
+    hits, codes = cache.get(keys, version)
+    scores = np.asarray(LABELS, dtype=object)[codes]
+    misses = np.flatnonzero(~hits)
+    if len(misses):
+        fresh, source = predict_scores(model, frame.iloc[misses])
+        if source != "model":
+            return rule_scores(frame), source
+        lookup = {label: code for code, label in enumerate(LABELS)}
+        known = [index for index, score in enumerate(fresh) if score in lookup]
+        cache.put(keys[misses[known]], version, [lookup[fresh[index]] for index in known])
+        scores[misses] = fresh
+    return scores.astype(str), "model"
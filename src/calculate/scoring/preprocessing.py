@@ -0,0 +1,37 @@
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, RobustScaler, StandardScaler
+
+from calculate.scoring.features import CATEGORICAL_FEATURES, LOAN_TYPE_FEATURES, NUMERICAL_FEATURES
+from calculate.scoring.imputation import NeighbourImputer
+
+
+def build_preprocessor(categorical=None, numerical=None, max_reference=2048, loan_types=False):
+    """
+    Build the feature pre-processing pipeline used by the credit model.
+
+    This is the research notebook's ColumnTransformer with KNNImputer replaced by NeighbourImputer,
+    so the fitted pipeline carries a capped neighbour index rather than the full training matrix.
+    The notebook's mean SimpleImputer ahead of KNNImputer is gone, it filled every gap before the
+    neighbour search could run. Columns default to the features accepted by the API. With
+    ``loan_types`` the loan type counts of LOAN_TYPE_FEATURES are numerical features too.
+    """
+    categorical = list(categorical or CATEGORICAL_FEATURES.values())
+    numerical = list(numerical or NUMERICAL_FEATURES.values())
+    if loan_types:
+        numerical += LOAN_TYPE_FEATURES.values()
+
+    categorical_transformer = Pipeline([
+        ("imputer_categoric", SimpleImputer(strategy="most_frequent")),
+        ("onehot", OneHotEncoder(handle_unknown="ignore")),
+    ])
+    numeric_transformer = Pipeline([
+        ("imputer_numeric", NeighbourImputer(n_neighbors=2, max_reference=max_reference)),
+        ("robust", RobustScaler()),
+        ("standard", StandardScaler()),
+    ])
+    return ColumnTransformer(
+        [("categoricals", categorical_transformer, categorical), ("numericals", numeric_transformer, numerical)],
+        remainder="drop",
+    )
@@ -0,0 +1,193 @@
+"""
+Named credit models, routed per request and loaded lazily under a memory budget.
+
+CREDIT_MODELS maps model names to artifact directories or pickles. The model at CREDIT_MODEL_PATH
+is always available as ``default``. It is the one calculate.scoring.loader preloads and warms, and
+it is never evicted. Every other model is loaded on first use. Once the models loaded in a worker
+exceed CREDIT_MODEL_MEMORY_BUDGET_MB, the least recently used ones are dropped; requests already
+scoring with a dropped model keep their reference until they finish.
+
+A request is routed by the first of these that is set:
+
+- the ``X-Credit-Model`` header, naming a model explicitly
+- the ``X-Tenant`` header, looked up in CREDIT_MODEL_ROUTES["tenants"]
+- the ``X-Region`` header, or else CREDIT_REGION for this deployment, looked up in
+  CREDIT_MODEL_ROUTES["regions"]
+
+Requests that match no route are scored by ``default``. The routes are checked against the
+configured models once, when the app is ready, see check_routes.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("models")
+
+DEFAULT = "default"
+MODEL_HEADER = "X-Credit-Model"
+TENANT_HEADER = "X-Tenant"
+REGION_HEADER = "X-Region"
+
+
+class UnknownModel(LookupError):
+    """A request or route named a model that is not configured"""
+
+
+class ModelRegistry:
+    """The models loaded in this process, most recently used last"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._loaded = OrderedDict()
+        self._stats = {}
+
+    @staticmethod
+    def paths():
+        """Configured model names and their paths, ``default`` included"""
+        from calculate.scoring.loader import model_path
+
+        return {**getattr(settings, "CREDIT_MODELS", {}), DEFAULT: model_path()}
+
+    def check_routes(self):
+        """Raise ImproperlyConfigured if CREDIT_MODEL_ROUTES names a model that is not configured"""
+        paths = self.paths()
+        routes = getattr(settings, "CREDIT_MODEL_ROUTES", {})
+        unknown = sorted({name for table in routes.values() for name in table.values()} - set(paths))
+        if unknown:
+            raise ImproperlyConfigured(f"CREDIT_MODEL_ROUTES names unknown credit models {', '.join(unknown)}")
+
+    def route(self, headers):
+        """
+        Name of the model for a request with ``headers``. Raises UnknownModel if the request names
+        a model that is not configured.
+        """
+        paths = self.paths()
+        routes = getattr(settings, "CREDIT_MODEL_ROUTES", {})
+        name = headers.get(MODEL_HEADER)
+        if name:
+            if name not in paths:
+                raise UnknownModel(f"Unknown credit model '{name}'")
+            return name
+
+        name = routes.get("tenants", {}).get(headers.get(TENANT_HEADER))
+        if name is None:
+            region = headers.get(REGION_HEADER) or getattr(settings, "CREDIT_REGION", "")
+            name = routes.get("regions", {}).get(region, DEFAULT)
+        if name not in paths:
+            # Only once the settings changed after check_routes, so score with the default model
+            logger.warning(f"CREDIT_MODEL_ROUTES names unknown credit model '{name}', using {DEFAULT}")
+            return DEFAULT
+        return name
+
+    def get(self, name):
+        """Return model ``name``, loading it and evicting least recently used models as needed"""
+        from calculate.scoring import loader
+
+        self._count(name, "hits")
+        if name == DEFAULT:
+            return loader.load_model()
+
+        path = self.paths().get(name)
+        if path is None:
+            raise UnknownModel(f"Unknown credit model '{name}'")
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None and entry["path"] == path:
+                self._loaded.move_to_end(name)
+                return entry["model"]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Models load under their own lock, so a slow load does not hold up requests for other models
+        with load_lock:
+            with self._lock:
+                entry = self._loaded.get(name)
+                if entry is not None and entry["path"] == path:
+                    return entry["model"]
+            start = time.perf_counter()
+            model, version, size = loader.read_model(path)
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._loaded[name] = {"model": model, "path": path, "version": version, "size": size}
+                stats = self._stats.setdefault(name, {})
+                stats.update(load_seconds=seconds, loads=stats.get("loads", 0) + 1)
+                self._evict(keep=name)
+            metrics.incr("loads")
+            logger.info(f"Loaded credit model {name} version {version} ({size} bytes) in {seconds:.2f}s")
+            return model
+
+    def loader(self, name):
+        """A callable returning model ``name``, for score_within"""
+        return lambda: self.get(name)
+
+    def version(self, name):
+        """Version of model ``name`` if it is loaded, else None"""
+        from calculate.scoring.loader import model_version
+
+        if name == DEFAULT:
+            return model_version()
+        with self._lock:
+            entry = self._loaded.get(name)
+            return entry["version"] if entry is not None else None
+
+    def _evict(self, keep):
+        # Called with self._lock held
+        budget = getattr(settings, "CREDIT_MODEL_MEMORY_BUDGET_MB", 512) * 1024 * 1024
+        total = sum(entry["size"] for entry in self._loaded.values())
+        for name in list(self._loaded):
+            if total <= budget:
+                break
+            if name == keep:
+                continue
+            total -= self._loaded.pop(name)["size"]
+            stats = self._stats.setdefault(name, {})
+            stats["evictions"] = stats.get("evictions", 0) + 1
+            metrics.incr("evictions")
+            logger.info(f"Evicted credit model {name} to stay within the memory budget")
+
+    def _count(self, name, counter):
+        with self._lock:
+            stats = self._stats.setdefault(name, {})
+            stats[counter] = stats.get(counter, 0) + 1
+
+    def stats(self):
+        """Per model load state, version, size, load time and hit and eviction counts"""
+        from calculate.scoring import loader
+
+        default = loader.status()
+        with self._lock:
+            loaded = {name: dict(entry) for name, entry in self._loaded.items()}
+            counts = {name: dict(values) for name, values in self._stats.items()}
+        result = {}
+        for name, path in self.paths().items():
+            entry, values = loaded.get(name, {}), counts.get(name, {})
+            if name == DEFAULT:
+                entry = {"version": default["version"], "size": None} if default["loaded"] else {}
+                values = {**values, "load_seconds": default["load_seconds"], "loads": int(default["loaded"])}
+            result[name] = {
+                "path": path,
+                "loaded": bool(entry),
+                "version": entry.get("version"),
+                "size_bytes": entry.get("size"),
+                "load_seconds": values.get("load_seconds"),
+                "loads": values.get("loads", 0),
+                "hits": values.get("hits", 0),
+                "evictions": values.get("evictions", 0),
+            }
+        return result
+
+    def reset(self):
+        """Drop every loaded model other than ``default`` and clear the counts"""
+        with self._lock:
+            self._loaded.clear()
+            self._stats.clear()
+
+
+registry = ModelRegistry()
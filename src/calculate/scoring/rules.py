@@ -0,0 +1,41 @@
+"""
+Rule-based credit score used when the saved model cannot score a frame.
+
+The rules read the cleaned model input frame (training column names), so one call scores any
+number of rows.
+"""
+import numpy as np
+
+POOR_DELAYED_PAYMENTS = 10
+POOR_UTILIZATION = 80
+GOOD_DELAYED_PAYMENTS = 2
+GOOD_UTILIZATION = 30
+GOOD_CREDIT_MIX = ("good", "standard")
+
+
+def rule_scores(frame):
+    """Return an array of "poor" / "standard" / "good" for every row of a cleaned input frame"""
+    delayed = frame["Num_of_Delayed_Payment"].to_numpy(dtype="float64", na_value=np.nan)
+    utilization = frame["Credit_Utilization_Ratio"].to_numpy(dtype="float64", na_value=np.nan)
+    credit_mix = frame["Credit_Mix"].astype("string").str.lower().isin(GOOD_CREDIT_MIX).to_numpy(dtype=bool)
+
+    poor = (delayed > POOR_DELAYED_PAYMENTS) | (utilization > POOR_UTILIZATION)
+    good = (delayed <= GOOD_DELAYED_PAYMENTS) & (utilization < GOOD_UTILIZATION) & credit_mix
+    return np.select([poor, good], ["poor", "good"], default="standard")
+
+
+def predict_scores(model, frame):
+    """
+    Score a cleaned input frame with ``model``, falling back to the rules when it cannot.
+
+    The saved model does not include the preprocessing pipeline, so ``predict`` raises a
+    ValueError on the raw feature count. Returns ``(scores, source)`` with source "model" or
+    "rules".
+    """
+    try:
+        predictions = np.ravel(model.predict(frame))
+    except ValueError:
+        return rule_scores(frame), "rules"
+    if len(predictions) != len(frame):
+        raise ValueError(f"Model returned {len(predictions)} predictions for {len(frame)} rows")
+    return np.char.lower(predictions.astype(str)), "model"
@@ -0,0 +1,74 @@
+"""
+What-if scoring of one applicant over a grid of numerical feature values.
+
+The grid is the cartesian product of one list of values per varied field. The applicant is built
+and cleaned once and each axis's values are cleaned once. The scenario frame is then the cleaned
+applicant row repeated once per grid point, with the varied columns filled from the grid, so a
+single predict call scores every point.
+
+numpy and pandas are imported by the functions, so the API can import this module at startup.
+"""
+from calculate.scoring.features import NUMERICAL_FEATURES
+
+
+def grid_points(axes):
+    """Every combination of the ``(field, values)`` axes as a ``(points, len(axes))`` matrix, last axis fastest"""
+    import numpy as np
+
+    grids = np.meshgrid(*[np.asarray(values, dtype=np.float64) for _, values in axes], indexing="ij")
+    return np.stack([grid.ravel() for grid in grids], axis=1)
+
+
+def scenario_frame(applicant, axes):
+    """
+    Return ``(frame, values)``: the cleaned model input frame for every grid point, and each
+    axis's values as cleaning normalised them.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from calculate.scoring.cleaning import clean_frame
+    from calculate.scoring.features import build_frame
+
+    base = clean_frame(build_frame([applicant]))
+    columns = [NUMERICAL_FEATURES[field] for field, _ in axes]
+    # Axis values go through the same cleaning as a request would, e.g. monetary columns are rounded
+    values = [
+        clean_frame(pd.DataFrame({column: np.asarray(axis, dtype=np.float64)}))[column].to_numpy()
+        for column, (_, axis) in zip(columns, axes)
+    ]
+    points = grid_points(list(zip(columns, values)))
+    frame = base.iloc[np.zeros(len(points), dtype=np.intp)].reset_index(drop=True)
+    for index, column in enumerate(columns):
+        frame[column] = points[:, index]
+    return frame, values
+
+
+def score_grid(model, applicant, axes):
+    """
+    Score ``applicant`` at every point of the grid of ``(field, values)`` axes with one predict call.
+
+    Returns ``(scores, source, values)``: the scores as an array shaped like the grid, the source
+    as from predict_scores, and each axis's cleaned values.
+    """
+    import numpy as np
+
+    from calculate.scoring.rules import predict_scores
+
+    frame, values = scenario_frame(applicant, axes)
+    scores, source = predict_scores(model, frame)
+    return np.asarray(scores).reshape([len(axis) for axis in values]), source, values
+
+
+def encode_scores(scores, labels):
+    """
+    Return ``(codes, labels)`` with every score replaced by its index in ``labels``. Scores not in
+    ``labels`` are appended to it.
+    """
+    import numpy as np
+
+    labels = list(labels)
+    found, inverse = np.unique(scores, return_inverse=True)
+    labels += [str(label) for label in found if label not in labels]
+    lookup = np.array([labels.index(label) for label in found], dtype=np.intp)
+    return lookup[inverse].reshape(np.shape(scores)), labels
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from calculate.api.caching import invalidate_credit_parameters
+from calculate.models import CreditLoans, CreditParameters
+from users.deletion import bulk_restored, bulk_soft_deleted
+
+
+@receiver(post_save, sender=CreditParameters)
+@receiver(post_delete, sender=CreditParameters)
+def invalidate_saved_credit_parameters(sender, instance, **kwargs):
+    # Soft deletes and restores are saves, so every ORM write to a record lands here
+    invalidate_credit_parameters(instance.pk)
+
+
+@receiver(post_save, sender=CreditLoans)
+@receiver(post_delete, sender=CreditLoans)
+def invalidate_loan_credit_parameters(sender, instance, **kwargs):
+    invalidate_credit_parameters(instance.credit_check_id)
+
+
+@receiver(bulk_soft_deleted, sender=CreditParameters)
+@receiver(bulk_restored, sender=CreditParameters)
+def invalidate_cascaded_credit_parameters(sender, pks, **kwargs):
+    invalidate_credit_parameters(*pks)
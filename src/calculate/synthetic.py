@@ -0,0 +1,265 @@
+"""
+Synthetic User and CreditParameters rows for load tests, benchmarks and capacity planning.
+
+Rows are generated a batch at a time as numpy columns. Each numerical feature is drawn by inverse
+transform sampling from the rounded deciles of the cleaned credit_data.csv in MARGINALS, and each
+categorical one from its training shares. The in-hand salary follows the annual income it belongs
+to; the other features are drawn independently. Batch ``n`` is generated from the seed
+``(seed, n)``, so a seed and batch size always give the same rows, and any batch can be
+regenerated on its own.
+
+load() writes the batches with COPY on PostgreSQL and with ``bulk_create`` elsewhere. Neither
+builds a password hash per user: every synthetic user gets the same unusable password.
+"""
+import io
+import logging
+import uuid
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from helpers.metrics import counters
+
+logger = logging.getLogger("credit_parameters")
+metrics = counters("synthetic")
+
+DEFAULT_BATCH_SIZE = 10_000
+# The same unusable password for every synthetic user, the "!" prefix set_unusable_password uses
+PASSWORD = "!synthetic"
+
+DECILES = np.linspace(0, 1, 11)
+# Rounded deciles, minimum to maximum, of the numerical features of the cleaned credit_data.csv
+MARGINALS = {
+    "age": [14, 20, 24, 27, 30, 33, 36, 39, 42, 46, 56],
+    "annual_income": [7006, 12000, 16500, 21500, 28000, 37500, 47000, 60000, 77000, 102000, 179987],
+    "number_of_bank_accounts": [0, 2, 3, 4, 5, 6, 7, 7, 8, 9, 11],
+    "number_of_credit_cards": [0, 3, 4, 4, 5, 5, 6, 7, 7, 8, 11],
+    "interest_rate": [1, 3, 5, 7, 10, 13, 16, 19, 22, 26, 34],
+    "number_of_loans": [0, 0, 1, 2, 2, 3, 4, 5, 6, 7, 9],
+    "delay_from_due_date": [0, 5, 8, 11, 15, 18, 21, 25, 30, 40, 67],
+    "number_of_delayed_payment": [0, 4, 7, 9, 11, 14, 16, 17, 19, 21, 28],
+    "changed_credit_limit": [-6.49, 2.5, 4.5, 6.3, 8, 9.4, 11, 13, 15.5, 19.5, 36.97],
+    "num_credit_inquiries": [0, 1, 2, 3, 4, 6, 7, 8, 9, 11, 17],
+    "outstanding_debt": [0.23, 300, 550, 800, 1000, 1166, 1450, 1800, 2500, 3300, 4998],
+    "credit_utilization_ratio": [20, 25.5, 27.5, 29.5, 31, 32.3, 33.8, 35.3, 37, 39.5, 50],
+    "total_emi_per_month": [0, 0, 20, 35, 50, 70, 95, 130, 180, 270, 1780],
+    "amount_invested_monthly": [0, 25, 45, 65, 90, 130, 165, 220, 300, 480, 2000],
+    "monthly_balance": [0.1, 150, 230, 270, 310, 337, 380, 440, 520, 700, 1600],
+}
+INTEGER_FIELDS = [
+    "age",
+    "number_of_bank_accounts",
+    "number_of_credit_cards",
+    "number_of_loans",
+    "delay_from_due_date",
+    "number_of_delayed_payment",
+    "num_credit_inquiries",
+]
+# Shares of each category in the training data, without its junk values
+CATEGORIES = {
+    "occupation": {
+        occupation: 1 / 15
+        for occupation in (
+            "Scientist",
+            "Teacher",
+            "Engineer",
+            "Entrepreneur",
+            "Developer",
+            "Lawyer",
+            "Media_Manager",
+            "Doctor",
+            "Journalist",
+            "Manager",
+            "Accountant",
+            "Musician",
+            "Mechanic",
+            "Writer",
+            "Architect",
+        )
+    },
+    "credit_mix": {"Standard": 0.46, "Good": 0.30, "Bad": 0.24},
+    "payment_of_minimum_amount": {"Yes": 0.52, "No": 0.36, "NM": 0.12},
+    "payment_behaviour": {
+        "low_spend_small_value_payments": 0.28,
+        "high_spend_medium_value_payments": 0.19,
+        "low_spend_medium_value_payments": 0.15,
+        "high_spend_large_value_payments": 0.15,
+        "high_spend_small_value_payments": 0.12,
+        "low_spend_large_value_payments": 0.11,
+    },
+    "credit_score": {"standard": 0.53, "poor": 0.29, "good": 0.18},
+}
+# Columns of generate() that belong to the User, the rest are CreditParameters fields
+USER_FIELDS = ("email", "first_name", "last_name", "phone_number", "uuid")
+FIRST_NAMES = np.array(
+    ["Aaron", "Amara", "Ben", "Chloe", "Daniel", "Eva", "Farah", "George", "Hana", "Isaac", "Jade", "Kofi"]
+    + ["Laura", "Mateo", "Nina", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tariq", "Uma", "Victor", "Yara"]
+)
+LAST_NAMES = np.array(
+    ["Adams", "Brown", "Chen", "Davies", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Jones", "Khan"]
+    + ["Lopez", "Murphy", "Novak", "Okafor", "Patel", "Rossi", "Singh", "Taylor", "Wilson", "Young"]
+)
+
+
+def _sample(rng, field, size):
+    return np.interp(rng.random(size), DECILES, MARGINALS[field])
+
+
+def _choice(rng, field, size):
+    shares = CATEGORIES[field]
+    return rng.choice(np.array(list(shares), dtype=object), size=size, p=np.array(list(shares.values())))
+
+
+def _uuids(rng, size):
+    # Random version 4 UUIDs drawn from the batch's generator, so they are reproducible too
+    data = np.frombuffer(rng.bytes(16 * size), dtype=np.uint8).reshape(size, 16).copy()
+    data[:, 6] = data[:, 6] & 0x0F | 0x40
+    data[:, 8] = data[:, 8] & 0x3F | 0x80
+    return np.array([uuid.UUID(bytes=row.tobytes()) for row in data], dtype=object)
+
+
+def generate(size, seed=0, batch=0):
+    """
+    Batch number ``batch`` of ``size`` synthetic rows as a dict of column arrays: the User fields
+    ``email``, ``first_name``, ``last_name``, ``phone_number`` and ``uuid``, and the CreditParameters
+    fields, ``id`` included. Monetary and rate columns are floats rounded to two decimal places.
+    """
+    rng = np.random.default_rng([seed, batch])
+    start = batch * size
+    first = FIRST_NAMES[rng.integers(len(FIRST_NAMES), size=size)].astype(object)
+    last = LAST_NAMES[rng.integers(len(LAST_NAMES), size=size)].astype(object)
+    rows = np.arange(start, start + size).astype(str).astype(object)
+    phones = np.char.zfill(rng.integers(10**9, size=size).astype(str), 9).astype(object)
+    columns = {
+        "email": f"synthetic.{seed}." + rows + "@example.com",
+        "first_name": first,
+        "last_name": last,
+        "phone_number": "07" + phones,
+        "uuid": _uuids(rng, size),
+        "id": _uuids(rng, size),
+        "name": first + " " + last,
+    }
+    for field in MARGINALS:
+        values = _sample(rng, field, size)
+        columns[field] = np.rint(values).astype(np.int64) if field in INTEGER_FIELDS else values.round(2)
+    # In-hand salary is a twelfth of the annual income less deductions
+    columns["monthly_in_hand_salary"] = (columns["annual_income"] / 12 * rng.uniform(0.8, 1.0, size)).round(2)
+    # Both are text fields of the model
+    columns["delay_from_due_date"] = columns["delay_from_due_date"].astype(str).astype(object)
+    columns["changed_credit_limit"] = np.char.mod("%.2f", columns["changed_credit_limit"]).astype(object)
+    for field in CATEGORIES:
+        columns[field] = _choice(rng, field, size)
+    return columns
+
+
+def iter_batches(rows, batch_size=DEFAULT_BATCH_SIZE, seed=0):
+    """Yield the column batches of ``rows`` synthetic rows, the last one possibly shorter"""
+    for batch, start in enumerate(range(0, rows, batch_size)):
+        columns = generate(batch_size, seed, batch)
+        yield {name: values[: rows - start] for name, values in columns.items()}
+
+
+def _table(model, columns, now):
+    """
+    ``(names, values)`` for every column of ``model``'s table: the generated column if there is one,
+    ``now`` for automatic timestamps, else the field default or NULL. Values are arrays or scalars.
+    """
+    names, values = [], []
+    for field in model._meta.concrete_fields:
+        if field.attname in columns:
+            value = columns[field.attname]
+        elif getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            value = now
+        elif field.has_default():
+            value = field.get_default()
+        elif field.null:
+            value = None
+        else:
+            raise ValueError(f"No synthetic value for {model.__name__}.{field.name}")
+        names.append(field.column)
+        values.append(value)
+    return names, values
+
+
+def _copy(model, columns, now):
+    import pandas as pd
+
+    names, values = _table(model, columns, now)
+    size = len(columns["id"])
+    frame = pd.DataFrame({name: value if np.ndim(value) else [value] * size for name, value in zip(names, values)})
+    buffer = io.StringIO()
+    # In CSV format an unquoted empty field is NULL, synthetic text columns are never empty
+    frame.to_csv(buffer, index=False, header=False, float_format="%.2f")
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote(model._meta.db_table)} ({', '.join(map(quote, names))}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def _load_copy(columns, now):
+    from calculate.models import CreditParameters
+    from users.models import User
+
+    size = len(columns["email"])
+    table = User._meta.db_table
+    with connection.cursor() as cursor:
+        # Reserve the user ids up front, they are the credit parameters' foreign keys
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)", [table, size])
+        user_ids = np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+    user_columns = {name: columns[name] for name in USER_FIELDS}
+    _copy(User, {**user_columns, "id": user_ids, "password": PASSWORD}, now)
+    credit_columns = {name: values for name, values in columns.items() if name not in user_columns}
+    _copy(CreditParameters, {**credit_columns, "user_id": user_ids}, now)
+
+
+def _load_bulk_create(columns, batch_size):
+    from calculate.models import CreditParameters
+    from users.models import User
+
+    users = User.objects.bulk_create(
+        [
+            User(password=PASSWORD, **dict(zip(USER_FIELDS, row)))
+            for row in zip(*[columns[name].tolist() for name in USER_FIELDS])
+        ],
+        batch_size=batch_size,
+    )
+    credit_fields = [name for name in columns if name not in USER_FIELDS]
+    CreditParameters.objects.bulk_create(
+        [
+            CreditParameters(user=user, **dict(zip(credit_fields, row)))
+            for user, row in zip(users, zip(*[columns[name].tolist() for name in credit_fields]))
+        ],
+        batch_size=batch_size,
+    )
+
+
+def load(rows, batch_size=DEFAULT_BATCH_SIZE, seed=0, method="auto"):
+    """
+    Generate and insert ``rows`` synthetic users with their credit parameters, one transaction per
+    batch. ``method`` is "copy" (PostgreSQL only), "bulk_create", or "auto" for COPY where the
+    database supports it. Returns the number of rows inserted.
+
+    Emails are ``synthetic.<seed>.<row>@example.com``, so loading the same seed twice conflicts
+    with the live users of the first load; use another seed to add more rows.
+    """
+    if method == "auto":
+        method = "copy" if connection.vendor == "postgresql" else "bulk_create"
+    if method == "copy" and connection.vendor != "postgresql":
+        raise ValueError("COPY is only available on PostgreSQL")
+
+    inserted = 0
+    for columns in iter_batches(rows, batch_size, seed):
+        now = timezone.now()
+        with transaction.atomic():
+            if method == "copy":
+                _load_copy(columns, now)
+            else:
+                _load_bulk_create(columns, batch_size)
+        inserted += len(columns["email"])
+        metrics.incr("rows", len(columns["email"]))
+        logger.info(f"Loaded {inserted} of {rows} synthetic credit parameters with {method}")
+    return inserted
@@ -0,0 +1,69 @@
+import threading
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.api.admission import AdmissionController, ServiceOverloaded
+
+
+class AdmissionControllerTest(SimpleTestCase):
+    def controller(self, **kwargs):
+        options = {"max_concurrent": 1, "max_queue": 1, "queue_timeout": 5, "retry_after": 3}
+        controller = AdmissionController("test", **{**options, **kwargs})
+        controller.metrics.reset()
+        return controller
+
+    def test_sheds_when_queue_is_full(self):
+        controller = self.controller()
+        controller.acquire()
+        waiter = threading.Thread(target=controller.acquire)
+        waiter.start()
+        while controller.stats()["waiting"] == 0:
+            pass
+
+        with self.assertRaises(ServiceOverloaded) as raised:
+            controller.acquire()
+        self.assertEqual(raised.exception.wait, 3)
+
+        controller.release()
+        waiter.join()
+        stats = controller.stats()
+        self.assertEqual((stats["admitted"], stats["shed_queue_full"], stats["active"]), (2, 1, 1))
+
+    def test_sheds_after_queue_timeout(self):
+        controller = self.controller(queue_timeout=0.01)
+        with controller.admit():
+            with self.assertRaises(ServiceOverloaded):
+                controller.acquire()
+        stats = controller.stats()
+        self.assertEqual((stats["shed_timeout"], stats["waiting"], stats["active"]), (1, 0, 0))
+
+    def test_waiters_are_admitted_in_order(self):
+        controller = self.controller(max_queue=5)
+        order, threads = [], []
+        controller.acquire()
+        for n in range(5):
+            def run(n=n):
+                with controller.admit():
+                    order.append(n)
+
+            threads.append(threading.Thread(target=run))
+            threads[-1].start()
+            while controller.stats()["waiting"] <= n:
+                pass
+        controller.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, list(range(5)))
+        self.assertEqual(controller.stats()["active"], 0)
+
+
+class ScoringAdmissionTest(TestCase):
+    def test_create_is_shed_with_retry_after(self):
+        overloaded = AdmissionController("overloaded", max_concurrent=0, max_queue=0, queue_timeout=0, retry_after=7)
+        with patch("calculate.api.viewsets.scoring_admission", overloaded):
+            response = APIClient().post("/calculate/credit-parameters/", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "7")
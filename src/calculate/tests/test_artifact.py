@@ -0,0 +1,100 @@
+import json
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from calculate.scoring import loader
+from calculate.scoring.artifact import ArtifactError, export_model, load_artifact
+from calculate.scoring.features import CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+from calculate.scoring.preprocessing import build_preprocessor
+from calculate.scoring.rules import predict_scores
+
+
+def training_frame(rows, seed):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(rows, 3))
+    values = latent @ rng.normal(size=(3, 14)) + 0.3 * rng.normal(size=(rows, 14))
+    frame = pd.DataFrame(values, columns=list(NUMERICAL_FEATURES.values()))
+    for column in CATEGORICAL_FEATURES.values():
+        frame[column] = rng.choice(["a", "b", "c"], size=rows).astype(object)
+    good = values[:, 0] + (frame["Credit_Mix"] == "a") > 0.5
+    labels = np.where(good, "Good", np.where(latent[:, 1] > 0, "Poor", "Standard"))
+    return frame, labels
+
+
+class ModelArtifactTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        frame, labels = training_frame(2000, seed=0)
+        cls.pipeline = Pipeline([("preprocessor", build_preprocessor()), ("classifier", LinearSVC())])
+        cls.pipeline.fit(frame, labels)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_predictions_match_the_pipeline(self):
+        export_model(self.pipeline, self.directory)
+        model = load_artifact(self.directory)
+
+        frame, _ = training_frame(300, seed=1)
+        rng = np.random.default_rng(2)
+        for column in frame.columns:
+            frame.loc[rng.random(len(frame)) < 0.1, column] = np.nan
+        frame.loc[0, "Occupation"] = "unseen"
+
+        np.testing.assert_array_equal(model.predict(frame), self.pipeline.predict(frame))
+        np.testing.assert_allclose(model.decision_function(frame), self.pipeline.decision_function(frame), atol=1e-9)
+
+    def test_arrays_are_memory_mapped(self):
+        export_model(self.pipeline, self.directory)
+        model = load_artifact(self.directory / "manifest.json")
+        self.assertIsInstance(model.arrays["coef"], np.memmap)
+        self.assertIsInstance(model.arrays["imputer_reference"], np.memmap)
+        self.assertFalse(any(path.suffix == ".pkl" for path in self.directory.iterdir()))
+
+    def test_corruption_is_detected(self):
+        export_model(self.pipeline, self.directory)
+        coef = self.directory / "coef.npy"
+        data = bytearray(coef.read_bytes())
+        data[-1] ^= 1
+        coef.write_bytes(bytes(data))
+        with self.assertRaisesRegex(ArtifactError, "coef.npy"):
+            load_artifact(self.directory)
+
+        export_model(self.pipeline, self.directory)
+        manifest = json.loads((self.directory / "manifest.json").read_text())
+        manifest["classes"].reverse()
+        (self.directory / "manifest.json").write_text(json.dumps(manifest))
+        with self.assertRaisesRegex(ArtifactError, "Manifest checksum"):
+            load_artifact(self.directory)
+
+    def test_bare_classifier_falls_back_to_rules_on_raw_features(self):
+        export_model(self.pipeline.named_steps["classifier"], self.directory)
+        frame, _ = training_frame(5, seed=3)
+        frame["Num_of_Delayed_Payment"] = 0.0
+        scores, source = predict_scores(load_artifact(self.directory), frame)
+        self.assertEqual(source, "rules")
+        self.assertEqual(len(scores), 5)
+
+    def test_loader_reads_artifact_directories(self):
+        manifest = export_model(self.pipeline, self.directory)
+        with open(self.directory / "legacy.sav", "wb") as file:
+            pickle.dump(self.pipeline, file)
+
+        loader.reset()
+        self.addCleanup(loader.reset)
+        with override_settings(CREDIT_MODEL_PATH=str(self.directory)):
+            self.assertEqual(loader.load_model().version, manifest["version"])
+            self.assertEqual(loader.model_version(), manifest["version"])
+        loader.reset()
+        with override_settings(CREDIT_MODEL_PATH=str(self.directory / "legacy.sav")):
+            self.assertIsInstance(loader.load_model(), Pipeline)
@@ -0,0 +1,157 @@
+import os
+import pickle
+import tempfile
+import uuid
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.models import CreditParameters, CreditScoreEvent
+from calculate.scoring import history
+from calculate.scoring.registry import registry
+from calculate.scoring.rules import predict_scores, rule_scores
+from .factories import CreditParametersFactory
+from .test_registry import StaticModel
+
+
+class BulkPartialUpdateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/calculate/credit-parameters/bulk/"
+        self.records = CreditParametersFactory.create_batch(4, credit_score="good")
+
+    def test_applies_changes_per_record(self):
+        first, second, third, untouched = self.records
+        payload = {
+            "updates": [
+                {"id": str(first.id), "changes": {"annual_income": "61000.456", "outstanding_debt": 250}},
+                {"id": str(second.id), "changes": {"outstanding_debt": "99.5", "annual_income": 1}},
+                {"id": str(third.id), "changes": {"occupation": "Teacher"}},
+            ]
+        }
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"updated": 3, "rescored": 0, "score_source": None})
+
+        for record in self.records:
+            record.refresh_from_db()
+        self.assertEqual(first.annual_income, Decimal("61000.46"))
+        self.assertEqual(first.outstanding_debt, Decimal("250.00"))
+        self.assertEqual(second.outstanding_debt, Decimal("99.50"))
+        self.assertEqual(third.occupation, "Teacher")
+        self.assertEqual(third.annual_income, Decimal("50000.00"))
+        self.assertEqual(first.updated_at, third.updated_at)
+        self.assertGreater(first.updated_at, untouched.updated_at)
+        self.assertEqual({r.credit_score for r in self.records}, {"good"})
+
+    def test_invalidates_cached_reads(self):
+        record = self.records[0]
+        self.client.get(f"/calculate/credit-parameters/{record.id}/")
+        self.client.get("/calculate/credit-parameters/")
+
+        self.client.patch(
+            self.url, {"updates": [{"id": str(record.id), "changes": {"name": "Jane Doe"}}]}, format="json"
+        )
+        self.assertEqual(self.client.get(f"/calculate/credit-parameters/{record.id}/").data["name"], "Jane Doe")
+        names = {row["name"] for row in self.client.get("/calculate/credit-parameters/").data}
+        self.assertIn("Jane Doe", names)
+
+    @patch("calculate.scoring.loader.load_model")
+    def test_rescore_falls_back_to_rules(self, mock_load_model):
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = ValueError("X has 21 features, but LinearSVC is expecting 18067")
+        mock_load_model.return_value = mock_model
+        first, second = self.records[:2]
+
+        payload = {
+            "rescore": True,
+            "updates": [
+                {"id": str(first.id), "changes": {"number_of_delayed_payment": 12}},
+                {"id": str(second.id), "changes": {"credit_utilization_ratio": "45.00"}},
+            ],
+        }
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"updated": 2, "rescored": 2, "score_source": "rules"})
+        self.assertEqual(mock_model.predict.call_count, 1)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.credit_score, "poor")
+        self.assertEqual(second.credit_score, "standard")
+
+    def test_rescore_history_names_the_routed_model(self):
+        history.clear()
+        registry.reset()
+        self.addCleanup(history.clear)
+        self.addCleanup(registry.reset)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "eu.sav")
+        with open(path, "wb") as file:
+            pickle.dump(StaticModel("Good"), file)
+
+        record = self.records[0]
+        payload = {"rescore": True, "updates": [{"id": str(record.id), "changes": {"age": 40}}]}
+        with override_settings(CREDIT_MODELS={"eu": path}), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, payload, format="json", HTTP_X_CREDIT_MODEL="eu")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["score_source"], "model")
+
+        history.flush()
+        event = CreditScoreEvent.objects.get()
+        self.assertEqual((event.score, event.model_version), ("good", registry.version("eu")))
+        self.assertTrue(event.model_version)
+
+    def test_missing_record_rejects_whole_request(self):
+        record = self.records[0]
+        payload = {
+            "updates": [
+                {"id": str(record.id), "changes": {"name": "Jane Doe"}},
+                {"id": str(uuid.uuid4()), "changes": {"name": "Nobody"}},
+            ]
+        }
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        record.refresh_from_db()
+        self.assertEqual(record.name, "John Doe")
+
+    def test_rejects_invalid_changes(self):
+        record_id = str(self.records[0].id)
+        for changes in ({"annual_income": "lots"}, {"user_id": 3}, {"payment_behaviour": "LSSV"}, {}):
+            response = self.client.patch(self.url, {"updates": [{"id": record_id, "changes": changes}]}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, changes)
+
+        duplicate = {"id": record_id, "changes": {"name": "Jane Doe"}}
+        response = self.client.patch(self.url, {"updates": [duplicate, duplicate]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CreditParameters.objects.filter(name="Jane Doe").exists())
+
+
+class RuleScoresTest(TestCase):
+    def frame(self):
+        return pd.DataFrame(
+            {
+                "Num_of_Delayed_Payment": [11.0, 0.0, 2.0, 3.0, 0.0, None],
+                "Credit_Utilization_Ratio": [10.0, 81.0, 29.9, 10.0, 10.0, 10.0],
+                "Credit_Mix": ["Good", "Good", "Standard", "Good", "Bad", "Good"],
+            }
+        )
+
+    def test_rule_scores(self):
+        self.assertEqual(
+            list(rule_scores(self.frame())), ["poor", "poor", "good", "standard", "standard", "standard"]
+        )
+
+    def test_predict_scores_lowercases_model_labels(self):
+        model = MagicMock()
+        model.predict.return_value = ["Good", "Poor", "Standard", "Good", "Good", "Poor"]
+        scores, source = predict_scores(model, self.frame())
+        self.assertEqual(source, "model")
+        self.assertEqual(list(scores), ["good", "poor", "standard", "good", "good", "poor"])
@@ -0,0 +1,119 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.api.caching import ResponseCache, credit_parameters_cache
+from calculate.models import CreditLoans
+from .factories import CreditParametersFactory
+
+
+class CreditParametersCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        credit_parameters_cache.metrics.reset()
+        self.client = APIClient()
+        self.base_url = "/calculate/credit-parameters/"
+
+    def test_retrieve_is_served_from_cache(self):
+        obj = CreditParametersFactory(credit_score="good")
+        first = self.client.get(f"{self.base_url}{obj.id}/")
+
+        with self.assertNumQueries(0):
+            second = self.client.get(f"{self.base_url}{obj.id}/")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f"{self.base_url}{obj.id}/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(credit_parameters_cache.stats()["hit_rate"], 2 / 3)
+
+    def test_update_invalidates_record_and_list(self):
+        obj = CreditParametersFactory(credit_score="good")
+        self.client.get(self.base_url)
+        data = self.client.get(f"{self.base_url}{obj.id}/").data
+
+        updated = {key: value for key, value in data.items() if key not in ("id", "user_id", "created_at", "updated_at")}
+        updated.update(user=obj.user.email, name="Jane Doe", payment_behaviour="low_spend_small_value_payments")
+        response = self.client.put(f"{self.base_url}{obj.id}/", updated, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(f"{self.base_url}{obj.id}/").data["name"], "Jane Doe")
+        self.assertEqual(self.client.get(self.base_url).data[0]["name"], "Jane Doe")
+
+    def test_delete_invalidates_list(self):
+        objs = CreditParametersFactory.create_batch(2)
+        self.assertEqual(len(self.client.get(self.base_url).data), 2)
+
+        self.client.delete(f"{self.base_url}{objs[0].id}/")
+        self.assertEqual(len(self.client.get(self.base_url).data), 1)
+        response = self.client.get(f"{self.base_url}{objs[0].id}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_orm_writes_invalidate(self):
+        obj = CreditParametersFactory(name="Before")
+        self.client.get(self.base_url)
+        self.client.get(f"{self.base_url}{obj.id}/")
+
+        # Writes outside the API, e.g. from the shell or a management command
+        obj.name = "After"
+        obj.save()
+        CreditLoans.objects.create(credit_check=obj, loan_type=CreditLoans.LoanTypes.AUTO)
+        self.assertEqual(self.client.get(self.base_url).data[0]["name"], "After")
+        self.assertEqual(self.client.get(f"{self.base_url}{obj.id}/").data["loans"][0]["loan_type"], "auto_loan")
+
+        obj.delete()
+        self.assertEqual(len(self.client.get(self.base_url).data), 0)
+
+    def test_metrics_endpoint_reports_hit_rate(self):
+        obj = CreditParametersFactory()
+        self.client.get(f"{self.base_url}{obj.id}/")
+        self.client.get(f"{self.base_url}{obj.id}/")
+
+        response = self.client.get("/calculate/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["caches"]["credit-parameters"]["hit_rate"], 0.5)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = ResponseCache("test", wait_timeout=0.2, poll_interval=0.01)
+        self.cache.metrics.reset()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"value": 1}
+
+        key = self.cache.key("scope")
+        threads = [threading.Thread(target=self.cache.get_or_set, args=(key, compute)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.stats()["coalesced_hits"], 7)
+
+    def test_waits_for_other_process_then_computes(self):
+        key = self.cache.key("scope")
+        cache.add(f"{key}:lock", 1)
+
+        self.assertEqual(self.cache.get_or_set(key, lambda: {"value": 2}), {"value": 2})
+        self.assertEqual(self.cache.stats()["lock_timeouts"], 1)
+
+    def test_invalidate_changes_keys(self):
+        key = self.cache.key("scope", "page")
+        self.cache.get_or_set(key, lambda: {"value": 1})
+        self.cache.invalidate("scope")
+
+        self.assertNotEqual(self.cache.key("scope", "page"), key)
+        self.assertIsNone(self.cache.get(self.cache.key("scope", "page")))
@@ -0,0 +1,85 @@
+import io
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from calculate.scoring.cleaning import clean_frame, load_training_data
+from calculate.scoring.features import build_frame
+
+CSV = """ID,Name,Age,Occupation,Annual_Income,Monthly_Inhand_Salary,Num_of_Loan,Delay_from_due_date,Num_of_Delayed_Payment,Changed_Credit_Limit,Credit_Mix,Outstanding_Debt,Credit_Utilization_Ratio,Credit_History_Age,Payment_Behaviour,Amount_invested_monthly,Monthly_Balance
+0x1602,Aaron Maashoh,23,Scientist,19114.12,1824.843333,4,3,7,11.27,_,809.98,26.82261962,22 Years and 1 Months,High_spent_Small_value_payments,80.41529543900253,312.49408867943663
+0x1603,Aaron Maashoh,-500,_______,19114.12_,,4_,-1,8_,_,Good,809.98_,31.94496,,!@9#%8,__10000__,__-333333333333333333333333333__
+0x1604,Rick Rothackerj,28_,Teacher,34847.84,3037.986667,1,3,_,6.27,Standard,605.03,22.53459,26 Years and 7 Months,Low_spent_Small_value_payments,,223.45130972736786
+0x1605,"Rick, Rothackerj",7580,Lawyer,34847.84,3037.986667,-100,5,4,-2.01,na,605.03,38.55,26 Years and 8 Months,Low_spent_Large_value_payments,104.29,341.48
+"""
+
+
+def notebook_clean(frame):
+    """The research notebook's original cleaning, kept as the reference implementation"""
+    frame = frame.map(lambda x: x if x is np.nan or not isinstance(x, str) else str(x).strip('_ ,"')).replace(
+        ["", "_", "-", "-333333333333333333333333333", "nan", "__10000__", "!@9#%8", "#F%$D@*&8", "na"], np.nan
+    )
+    frame["Age"] = frame.Age.astype(str).str.replace("-", "").astype(float)
+    frame["Credit_History_Age"] = frame["Credit_History_Age"].str[:2] + "" + frame["Credit_History_Age"].str[13:15]
+    for column in [
+        "Monthly_Balance", "Amount_invested_monthly", "Credit_Utilization_Ratio", "Monthly_Inhand_Salary",
+        "Annual_Income", "Outstanding_Debt", "Num_of_Loan", "Num_of_Delayed_Payment", "Changed_Credit_Limit",
+    ]:
+        frame[column] = frame[column].astype(float)
+    for column in ["Monthly_Inhand_Salary", "Monthly_Balance", "Amount_invested_monthly", "Credit_Utilization_Ratio",
+                   "Annual_Income"]:
+        frame[column] = frame[column].round(2)
+    frame["Age"] = frame.Age.where(frame.Age <= 110)
+    return frame
+
+
+class CleaningTest(SimpleTestCase):
+    def test_chunked_cleaning_matches_notebook(self):
+        expected = notebook_clean(pd.read_csv(io.StringIO(CSV)))
+        for chunksize in (1, 3, 10):
+            cleaned = load_training_data(io.StringIO(CSV), chunksize=chunksize)
+            for column in expected.columns:
+                pd.testing.assert_series_equal(
+                    cleaned[column], expected[column], check_dtype=False, obj=f"{column} with chunksize {chunksize}"
+                )
+
+    def test_drop_incomplete_rows(self):
+        csv = CSV.replace(",_,809.98,", ",Good,809.98,")
+        expected = notebook_clean(pd.read_csv(io.StringIO(csv)))
+        expected = expected[expected.isnull().sum(axis=1) < 1]
+        cleaned = load_training_data(io.StringIO(csv), chunksize=2, drop_incomplete=True)
+        self.assertEqual(list(cleaned["ID"]), list(expected["ID"]))
+        self.assertEqual(list(cleaned["ID"]), ["0x1602"])
+
+    def test_scoring_frame_uses_same_rules(self):
+        frame = clean_frame(build_frame([{
+            "name": "Jane Doe_",
+            "occupation": "_______",
+            "delay_from_due_date": "3",
+            "credit_mix": "Good",
+            "payment_of_minimum_amount": "Yes",
+            "payment_behaviour": "low_spend_small_value_payments",
+            "changed_credit_limit": "11.27",
+            "age": -30,
+            "annual_income": 50000.004,
+            "monthly_in_hand_salary": 4000,
+            "number_of_bank_accounts": 2,
+            "number_of_credit_cards": 1,
+            "interest_rate": 12.5,
+            "number_of_loans": 1,
+            "number_of_delayed_payment": 0,
+            "num_credit_inquiries": 0,
+            "outstanding_debt": 1000,
+            "credit_utilization_ratio": 10.5,
+            "total_emi_per_month": 500,
+            "amount_invested_monthly": 200,
+            "monthly_balance": 3000,
+        }]))
+        row = frame.iloc[0]
+        self.assertEqual(row["Name"], "Jane Doe")
+        self.assertTrue(pd.isna(row["Occupation"]))
+        self.assertEqual(row["Delay_from_due_date"], 3.0)
+        self.assertEqual(row["Changed_Credit_Limit"], 11.27)
+        self.assertEqual(row["Age"], 30.0)
+        self.assertEqual(row["Annual_Income"], 50000.0)
@@ -0,0 +1,177 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import skipIf
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate import columnar
+from calculate.models import CreditParameters, CreditScoreEvent
+from calculate.scoring import history
+from calculate.scoring.loader import WARMUP_RECORD, score_records
+from .factories import CreditParametersFactory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = pq = None
+
+
+def applicants():
+    """Records the rule engine scores poor, good and standard, and one with loans"""
+    return [
+        {**WARMUP_RECORD, "number_of_delayed_payment": 25},
+        {**WARMUP_RECORD, "credit_mix": "Good", "monthly_balance": 2500.5},
+        {**WARMUP_RECORD, "occupation": "Teacher", "credit_utilization_ratio": 55.5},
+        {**WARMUP_RECORD, "loans": ["auto_loan", "auto_loan"]},
+    ]
+
+
+@skipIf(pa is None, "pyarrow is not installed")
+class ColumnarScoringTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        history.clear()
+        self.addCleanup(history.clear)
+        patcher = patch("calculate.scoring.loader.load_model")
+        model = MagicMock()
+        model.predict.side_effect = ValueError("X has 21 features, but LinearSVC is expecting 18067")
+        patcher.start().return_value = model
+        self.addCleanup(patcher.stop)
+        self.model = model
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def table(self, records, **columns):
+        table = pa.Table.from_pylist(
+            [{key: value for key, value in record.items() if key != "loans"} for record in records]
+        )
+        table = table.append_column(
+            "auto_loan", pa.array([record.get("loans", []).count("auto_loan") for record in records])
+        )
+        for name, values in columns.items():
+            table = table.append_column(name, values)
+        return table
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_tables_score_like_records(self):
+        records = applicants()
+        table = self.table(records)
+        # Dictionary-encoded text and text numbers are read like any request
+        table = table.set_column(
+            table.schema.get_field_index("occupation"), "occupation", table["occupation"].dictionary_encode()
+        )
+        table = table.set_column(
+            table.schema.get_field_index("age"), "age", pa.array([str(record["age"]) for record in records])
+        )
+        scores, source = columnar.score_table(self.model, table)
+        expected, expected_source = score_records(self.model, records)
+        self.assertEqual((list(scores), source), (list(expected), expected_source))
+        self.assertEqual(list(scores[:2]), ["poor", "good"])
+        self.assertEqual(columnar.table_frame(table)["Auto_Loan"].tolist(), [0, 0, 0, 2])
+
+        with self.assertRaisesRegex(columnar.ColumnarError, "Missing columns: age"):
+            columnar.score_table(self.model, table.drop_columns(["age"]))
+
+    def test_endpoint_scores_arrow_and_parquet(self):
+        client = APIClient()
+        url = "/calculate/credit-parameters/score/"
+        table = self.table(applicants(), id=pa.array(["a", "b", "c", "d"]))
+        expected, _ = score_records(self.model, applicants())
+
+        for media_type in (columnar.ARROW_STREAM, columnar.ARROW_FILE, columnar.PARQUET):
+            body = columnar.write_table(table, media_type)
+            response = client.post(url, body, content_type=media_type)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, media_type)
+            self.assertEqual(response["Content-Type"], columnar.ARROW_STREAM)
+            scores = columnar.read_table(response.content, columnar.ARROW_STREAM)
+            self.assertEqual(scores.column_names, ["id", "credit_score"])
+            self.assertEqual(scores["id"].to_pylist(), ["a", "b", "c", "d"])
+            self.assertEqual(scores["credit_score"].to_pylist(), list(expected))
+            self.assertEqual(scores.schema.metadata[b"score_source"], b"rules")
+
+        response = client.post(url, b"not arrow", content_type=columnar.ARROW_STREAM)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.post(
+            url, columnar.write_table(table.drop_columns(["age"]), columnar.PARQUET), content_type=columnar.PARQUET
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("age", str(response.data))
+        self.assertFalse(CreditParameters.objects.exists())
+
+    def test_endpoint_scores_json_lists(self):
+        client = APIClient()
+        url = "/calculate/credit-parameters/score/"
+        records = applicants()[:3]
+        response = client.post(url, records, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"scores": ["poor", "good", "standard"], "score_source": "rules"})
+
+        response = client.post(url, [records[0], {**records[1], "age": "old"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data["errors"]), [1])
+
+    def test_offline_file_scoring_does_not_touch_the_database(self):
+        source, target = self.path("input.parquet"), self.path("scores.parquet")
+        table = self.table(applicants() * 3, id=pa.array([str(index) for index in range(12)]))
+        pq.write_table(table, source, row_group_size=5)
+
+        with self.assertNumQueries(0):
+            rows, written = columnar.score_file(self.model, source, target, batch_size=4, offline=True)
+        self.assertEqual((rows, written), (12, 0))
+        scores = pq.read_table(target)
+        self.assertEqual(scores["id"].to_pylist(), [str(index) for index in range(12)])
+        expected, _ = score_records(self.model, applicants() * 3)
+        self.assertEqual(scores["credit_score"].to_pylist(), list(expected))
+
+        # Arrow IPC in and out, from batches longer than the batch size
+        arrow_source, arrow_target = self.path("input.arrow"), self.path("scores.arrow")
+        with pa.OSFile(arrow_source, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=7)
+        self.assertEqual(
+            columnar.score_file(self.model, arrow_source, arrow_target, batch_size=4, offline=True), (12, 0)
+        )
+        self.assertTrue(pa.ipc.open_file(arrow_target).read_all().equals(scores))
+
+    def test_file_scores_are_written_to_the_records(self):
+        records = [CreditParametersFactory(**applicant) for applicant in applicants()[:3]]
+        other = CreditParametersFactory()
+        table = self.table(applicants()[:3], id=pa.array([str(record.pk).upper() for record in records]))
+        table = pa.concat_tables(
+            [table, self.table(applicants()[:2], id=pa.array(["not a record", str(other.pk)]))]
+        )
+        source, target = self.path("input.parquet"), self.path("scores.parquet")
+        pq.write_table(table, source)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rows, written = columnar.score_file(self.model, source, target, batch_size=2)
+        self.assertEqual((rows, written), (5, 3))
+        for record, score in zip(records, ["poor", "good", "standard"]):
+            record.refresh_from_db()
+            self.assertEqual((record.credit_score, record.score_source), (score, "rules"))
+        # The last row's features are not the record's, so the record keeps its score
+        other.refresh_from_db()
+        self.assertIsNone(other.credit_score)
+        history.flush()
+        self.assertEqual(sorted(CreditScoreEvent.objects.values_list("score", flat=True)), ["good", "poor", "standard"])
+
+    def test_command_scores_a_file(self):
+        source, target = self.path("input.parquet"), self.path("scores.parquet")
+        pq.write_table(self.table(applicants()), source)
+        out = StringIO()
+        call_command("score_file", source, target, "--offline", stdout=out)
+        self.assertIn("Scored 4 rows", out.getvalue())
+        self.assertEqual(pq.read_table(target).num_rows, 4)
+
+        with self.assertRaisesRegex(CommandError, "'id' column"):
+            call_command("score_file", source, target, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("score_file", self.path("missing.parquet"), target, "--offline", stdout=StringIO())
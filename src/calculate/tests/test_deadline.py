@@ -0,0 +1,103 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.models import CreditParameters, CreditScoreEvent
+from calculate.scoring import deadline, history
+from calculate.scoring.loader import WARMUP_RECORD
+from .factories import UserFactory
+
+
+@override_settings(CREDIT_SCORING_BUDGET=0.05)
+class ScoringDeadlineTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        history.clear()
+        self.addCleanup(history.clear)
+        self.client = APIClient()
+        self.release = threading.Event()
+        self.model = MagicMock()
+        self.model.predict.side_effect = lambda frame: self.release.wait(5) and ["Poor"]
+        self.data = {
+            "user": UserFactory().email,
+            "name": "John Doe",
+            "occupation": "Engineer",
+            "delay_from_due_date": "0",
+            "credit_mix": "Standard",
+            "payment_of_minimum_amount": "Yes",
+            "payment_behaviour": "low_spend_small_value_payments",
+            "changed_credit_limit": "No",
+            "age": 30,
+            "annual_income": "50000.00",
+            "monthly_in_hand_salary": "4000.00",
+            "number_of_bank_accounts": 2,
+            "number_of_credit_cards": 1,
+            "interest_rate": "12.50",
+            "number_of_loans": 1,
+            "number_of_delayed_payment": 0,
+            "num_credit_inquiries": 0,
+            "outstanding_debt": "1000.00",
+            "credit_utilization_ratio": "10.50",
+            "total_emi_per_month": "500.00",
+            "amount_invested_monthly": "200.00",
+            "monthly_balance": "3000.00",
+        }
+
+    def wait_for_reconciliation(self):
+        deadline_at = time.monotonic() + 5
+        while deadline.pending() and time.monotonic() < deadline_at:
+            time.sleep(0.01)
+        self.assertEqual(deadline.pending(), [])
+
+    def test_slow_model_falls_back_and_reconciles(self):
+        with patch("calculate.scoring.loader.load_model", return_value=self.model):
+            start = time.monotonic()
+            response = self.client.post("/calculate/credit-parameters/", self.data, format="json")
+            self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["credit_score"], response.data["score_source"]), ("good", "deadline"))
+
+        self.release.set()
+        self.wait_for_reconciliation()
+        record = CreditParameters.objects.get(pk=response.data["id"])
+        self.assertEqual((record.credit_score, record.score_source), ("poor", "model"))
+        detail = self.client.get(f"/calculate/credit-parameters/{record.pk}/")
+        self.assertEqual(detail.data["score_source"], "model")
+
+        # Both the deadline score and the late model score are kept in the history
+        history.flush()
+        events = CreditScoreEvent.objects.filter(credit_parameters=record).order_by("id")
+        self.assertEqual([(e.score, e.source) for e in events], [("good", "deadline"), ("poor", "model")])
+        self.assertEqual(events[0].inputs_hash, events[1].inputs_hash)
+
+    @override_settings(CREDIT_SCORING_BUDGET=5)
+    def test_model_within_budget(self):
+        self.release.set()
+        with patch("calculate.scoring.loader.load_model", return_value=self.model):
+            response = self.client.post("/calculate/credit-parameters/", self.data, format="json")
+        self.assertEqual((response.data["credit_score"], response.data["score_source"]), ("poor", "model"))
+        self.assertEqual(deadline.pending(), [])
+
+    @override_settings(CREDIT_SCORING_WORKERS=1, CREDIT_SCORING_BACKLOG=1)
+    def test_full_backlog_skips_the_model(self):
+        with patch.object(deadline, "_executor", None), patch.object(deadline, "_in_flight", None):
+            load = lambda: self.model  # noqa: E731
+            late = [deadline.score_within(load, [WARMUP_RECORD])[2] for _ in range(2)]
+            self.assertTrue(all(future is not None for future in late))
+
+            # One run is stuck on the model and one waits behind it, so the next is not submitted
+            scores, source, future = deadline.score_within(load, [WARMUP_RECORD])
+            self.assertEqual((source, future), ("rules", None))
+            self.assertEqual(len(scores), 1)
+
+            self.release.set()
+            for future in late:
+                future.result(timeout=5)
+            self.assertEqual(deadline.score_within(load, [WARMUP_RECORD])[1], "model")
+            self.assertEqual(self.model.predict.call_count, 3)
+            deadline._executor.shutdown()
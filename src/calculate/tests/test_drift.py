@@ -0,0 +1,110 @@
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+from sklearn.svm import LinearSVC
+
+from calculate.scoring import drift, loader
+from calculate.scoring.artifact import export_model, load_artifact
+from calculate.scoring.features import NUMERICAL_FEATURES
+from calculate.scoring.loader import WARMUP_RECORD, score_records
+from .test_artifact import training_frame
+
+
+class InputDriftTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Rows past the training ones follow the same distribution
+        frame, labels = training_frame(7000, seed=0)
+        frame.loc[frame.index[::20], "Age"] = np.nan
+        cls.frame, cls.unseen, labels = frame.iloc[:4000], frame.iloc[4000:], labels[:4000]
+        # A bare classifier keeps the test fast, drift only looks at the cleaned input frame
+        cls.classifier = LinearSVC().fit(cls.frame[list(NUMERICAL_FEATURES.values())].fillna(0), labels)
+        cls.directory = tempfile.TemporaryDirectory()
+        export_model(cls.classifier, cls.directory.name, training_data=cls.frame)
+        cls.model = load_artifact(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        drift.monitor.reset()
+        self.addCleanup(drift.monitor.reset)
+
+    def test_reference_ships_in_the_artifact(self):
+        reference = self.model.drift_reference
+        self.assertEqual(reference.version, self.model.version)
+        self.assertEqual(reference.counts.sum(), len(reference.columns) * 4000)
+        self.assertNotIn("Name", reference.columns)
+        age = reference.columns.index("Age")
+        start, stop = reference.slices[age]
+        # Deciles give ten buckets of about equal size, and missing values have their own
+        self.assertEqual(stop - start, 11)
+        self.assertEqual(reference.counts[stop - 1], 200)
+        self.assertLessEqual(np.ptp(reference.counts[start : stop - 1]), 1)
+
+    def test_drift_is_measured_against_the_reference(self):
+        drift.monitor.observe(self.model, self.unseen)
+        report = drift.monitor.report()[self.model.version]
+        self.assertEqual(report["rows"], 3000)
+        self.assertEqual(report["alerts"], [])
+        self.assertLess(max(stats["psi"] for stats in report["features"].values()), 0.1)
+        self.assertEqual(report["features"]["Age"]["missing_share"], 0.05)
+
+        shifted = self.unseen.copy()
+        shifted["Age"] += 2 * shifted["Age"].std()
+        shifted["Occupation"] = "unseen"
+        drift.monitor.reset()
+        drift.monitor.observe(self.model, shifted)
+        report = drift.monitor.report()[self.model.version]
+        self.assertEqual(report["alerts"], ["Age", "Occupation"])
+        self.assertGreater(report["features"]["Age"]["ks"], 0.5)
+        self.assertIsNone(report["features"]["Occupation"]["ks"])
+
+    def test_thread_histograms_are_summed_on_read(self):
+        frame = self.unseen.iloc[:1200]
+        parts = np.array_split(np.arange(len(frame)), 6)
+        threads = [
+            threading.Thread(target=drift.monitor.observe, args=(self.model, frame.iloc[part])) for part in parts
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        merged = drift.monitor.report()[self.model.version]
+
+        drift.monitor.reset()
+        drift.monitor.observe(self.model, frame)
+        self.assertEqual(merged, drift.monitor.report()[self.model.version])
+        self.assertEqual(merged["rows"], 1200)
+
+    @override_settings(CREDIT_DRIFT_INTERVAL=0, CREDIT_DRIFT_PSI_ALERT=0.25)
+    def test_scoring_feeds_the_monitor(self):
+        with override_settings(CREDIT_MODEL_PATH=self.directory.name):
+            loader.reset()
+            self.addCleanup(loader.reset)
+            self.assertTrue(loader.warm())
+            self.assertEqual(drift.monitor.report(), {})
+
+            with self.assertLogs("credit_parameters", "WARNING") as logs:
+                score_records(loader.load_model(), [WARMUP_RECORD] * drift.MIN_ROWS)
+            self.assertTrue(any("Input drift on" in line for line in logs.output))
+
+            response = APIClient().get("/calculate/drift/")
+        report = response.data["models"][self.model.version]
+        self.assertEqual(report["rows"], drift.MIN_ROWS)
+        self.assertIn("Occupation", response.data["last_check"]["alerts"][self.model.version])
+
+    def test_models_without_a_reference_are_not_observed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            export_model(self.classifier, directory)
+            model = load_artifact(Path(directory))
+        self.assertIsNone(model.drift_reference)
+        drift.monitor.observe(model, self.frame)
+        self.assertEqual(drift.monitor.report(), {})
@@ -0,0 +1,65 @@
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.scoring import loader
+
+
+class StaticModel:
+    def predict(self, frame):
+        return ["Good"] * len(frame)
+
+
+class ModelLoaderTest(TestCase):
+    def setUp(self):
+        loader.reset()
+        self.addCleanup(loader.reset)
+        self.client = APIClient()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.model_path = os.path.join(directory.name, "model.sav")
+        with open(self.model_path, "wb") as file:
+            pickle.dump(StaticModel(), file)
+
+    def test_model_is_loaded_once(self):
+        with override_settings(CREDIT_MODEL_PATH=self.model_path):
+            model = loader.load_model()
+            self.assertIs(loader.load_model(), model)
+            self.assertEqual(list(loader.score_records(model, [loader.WARMUP_RECORD])[0]), ["good"])
+
+    def test_liveness(self):
+        response = self.client.get("/health/live/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_readiness_warms_model(self):
+        with override_settings(CREDIT_MODEL_PATH=self.model_path):
+            response = self.client.get("/health/ready/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["model"]["warm"])
+        self.assertTrue(response.data["database"])
+
+    def test_readiness_fails_without_model(self):
+        with override_settings(CREDIT_MODEL_PATH=self.model_path + ".missing"):
+            response = self.client.get("/health/ready/")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(response.data["model"]["warm"])
+        self.assertIn("not found", response.data["model"]["error"])
+
+    def test_startup_does_not_import_heavy_modules(self):
+        code = (
+            "import sys, django; django.setup(); import creditAPI.urls; "
+            "print(sorted(m for m in ('numpy', 'pandas', 'sklearn', 'pyarrow') if sys.modules.get(m)))"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "creditAPI.settings")}
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(settings.BASE_DIR), env.get("PYTHONPATH")]))
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=tempfile.gettempdir(), env=env, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip().splitlines()[-1], "[]")
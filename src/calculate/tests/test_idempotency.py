@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.models import CreditParameters, IdempotencyKey
+from .factories import UserFactory
+
+
+@patch("calculate.scoring.loader.load_model")
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.base_url = "/calculate/credit-parameters/"
+        self.model = MagicMock()
+        self.model.predict.return_value = ["Good"]
+        self.data = {
+            "user": UserFactory().email,
+            "name": "John Doe",
+            "occupation": "Engineer",
+            "delay_from_due_date": "0",
+            "credit_mix": "Standard",
+            "payment_of_minimum_amount": "Yes",
+            "payment_behaviour": "low_spend_small_value_payments",
+            "changed_credit_limit": "No",
+            "age": 30,
+            "annual_income": "50000.00",
+            "monthly_in_hand_salary": "4000.00",
+            "number_of_bank_accounts": 2,
+            "number_of_credit_cards": 1,
+            "interest_rate": "12.50",
+            "number_of_loans": 1,
+            "number_of_delayed_payment": 0,
+            "num_credit_inquiries": 0,
+            "outstanding_debt": "1000.00",
+            "credit_utilization_ratio": "10.50",
+            "total_emi_per_month": "500.00",
+            "amount_invested_monthly": "200.00",
+            "monthly_balance": "3000.00",
+        }
+
+    def post(self, key, data=None):
+        return self.client.post(self.base_url, data or self.data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self, mock_load_model):
+        mock_load_model.return_value = self.model
+        first = self.post("retry-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(1):
+            second = self.post("retry-1")
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(self.model.predict.call_count, 1)
+        self.assertEqual(CreditParameters.objects.count(), 1)
+
+    def test_key_reused_with_different_body(self, mock_load_model):
+        mock_load_model.return_value = self.model
+        self.post("reused")
+        response = self.post("reused", {**self.data, "name": "Jane Doe"})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_pending_key_conflicts(self, mock_load_model):
+        mock_load_model.return_value = self.model
+        self.post("pending")
+        IdempotencyKey.objects.filter(key="pending").update(status_code=None, response_body=None)
+        self.assertEqual(self.post("pending").status_code, status.HTTP_409_CONFLICT)
+
+    def test_abandoned_key_is_taken_over_after_its_lease(self, mock_load_model):
+        mock_load_model.return_value = self.model
+        # The worker handling the first request died before storing its response
+        self.post("abandoned")
+        CreditParameters.objects.all().delete()
+        IdempotencyKey.objects.filter(key="abandoned").update(status_code=None, response_body=None)
+        self.assertEqual(self.post("abandoned").status_code, status.HTTP_409_CONFLICT)
+        response = self.post("abandoned", {**self.data, "name": "Jane Doe"})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        IdempotencyKey.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        response = self.post("abandoned")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(self.post("abandoned")["Idempotent-Replayed"], "true")
+        self.assertEqual(self.model.predict.call_count, 2)
+
+    def test_failed_request_releases_key(self, mock_load_model):
+        mock_load_model.return_value = self.model
+        data = {**self.data}
+        data.pop("user")
+        self.assertEqual(self.post("released", data).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.filter(key="released").exists())
+
+    def test_expired_key_is_reclaimed(self, mock_load_model):
+        mock_load_model.return_value = self.model
+        self.post("expired")
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        CreditParameters.objects.all().delete()
+
+        response = self.post("expired")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(self.model.predict.call_count, 2)
+
+    def test_purge_command_deletes_expired_keys(self, mock_load_model):
+        now = timezone.now()
+        for n, expires_at in enumerate([now - timedelta(hours=1), now - timedelta(seconds=1), now + timedelta(hours=1)]):
+            IdempotencyKey.objects.create(key=f"key-{n}", fingerprint="-", expires_at=expires_at)
+
+        out = StringIO()
+        call_command("purge_idempotency_keys", "--batch-size=1", stdout=out)
+        self.assertIn("Deleted 2", out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["key-2"])
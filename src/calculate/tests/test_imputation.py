@@ -0,0 +1,56 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from sklearn.impute import KNNImputer, SimpleImputer
+
+from calculate.scoring.features import CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+from calculate.scoring.imputation import NeighbourImputer, masked_rmse
+from calculate.scoring.preprocessing import build_preprocessor
+
+
+def correlated_matrix(rows, columns=14, seed=1):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(rows, 3))
+    return latent @ rng.normal(size=(3, columns)) + 0.3 * rng.normal(size=(rows, columns))
+
+
+class NeighbourImputerTest(SimpleTestCase):
+    def test_accuracy_close_to_knn_imputer(self):
+        X = correlated_matrix(5000)
+        knn_error = masked_rmse(KNNImputer(n_neighbors=2), X)
+        neighbour_error = masked_rmse(NeighbourImputer(n_neighbors=2), X)
+        mean_error = masked_rmse(SimpleImputer(), X)
+        # About 17% above KNNImputer on these 5000 rows, and 7% on the benchmark's 20000
+        self.assertLess(neighbour_error, knn_error * 1.2)
+        self.assertLess(neighbour_error, mean_error / 2)
+
+    def test_reference_set_is_capped(self):
+        X = correlated_matrix(5000)
+        imputer = NeighbourImputer(max_reference=256).fit(X)
+        self.assertEqual(imputer.reference_.shape, (256, 14))
+        self.assertLess(len(pickle.dumps(imputer)), len(pickle.dumps(KNNImputer().fit(X))) / 5)
+
+    def test_observed_values_are_untouched(self):
+        X = correlated_matrix(500)
+        damaged = X[:10].copy()
+        damaged[::2, 3] = np.nan
+        imputed = NeighbourImputer().fit(X).transform(damaged)
+        self.assertFalse(np.isnan(imputed).any())
+        np.testing.assert_array_equal(imputed[1::2], X[1:10:2])
+        np.testing.assert_array_equal(np.delete(imputed, 3, axis=1), np.delete(X[:10], 3, axis=1))
+
+    def test_falls_back_to_field_means_without_complete_rows(self):
+        X = np.array([[1.0, np.nan], [np.nan, 4.0], [3.0, np.nan]])
+        imputed = NeighbourImputer().fit(X).transform(X)
+        np.testing.assert_array_equal(imputed, [[1.0, 4.0], [2.0, 4.0], [3.0, 4.0]])
+
+    def test_preprocessor_handles_missing_numericals(self):
+        rng = np.random.default_rng(0)
+        frame = pd.DataFrame(correlated_matrix(50), columns=list(NUMERICAL_FEATURES.values()))
+        for column in CATEGORICAL_FEATURES.values():
+            frame[column] = rng.choice(["a", "b"], size=50)
+        frame.loc[::5, "Annual_Income"] = np.nan
+        transformed = build_preprocessor().fit_transform(frame)
+        self.assertFalse(np.isnan(transformed.toarray() if hasattr(transformed, "toarray") else transformed).any())
@@ -0,0 +1,184 @@
+from unittest.mock import patch
+
+import pandas as pd
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from calculate.api import rendering
+from calculate.api.serializers import CreditParametersSerializer
+from calculate.models import CreditLoans, CreditParameters
+from calculate.scoring import history
+from calculate.scoring.cleaning import clean_frame
+from calculate.scoring.features import LOAN_TYPE_FEATURES, build_frame, loan_type_counts
+from .factories import CreditParametersFactory
+
+
+PAYLOAD = {
+    "user": "loans@example.com",
+    "name": "John Doe",
+    "occupation": "Engineer",
+    "delay_from_due_date": "0",
+    "credit_mix": "Standard",
+    "payment_of_minimum_amount": "Yes",
+    "payment_behaviour": "low_spend_small_value_payments",
+    "changed_credit_limit": "No",
+    "age": 30,
+    "annual_income": "50000.00",
+    "monthly_in_hand_salary": "4000.00",
+    "number_of_bank_accounts": 2,
+    "number_of_credit_cards": 1,
+    "interest_rate": "12.50",
+    "number_of_loans": 1,
+    "number_of_delayed_payment": 0,
+    "num_credit_inquiries": 0,
+    "outstanding_debt": "1000.00",
+    "credit_utilization_ratio": "10.50",
+    "total_emi_per_month": "500.00",
+    "amount_invested_monthly": "200.00",
+    "monthly_balance": "3000.00",
+}
+
+
+def add_loans(record, *loan_types):
+    CreditLoans.objects.bulk_create(CreditLoans(credit_check=record, loan_type=loan_type) for loan_type in loan_types)
+
+
+class NestedLoansTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.base_url = "/calculate/credit-parameters/"
+
+    def payload(self, **extra):
+        return {**PAYLOAD, **extra}
+
+    def test_create_writes_the_loans(self):
+        loans = [{"loan_type": "auto_loan"}, {"loan_type": "payday_loan"}, {"loan_type": "auto_loan"}]
+        response = self.client.post(self.base_url, self.payload(loans=loans), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        expected = ["auto_loan", "payday_loan", "auto_loan"]
+        self.assertEqual([loan["loan_type"] for loan in response.data["loans"]], expected)
+
+        record = CreditParameters.objects.get(pk=response.data["id"])
+        self.assertEqual(list(record.loans.values_list("loan_type", flat=True)), expected)
+        retrieved = self.client.get(f"{self.base_url}{record.pk}/").data
+        self.assertEqual(retrieved["loans"], response.data["loans"])
+
+    def test_loans_are_written_with_the_record(self):
+        loans = [{"loan_type": "student_loan"}]
+        with patch.object(CreditLoans.objects, "bulk_create", side_effect=RuntimeError("write failed")):
+            with self.assertRaises(RuntimeError):
+                self.client.post(self.base_url, self.payload(loans=loans), format="json")
+        self.assertFalse(CreditParameters.objects.exists())
+
+    def test_invalid_loans_are_rejected(self):
+        response = self.client.post(self.base_url, self.payload(loans=[{"loan_type": "boat_loan"}]), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("loans", response.data)
+        too_many = [{"loan_type": "auto_loan"}] * 51
+        response = self.client.post(self.base_url, self.payload(loans=too_many), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(CreditParameters.objects.exists())
+
+    def test_update_replaces_the_loans(self):
+        record = CreditParametersFactory()
+        add_loans(record, "auto_loan", "mortgage_loan")
+        url = f"{self.base_url}{record.pk}/"
+
+        response = self.client.put(url, self.payload(user=record.user.email), format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([loan["loan_type"] for loan in response.data["loans"]], ["auto_loan", "mortgage_loan"])
+
+        loans = [{"loan_type": "payday_loan"}]
+        response = self.client.put(url, self.payload(user=record.user.email, loans=loans), format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([loan["loan_type"] for loan in response.data["loans"]], ["payday_loan"])
+        self.assertEqual(list(record.loans.values_list("loan_type", flat=True)), ["payday_loan"])
+
+    def test_bulk_changes_cannot_set_loans(self):
+        record = CreditParametersFactory()
+        payload = {"updates": [{"id": str(record.pk), "changes": {"loans": [{"loan_type": "auto_loan"}]}}]}
+        response = self.client.patch(f"{self.base_url}bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(record.loans.exists())
+
+
+class LoansReadPathTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.base_url = "/calculate/credit-parameters/"
+        add_loans(CreditParametersFactory(), "auto_loan", "student_loan")
+        CreditParametersFactory()
+        add_loans(CreditParametersFactory(), "payday_loan")
+
+    def serializer_bytes(self):
+        queryset = CreditParameters.objects.prefetch_related("loans")
+        return JSONRenderer().render(CreditParametersSerializer(queryset, many=True).data)
+
+    def test_fast_path_matches_the_serializer(self):
+        expected = self.serializer_bytes()
+        queryset = CreditParameters.objects.all()
+        self.assertEqual(rendering.render_rows(queryset, CreditParametersSerializer), expected)
+        for chunk_size in (1, 2, 10):
+            streamed = b"".join(rendering.stream_rows(queryset, CreditParametersSerializer, chunk_size))
+            self.assertEqual(streamed, expected)
+
+    def test_loans_are_read_once_per_chunk(self):
+        response = self.client.get(self.base_url)
+        self.assertEqual(response.content, self.serializer_bytes())
+        self.assertEqual(sorted(len(record["loans"]) for record in response.data), [0, 1, 2])
+
+        for _ in range(5):
+            add_loans(CreditParametersFactory(), "mortgage_loan", "auto_loan")
+        cache.clear()
+        # The count, the records and their loans, however many records there are
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.client.get(self.base_url).data), 8)
+        with self.assertNumQueries(3):
+            export = b"".join(self.client.get(f"{self.base_url}export/").streaming_content)
+        self.assertEqual(export, self.serializer_bytes())
+
+
+class LoanFeaturesTest(SimpleTestCase):
+    def test_counts_per_loan_type(self):
+        records = [
+            {"loans": [{"loan_type": "auto_loan"}, {"loan_type": "auto_loan"}, {"loan_type": "payday_loan"}]},
+            {"loans": ["non_specified_loan"]},
+            {},
+        ]
+        counts = loan_type_counts(records)
+        self.assertEqual(counts.shape, (3, len(LOAN_TYPE_FEATURES)))
+        self.assertEqual(counts.sum(axis=1).tolist(), [3, 1, 0])
+
+        frame = build_frame(records)
+        self.assertEqual(frame["Auto_Loan"].tolist(), [2, 0, 0])
+        self.assertEqual(frame["Payday_Loan"].tolist(), [1, 0, 0])
+        self.assertEqual(frame["Not_Specified_Loan"].tolist(), [0, 1, 0])
+
+    def test_cleaning_counts_the_training_loan_types(self):
+        frame = pd.DataFrame(
+            {
+                "Type_of_Loan": [
+                    "Auto Loan, Credit-Builder Loan, and Auto Loan",
+                    "Not Specified",
+                    None,
+                ]
+            }
+        )
+        cleaned = clean_frame(frame)
+        self.assertEqual(cleaned["Auto_Loan"].tolist(), [2, 0, 0])
+        self.assertEqual(cleaned["Credit_Builder_Loan"].tolist(), [1, 0, 0])
+        self.assertEqual(cleaned["Not_Specified_Loan"].tolist(), [0, 1, 0])
+
+    def test_inputs_hash_covers_loans(self):
+        record = {"name": "John Doe", "age": 30}
+        self.assertEqual(history.inputs_hash(record), history.inputs_hash({**record, "loans": []}))
+        self.assertNotEqual(history.inputs_hash(record), history.inputs_hash({**record, "loans": ["auto_loan"]}))
+        self.assertEqual(
+            history.inputs_hash({**record, "loans": ["auto_loan", "payday_loan"]}),
+            history.inputs_hash({**record, "loans": [{"loan_type": "payday_loan"}, {"loan_type": "auto_loan"}]}),
+        )
@@ -0,0 +1,149 @@
+import os
+import tempfile
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate import outbox
+from calculate.models import CreditParameters, CreditScoreEvent
+from calculate.scoring import history
+from calculate.scoring.loader import WARMUP_RECORD
+from users.models import User
+from .factories import CreditParametersFactory
+
+
+class WriteBehindTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        history.clear()
+        self.addCleanup(history.clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            CREDIT_WRITE_BEHIND=True,
+            CREDIT_OUTBOX_PATH=os.path.join(directory.name, "outbox.sqlite3"),
+            CREDIT_OUTBOX_WORKER=False,
+            CREDIT_OUTBOX_LEASE=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        patcher = patch("calculate.scoring.loader.load_model")
+        model = MagicMock()
+        model.predict.side_effect = ValueError("X has 21 features, but LinearSVC is expecting 18067")
+        patcher.start().return_value = model
+        self.addCleanup(patcher.stop)
+
+    def post(self, email):
+        return self.client.post("/calculate/credit-parameters/", {**WARMUP_RECORD, "user": email}, format="json")
+
+    def test_create_responds_before_the_write(self):
+        response = self.post("new@example.com")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data["score_source"], response.data["status"]), ("rules", "queued"))
+        self.assertFalse(CreditParameters.objects.exists())
+        self.assertEqual(self.client.get(response["Location"]).data["state"], "queued")
+        self.assertEqual(self.client.get("/calculate/outbox/").data["pending"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(outbox.drain(), 1)
+        record = CreditParameters.objects.get(pk=response.data["id"])
+        self.assertEqual(record.credit_score, response.data["credit_score"])
+        self.assertEqual((record.user.email, record.user.first_name), ("new@example.com", "Warm"))
+        self.assertEqual(self.client.get(response["Location"]).data["state"], "written")
+        self.assertEqual(self.client.get("/calculate/outbox/").data["pending"], 0)
+
+        history.flush()
+        self.assertEqual(CreditScoreEvent.objects.get().credit_parameters_id, record.pk)
+
+    def test_loans_are_written_with_their_record(self):
+        loans = [{"loan_type": "auto_loan"}, {"loan_type": "student_loan"}]
+        payload = {**WARMUP_RECORD, "user": "loans@example.com", "loans": loans}
+        response = self.client.post("/calculate/credit-parameters/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(outbox.drain(), 1)
+        record = CreditParameters.objects.get(pk=response.data["id"])
+        self.assertEqual(list(record.loans.values_list("loan_type", flat=True)), ["auto_loan", "student_loan"])
+
+    def test_replayed_create_is_written_once(self):
+        response = self.post("new@example.com")
+        # The batch commits but the process dies before removing it from the journal
+        with patch("calculate.outbox._complete", side_effect=OSError("killed")):
+            outbox.drain_once()
+        self.assertEqual(self.client.get(response["Location"]).data["state"], "queued")
+
+        # Once its retry is due the entry is recognised as written
+        with patch("time.time", return_value=2**40):
+            self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(CreditParameters.objects.count(), 1)
+        self.assertEqual(self.client.get(response["Location"]).data["state"], "written")
+
+    @override_settings(CREDIT_OUTBOX_MAX_ATTEMPTS=1)
+    def test_failing_entry_does_not_block_its_batch(self):
+        first = self.post("first@example.com")
+        taken = self.post("taken@example.com")
+        # A create outside the outbox writes credit parameters for the same user before the entry is drained
+        CreditParametersFactory(user=User.objects.create_user(email="taken@example.com", phone_number="0"))
+
+        outbox.drain()
+        self.assertTrue(CreditParameters.objects.filter(pk=first.data["id"]).exists())
+        entry = self.client.get(taken["Location"]).data
+        self.assertEqual((entry["state"], entry["attempts"]), ("failed", 1))
+        self.assertEqual(self.client.get("/calculate/outbox/").data["failed"], 1)
+
+    @override_settings(CREDIT_OUTBOX_MAX_ATTEMPTS=2, CREDIT_OUTBOX_MAX_BACKOFF=4)
+    def test_database_outage_does_not_park_entries(self):
+        response = self.post("outage@example.com")
+        with patch("calculate.outbox._write", side_effect=OperationalError("server closed the connection")):
+            for clock in range(0, 100, 4):
+                with patch("time.time", return_value=2**40 + clock):
+                    outbox.drain_once()
+        entry = self.client.get(response["Location"]).data
+        self.assertEqual(entry["state"], "queued")
+        self.assertGreater(entry["attempts"], 2)
+        self.assertIn("server closed", entry["error"])
+
+        # Backoff stays capped, so the entry is written soon after the database is back
+        with patch("time.time", return_value=2**40 + clock + 4):
+            self.assertEqual(outbox.drain(), 1)
+        self.assertTrue(CreditParameters.objects.filter(pk=response.data["id"]).exists())
+
+    def test_duplicate_user_is_rejected_up_front(self):
+        CreditParametersFactory(user=User.objects.create_user(email="taken@example.com", phone_number="0"))
+        self.assertEqual(self.post("taken@example.com").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_second_queued_create_for_a_user_is_rejected(self):
+        first = self.post("twice@example.com")
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        second = self.post("twice@Example.com")
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("already queued", str(second.data["user"]))
+        self.assertEqual(self.client.get("/calculate/outbox/").data["pending"], 1)
+
+        # Once written, the record itself is the conflict
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(self.client.get(first["Location"]).data["state"], "written")
+        self.assertEqual(self.post("twice@example.com").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_late_model_score_is_applied_after_the_create(self):
+        late = Future()
+        record_id = "6b0a4d5e-6d8a-4a43-9a58-3d3d1f1c2b7e"
+        fields = {**WARMUP_RECORD, "credit_score": "good", "score_source": "deadline"}
+        outbox.enqueue(record_id, "late@example.com", "Late Score", fields, 0.05, late)
+        late.set_result((["poor"], "model", 2.5))
+
+        create, reconcile = outbox._claim(10, lease=0)
+        with self.assertRaises(outbox.NotWrittenYet):
+            outbox._write([reconcile])
+
+        self.assertEqual(outbox.drain(), 2)
+        record = CreditParameters.objects.get(pk=record_id)
+        self.assertEqual((record.credit_score, record.score_source), ("poor", "model"))
@@ -0,0 +1,112 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from calculate import portfolio
+from calculate.models import CreditParameters
+from .factories import CreditParametersFactory
+
+
+def create_book(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    scores = rng.choice(["poor", "standard", "good", None], size=rows, p=[0.3, 0.4, 0.2, 0.1])
+    debt = rng.lognormal(8, 1, size=rows).round(2)
+    utilization = rng.uniform(0, 100, size=rows).round(2)
+    for score, amount, ratio in zip(scores, debt, utilization):
+        CreditParametersFactory(
+            user__password=None,
+            credit_score=score,
+            outstanding_debt=Decimal(f"{amount:.2f}"),
+            credit_utilization_ratio=Decimal(f"{ratio:.2f}"),
+        )
+    return scores, debt, utilization
+
+
+class QuantileSketchTest(TestCase):
+    def test_quantiles_are_within_the_relative_accuracy(self):
+        rng = np.random.default_rng(1)
+        values = np.concatenate([rng.lognormal(3, 2, 50_000), -rng.lognormal(1, 1, 5_000), np.zeros(1_000)])
+        sketch = portfolio.QuantileSketch(relative_accuracy=0.01)
+        for chunk in np.array_split(rng.permutation(values), 7):
+            sketch.add(chunk)
+        for q in (0.0, 0.01, 0.05, 0.1, 0.5, 0.9, 0.99, 1.0):
+            exact = np.quantile(values, q, method="lower")
+            self.assertLessEqual(abs(sketch.quantile(q) - exact), 0.01 * abs(exact), q)
+        self.assertLess(len(sketch.positive) + len(sketch.negative), 2000)
+
+    def test_merged_sketches_equal_one_sketch(self):
+        values = np.random.default_rng(2).normal(50, 20, 10_000)
+        whole, left, right = portfolio.QuantileSketch(), portfolio.QuantileSketch(), portfolio.QuantileSketch()
+        whole.add(values)
+        left.add(values[:3_000])
+        right.add(values[3_000:])
+        left.merge(right)
+        self.assertEqual((left.positive, left.negative), (whole.positive, whole.negative))
+        self.assertEqual((left.zeros, left.count), (whole.zeros, 10_000))
+        self.assertIsNone(portfolio.QuantileSketch().quantile(0.5))
+
+
+class PortfolioAggregationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.scores, self.debt, self.utilization = create_book(60)
+
+    def assert_matches_book(self, report):
+        self.assertEqual(report["count"], 60)
+        for band in ("poor", "standard", "good", None):
+            selected = self.scores == band
+            result = report["bands"][band or portfolio.UNSCORED]
+            self.assertEqual(result["count"], int(selected.sum()))
+            self.assertAlmostEqual(result["exposure"], round(float(self.debt[selected].sum()), 2), places=2)
+        self.assertAlmostEqual(report["exposure"], float(self.debt.sum()), places=2)
+
+        utilization = report["credit_utilization_ratio"]
+        self.assertEqual((utilization["min"], utilization["max"]), (self.utilization.min(), self.utilization.max()))
+        for q, value in utilization["quantiles"].items():
+            exact = np.quantile(self.utilization, float(q), method="lower")
+            self.assertLessEqual(abs(value - exact), 0.01 * exact + 1e-9, q)
+
+    def test_one_pass_matches_the_book(self):
+        self.assert_matches_book(portfolio.aggregate(chunk_size=7))
+
+    def test_key_ranges_merge_into_the_whole(self):
+        total = portfolio.PortfolioAccumulator(["poor", "standard", "good"])
+        for bounds in portfolio.key_ranges(5):
+            total.merge(portfolio.aggregate_range(bounds, chunk_size=4))
+        self.assertEqual(total.result(), portfolio.aggregate())
+        self.assert_matches_book(total.result())
+
+    def test_endpoint_is_cached_until_the_next_write(self):
+        client = APIClient()
+        self.assert_matches_book(client.get("/calculate/portfolio/").data)
+        with self.assertNumQueries(0):
+            client.get("/calculate/portfolio/")
+
+        response = client.delete(f"/calculate/credit-parameters/{CreditParameters.objects.first().pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(client.get("/calculate/portfolio/").data["count"], 59)
+
+    def test_command_prints_the_report(self):
+        out = StringIO()
+        call_command("portfolio_report", "--chunk-size", "9", stdout=out)
+        report, _, summary = out.getvalue().rpartition("}")
+        self.assert_matches_book(json.loads(report + "}"))
+        self.assertIn("Aggregated 60 credit parameter records", summary)
+
+
+class ParallelPortfolioAggregationTest(TransactionTestCase):
+    def test_worker_pool_matches_one_pass(self):
+        create_book(40, seed=3)
+        # Threads stand in for the process pool, forked workers cannot see an in-memory test database
+        with patch("calculate.portfolio.ProcessPoolExecutor", ThreadPoolExecutor):
+            parallel = portfolio.aggregate(workers=3, chunk_size=5)
+        self.assertEqual(parallel, portfolio.aggregate())
+        self.assertEqual(parallel["count"], 40)
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from calculate.scoring import prediction_cache
+from calculate.scoring.loader import WARMUP_RECORD, score_records
+from calculate.scoring.prediction_cache import PROBE, PredictionCache
+
+
+def keys_for(values):
+    values = np.asarray(values, dtype=np.uint64)
+    return np.stack([values, values * np.uint64(7919) + np.uint64(1)], axis=1)
+
+
+def write_keys(cache, start, count):
+    keys = keys_for(np.arange(start, start + count))
+    cache.put(keys, "v1", keys[:, 0] % 3)
+
+
+def die_holding(lock):
+    lock.acquire()
+    os._exit(0)
+
+
+class CountingModel:
+    version = "counting-v1"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.rows = []
+
+    def predict(self, frame):
+        self.rows.append(len(frame))
+        if self.fail:
+            raise ValueError("X has 21 features, but LinearSVC is expecting 18067")
+        return np.where(frame["Age"].to_numpy() > 40, "Good", "Poor")
+
+
+class PredictionCacheTest(SimpleTestCase):
+    def cache(self, slots):
+        cache = PredictionCache(slots)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_scores_are_kept_per_model_version(self):
+        cache = self.cache(1024)
+        keys = keys_for(range(100))
+        cache.put(keys[:60], "v1", keys[:60, 0] % 3)
+        hits, codes = cache.get(keys, "v1")
+        self.assertEqual(hits.tolist(), [True] * 60 + [False] * 40)
+        self.assertEqual(codes[:60].tolist(), (keys[:60, 0] % 3).tolist())
+        self.assertFalse(cache.get(keys, "v2")[0].any())
+
+        # A key scored by another version takes its slot back
+        cache.put(keys[:1], "v2", [2])
+        self.assertEqual(cache.get(keys[:1], "v2")[1].tolist(), [2])
+        self.assertFalse(cache.get(keys[:1], "v1")[0].any())
+        self.assertEqual(cache.stats()["used"], 60)
+
+    def test_full_windows_evict_clock_style(self):
+        # One window covers the whole table, so every key competes for the same slots
+        cache = self.cache(PROBE)
+        write_keys(cache, 0, PROBE + 1)
+        self.assertEqual(int(cache.get(keys_for(range(PROBE + 1)), "v1")[0].sum()), PROBE)
+
+        # The sweep that took a slot for the last key cleared the other reference bits, so the
+        # keys read since then keep their slots and one of the others makes room
+        survivors = [key for key in range(PROBE + 1) if cache.get(keys_for([key]), "v1")[0][0]]
+        kept, others = survivors[:3], survivors[3:]
+        cache._table["reference"][:] = 0
+        cache.get(keys_for(kept), "v1")
+        write_keys(cache, 100, 1)
+        self.assertTrue(cache.get(keys_for(kept), "v1")[0].all())
+        self.assertTrue(cache.get(keys_for([100]), "v1")[0][0])
+        self.assertEqual(int(cache.get(keys_for(others), "v1")[0].sum()), len(others) - 1)
+
+    def test_forked_workers_share_the_table(self):
+        cache = self.cache(4096)
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=write_keys, args=(cache, start, 500)) for start in range(0, 2000, 500)]
+        stop = threading.Event()
+        torn = []
+
+        def read():
+            keys = keys_for(range(2000))
+            while not stop.is_set():
+                hits, codes = cache.get(keys, "v1")
+                torn.extend(np.flatnonzero(hits & (codes != keys[:, 0] % 3)).tolist())
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        stop.set()
+        reader.join()
+
+        self.assertEqual([worker.exitcode for worker in workers], [0] * 4)
+        self.assertEqual(torn, [])
+        hits, codes = cache.get(keys_for(range(2000)), "v1")
+        # Keys only miss when their window filled up, and every hit holds the score it was given
+        self.assertGreater(hits.mean(), 0.9)
+        self.assertTrue((codes[hits] == np.arange(2000)[hits] % 3).all())
+
+    def test_writers_skip_a_lock_left_by_a_killed_worker(self):
+        cache = self.cache(4096)
+        keys = keys_for(range(200))
+        homes = (keys[:, 0] % np.uint64(cache.slots)).astype(np.intp)
+        blocked = [0 in cache._stripes(home) for home in homes]
+        worker = multiprocessing.get_context("fork").Process(target=die_holding, args=(cache._locks[0],))
+        worker.start()
+        worker.join()
+
+        start = time.perf_counter()
+        cache.put(keys, "v1", keys[:, 0] % 3)
+        cache.put(keys, "v1", keys[:, 0] % 3)
+        # One wait for the stuck lock, then it is only tried
+        self.assertLess(time.perf_counter() - start, 10 * prediction_cache.LOCK_TIMEOUT)
+        hits, _ = cache.get(keys, "v1")
+        self.assertTrue(any(blocked))
+        self.assertEqual(hits.tolist(), [not stuck for stuck in blocked])
+
+    @override_settings(CREDIT_PREDICTION_CACHE_SLOTS=1024)
+    def test_lock_free_reads_need_ordered_stores(self):
+        prediction_cache.ordered_stores.cache_clear()
+        self.addCleanup(prediction_cache.ordered_stores.cache_clear)
+        with patch.object(prediction_cache, "_cache", None), patch("platform.machine", return_value="aarch64"):
+            with self.assertLogs("credit_parameters", "WARNING"):
+                self.assertIsNone(prediction_cache.shared())
+
+    def test_scoring_predicts_only_uncached_records(self):
+        cache = self.cache(1024)
+        records = [{**WARMUP_RECORD, "age": age} for age in (25, 35, 45, 55)]
+        model = CountingModel()
+        with patch.object(prediction_cache, "_cache", cache):
+            scores, source = score_records(model, records[:2])
+            self.assertEqual((scores.tolist(), source), (["poor", "poor"], "model"))
+            scores, source = score_records(model, records)
+            self.assertEqual((scores.tolist(), source), (["poor", "poor", "good", "good"], "model"))
+            self.assertEqual(model.rows, [2, 2])
+            score_records(model, records)
+            self.assertEqual(model.rows, [2, 2])
+
+            # A model that cannot score the misses leaves the whole batch to the rules
+            failing = CountingModel(fail=True)
+            failing.version = "counting-v2"
+            scores, source = score_records(failing, records + [{**WARMUP_RECORD, "age": 65}])
+            self.assertEqual((source, failing.rows), ("rules", [5]))
+            self.assertEqual(score_records(failing, records[:2])[1], "rules")
+        self.assertEqual(cache.stats()["used"], 4)
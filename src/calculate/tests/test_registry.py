@@ -0,0 +1,112 @@
+import os
+import pickle
+import tempfile
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.models import CreditScoreEvent
+from calculate.scoring import history, loader
+from calculate.scoring.loader import WARMUP_RECORD
+from calculate.scoring.registry import UnknownModel, registry
+from .factories import UserFactory
+
+
+class StaticModel:
+    def __init__(self, label, size=0):
+        self.label = label
+        self.padding = bytes(size)
+
+    def predict(self, frame):
+        return [self.label] * len(frame)
+
+
+class ModelRegistryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        history.clear()
+        loader.reset()
+        registry.reset()
+        for reset in (history.clear, loader.reset, registry.reset):
+            self.addCleanup(reset)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.paths = {}
+        for name, label in (("default", "Standard"), ("eu", "Good"), ("us", "Poor"), ("acme", "Good")):
+            self.paths[name] = os.path.join(directory.name, f"{name}.sav")
+            with open(self.paths[name], "wb") as file:
+                pickle.dump(StaticModel(label, size=400_000), file)
+
+        settings = override_settings(
+            CREDIT_MODEL_PATH=self.paths["default"],
+            CREDIT_MODELS={name: path for name, path in self.paths.items() if name != "default"},
+            CREDIT_MODEL_ROUTES={"regions": {"eu-west-2": "eu", "us-east-1": "us"}, "tenants": {"acme": "acme"}},
+            CREDIT_REGION="eu-west-2",
+            CREDIT_MODEL_MEMORY_BUDGET_MB=1,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_routing_precedence(self):
+        self.assertEqual(registry.route({}), "eu")
+        self.assertEqual(registry.route({"X-Region": "us-east-1"}), "us")
+        self.assertEqual(registry.route({"X-Region": "ap-south-1"}), "default")
+        self.assertEqual(registry.route({"X-Tenant": "acme", "X-Region": "us-east-1"}), "acme")
+        self.assertEqual(registry.route({"X-Tenant": "other", "X-Region": "us-east-1"}), "us")
+        self.assertEqual(registry.route({"X-Credit-Model": "default", "X-Tenant": "acme"}), "default")
+        with self.assertRaises(UnknownModel):
+            registry.route({"X-Credit-Model": "missing"})
+        with override_settings(CREDIT_MODEL_ROUTES={"regions": {"eu-west-2": "missing"}}):
+            self.assertEqual(registry.route({}), "default")
+
+    def test_routes_are_checked(self):
+        registry.check_routes()
+        routes = {"regions": {"eu-west-2": "eu"}, "tenants": {"acme": "missing", "other": "gone"}}
+        with override_settings(CREDIT_MODEL_ROUTES=routes):
+            with self.assertRaisesRegex(ImproperlyConfigured, "gone, missing"):
+                registry.check_routes()
+
+    def test_least_recently_used_model_is_evicted(self):
+        eu = registry.get("eu")
+        registry.get("us")
+        self.assertIs(registry.get("eu"), eu)
+        # Two padded models fit the budget, loading a third evicts "us", the least recently used
+        registry.get("acme")
+        registry.get("default")
+
+        stats = registry.stats()
+        self.assertEqual([name for name in stats if stats[name]["loaded"]], ["eu", "acme", "default"])
+        self.assertEqual((stats["eu"]["hits"], stats["eu"]["loads"], stats["eu"]["evictions"]), (2, 1, 0))
+        self.assertEqual((stats["us"]["loads"], stats["us"]["evictions"]), (1, 1))
+        self.assertIsNone(stats["us"]["version"])
+        self.assertGreater(stats["eu"]["size_bytes"], 400_000)
+        self.assertIsNotNone(stats["eu"]["load_seconds"])
+
+        registry.get("us")
+        self.assertEqual(registry.stats()["us"]["loads"], 2)
+        self.assertFalse(registry.stats()["eu"]["loaded"])
+
+    def test_requests_are_scored_by_their_routed_model(self):
+        client = APIClient()
+        data = {**WARMUP_RECORD, "user": UserFactory().email}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post("/calculate/credit-parameters/", data, format="json", HTTP_X_REGION="us-east-1")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data["credit_score"], response.data["score_source"]), ("poor", "model"))
+
+        history.flush()
+        self.assertEqual(CreditScoreEvent.objects.get().model_version, registry.version("us"))
+        self.assertNotEqual(registry.version("us"), loader.model_version())
+
+        data = {**WARMUP_RECORD, "user": UserFactory().email}
+        response = client.post("/calculate/credit-parameters/", data, format="json", HTTP_X_CREDIT_MODEL="missing")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("missing", str(response.data["model"]))
+
+        metrics = client.get("/calculate/metrics/").data["models"]
+        self.assertEqual(metrics["us"]["hits"], 1)
+        self.assertTrue(metrics["us"]["loaded"])
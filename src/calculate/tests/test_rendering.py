@@ -0,0 +1,58 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from calculate.api import rendering
+from calculate.api.serializers import CreditParametersSerializer
+from calculate.models import CreditParameters
+from .factories import CreditParametersFactory
+
+
+class FastReadPathTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.base_url = "/calculate/credit-parameters/"
+        CreditParametersFactory(name="Zoë O'Brien \u2028 \"quoted\"", credit_score=None)
+        CreditParametersFactory(annual_income=Decimal("50000"), interest_rate="7.5", credit_score="good")
+        CreditParametersFactory(payment_behaviour="high_spend_large_value_payments", credit_score="poor")
+
+    def serializer_bytes(self):
+        queryset = CreditParameters.objects.all()
+        return JSONRenderer().render(CreditParametersSerializer(queryset, many=True).data)
+
+    def test_render_rows_is_byte_identical(self):
+        expected = self.serializer_bytes()
+        self.assertEqual(rendering.render_rows(CreditParameters.objects.all(), CreditParametersSerializer), expected)
+        with patch.object(rendering, "orjson", None):
+            self.assertEqual(
+                rendering.render_rows(CreditParameters.objects.all(), CreditParametersSerializer), expected
+            )
+
+    def test_stream_rows_matches_render_rows(self):
+        queryset = CreditParameters.objects.all()
+        expected = rendering.render_rows(queryset, CreditParametersSerializer)
+        for chunk_size in (1, 2, 3, 10):
+            streamed = b"".join(rendering.stream_rows(queryset, CreditParametersSerializer, chunk_size))
+            self.assertEqual(streamed, expected)
+        self.assertEqual(b"".join(rendering.stream_rows(queryset.none(), CreditParametersSerializer)), b"[]")
+
+    def test_list_does_not_load_users(self):
+        # The count, the records and their loans
+        with self.assertNumQueries(3):
+            response = self.client.get(self.base_url)
+        self.assertEqual(response.content, self.serializer_bytes())
+        self.assertEqual(len(response.data), 3)
+
+    def test_export_streams_with_weak_etag(self):
+        response = self.client.get(f"{self.base_url}export/")
+        self.assertEqual(b"".join(response.streaming_content), self.serializer_bytes())
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        self.assertIn("attachment", response["Content-Disposition"])
+
+        response = self.client.get(f"{self.base_url}export/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
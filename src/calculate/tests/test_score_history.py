@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.models import CreditScoreEvent
+from calculate.scoring import history
+from calculate.scoring.loader import WARMUP_RECORD
+from .factories import CreditParametersFactory, UserFactory
+
+
+def event(record, scored_at):
+    return CreditScoreEvent(
+        credit_parameters_id=record.pk,
+        inputs_hash="0" * 64,
+        score="good",
+        source="rules",
+        latency_ms=1.0,
+        scored_at=scored_at,
+    )
+
+
+class ScoreHistoryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        history.clear()
+        self.addCleanup(history.clear)
+
+    @override_settings(CREDIT_SCORE_EVENT_BATCH_SIZE=3, CREDIT_SCORE_EVENT_FLUSH_INTERVAL=60)
+    def test_events_are_written_in_batches(self):
+        records = CreditParametersFactory.create_batch(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            history.record([r.pk for r in records[:2]], [WARMUP_RECORD] * 2, ["good", "poor"], "rules", 0.01)
+        self.assertFalse(CreditScoreEvent.objects.exists())
+
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+            history.record([records[2].pk], [WARMUP_RECORD], ["standard"], "rules", 0.01)
+        events = CreditScoreEvent.objects.order_by("id")
+        self.assertEqual([e.score for e in events], ["good", "poor", "standard"])
+        self.assertEqual(events[0].latency_ms, 5.0)
+        self.assertEqual(events[0].inputs_hash, history.inputs_hash(WARMUP_RECORD))
+        self.assertEqual(history.flush(), 0)
+
+    def test_events_wait_for_commit(self):
+        record = CreditParametersFactory()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            history.record([record.pk], [WARMUP_RECORD], ["good"], "rules", 0.01)
+        self.assertEqual(history.flush(), 0)
+        callbacks[0]()
+        self.assertEqual(history.flush(), 1)
+
+    @patch("calculate.scoring.loader.load_model")
+    def test_create_records_an_event(self, mock_load_model):
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = ValueError("X has 21 features, but LinearSVC is expecting 18067")
+        mock_load_model.return_value = mock_model
+        data = {**WARMUP_RECORD, "user": UserFactory().email}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post("/calculate/credit-parameters/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        history.flush()
+
+        scored = CreditScoreEvent.objects.get(credit_parameters_id=response.data["id"])
+        self.assertEqual((scored.score, scored.source), (response.data["credit_score"], "rules"))
+        self.assertEqual(scored.model_version, "")
+        self.assertGreater(scored.latency_ms, 0)
+        # Inputs hash the same whether they arrive as request data or are read back from the record
+        self.assertEqual(scored.inputs_hash, history.inputs_hash(scored.credit_parameters.__dict__))
+
+    def test_prune_command_removes_old_events(self):
+        record = CreditParametersFactory()
+        now = timezone.now()
+        CreditScoreEvent.objects.bulk_create(
+            [event(record, now - timedelta(days=400)), event(record, now - timedelta(days=10)), event(record, now)]
+        )
+        out = StringIO()
+        call_command("prune_score_history", "--days", "30", stdout=out)
+        self.assertIn("deleted 1 rows", out.getvalue())
+        self.assertEqual(CreditScoreEvent.objects.count(), 2)
+
+    @skipUnless(connection.vendor == "postgresql", "Scoring history is only partitioned on PostgreSQL")
+    def test_prune_drops_whole_partitions(self):
+        record = CreditParametersFactory()
+        old, current = datetime(2020, 1, 15, tzinfo=dt_timezone.utc), timezone.now()
+        history.ensure_partitions(old, months_ahead=0)
+        history.ensure_partitions(current)
+        CreditScoreEvent.objects.bulk_create([event(record, old), event(record, current)])
+
+        dropped, deleted = history.prune(datetime(2020, 2, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual((dropped, deleted), ([history.partition_name(old)], 0))
+        self.assertEqual(CreditScoreEvent.objects.count(), 1)
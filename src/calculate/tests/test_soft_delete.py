@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from calculate.models import CreditLoans, CreditParameters
+from users.deletion import restore_users, soft_delete_users
+from users.models import User
+from .factories import CreditParametersFactory, UserFactory
+
+
+class BulkSoftDeleteTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.records = CreditParametersFactory.create_batch(3)
+        for record in self.records:
+            CreditLoans.objects.create(credit_check=record)
+        self.users = [record.user for record in self.records]
+
+    def test_soft_delete_cascades_in_bulk(self):
+        self.assertEqual(len(self.client.get("/calculate/credit-parameters/").data), 3)
+        doomed = [user.pk for user in self.users[:2]]
+
+        with self.assertNumQueries(8):
+            total, counts = soft_delete_users(doomed)
+        self.assertEqual(counts, {"users.User": 2, "calculate.CreditParameters": 2, "calculate.CreditLoans": 2})
+        self.assertEqual(total, 6)
+
+        live = User.objects.filter(deleted__isnull=True)
+        self.assertEqual(list(live.values_list("pk", flat=True)), [self.users[2].pk])
+        self.assertEqual(CreditParameters.objects.count(), 1)
+        self.assertEqual(CreditLoans.objects.count(), 1)
+        self.assertEqual(CreditParameters.deleted_objects.filter(deleted_by_cascade=True).count(), 2)
+        self.assertEqual(len(self.client.get("/calculate/credit-parameters/").data), 1)
+        self.assertEqual(soft_delete_users(doomed), (0, {}))
+
+    def test_restore_brings_back_cascaded_rows(self):
+        soft_delete_users([self.users[0].pk])
+        total, counts = restore_users([self.users[0].pk])
+        self.assertEqual(counts, {"users.User": 1, "calculate.CreditParameters": 1, "calculate.CreditLoans": 1})
+        self.assertEqual(User.deleted_objects.count(), 0)
+        self.assertEqual(CreditParameters.objects.count(), 3)
+        self.assertFalse(CreditParameters.objects.filter(deleted_by_cascade=True).exists())
+        self.assertEqual(len(self.client.get("/calculate/credit-parameters/").data), 3)
+
+    def test_email_is_unique_among_live_users(self):
+        email = self.users[0].email
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserFactory(email=email)
+
+        soft_delete_users([self.users[0].pk])
+        replacement = UserFactory(email=email)
+        self.assertEqual(User.objects.get_by_natural_key(email), replacement)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            restore_users([self.users[0].pk])
+        self.assertTrue(User.deleted_objects.filter(pk=self.users[0].pk).exists())
+
+    def test_single_user_delete_still_cascades(self):
+        # Set-based like soft_delete_users, and the instance is marked deleted
+        with self.assertNumQueries(9):
+            self.users[0].delete()
+        self.assertIsNotNone(self.users[0].deleted)
+        self.assertFalse(CreditParameters.objects.filter(user=self.users[0]).exists())
+        self.assertTrue(CreditParameters.all_objects.filter(user=self.users[0], deleted_by_cascade=True).exists())
+
+        self.users[0].undelete()
+        self.assertIsNone(self.users[0].deleted)
+        self.assertEqual(CreditParameters.objects.filter(user=self.users[0]).count(), 1)
+
+    def test_admin_deletes_and_restores_in_bulk(self):
+        admin = User.objects.create_superuser(email="admin@example.com", password="secret", phone_number="0")
+        self.client.force_login(admin)
+        url = "/admin/users/user/"
+        selected = [user.pk for user in self.users[:2]]
+
+        response = self.client.post(url, {"action": "delete_selected", "_selected_action": selected, "post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(CreditParameters.objects.count(), 1)
+        self.assertEqual(set(User.deleted_objects.values_list("pk", flat=True)), set(selected))
+
+        self.client.post(url, {"action": "restore_selected", "_selected_action": selected})
+        self.assertFalse(User.deleted_objects.exists())
+        self.assertEqual(CreditParameters.objects.count(), 3)
@@ -0,0 +1,81 @@
+from io import StringIO
+from unittest import skipUnless
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from calculate import synthetic
+from calculate.models import CreditParameters, PaymentBehaviour
+from users.models import User
+
+
+class SyntheticDataTest(SimpleTestCase):
+    def test_batches_are_reproducible(self):
+        first, again = synthetic.generate(200, seed=3, batch=2), synthetic.generate(200, seed=3, batch=2)
+        self.assertEqual(set(first), set(again))
+        for name in first:
+            np.testing.assert_array_equal(first[name], again[name], name)
+        self.assertFalse(np.array_equal(first["age"], synthetic.generate(200, seed=4, batch=2)["age"]))
+
+        batches = list(synthetic.iter_batches(25, batch_size=10, seed=3))
+        self.assertEqual([len(batch["email"]) for batch in batches], [10, 10, 5])
+        emails = np.concatenate([batch["email"] for batch in batches])
+        self.assertEqual(len(set(emails)), 25)
+        self.assertEqual(emails[24], "synthetic.3.24@example.com")
+
+    def test_columns_follow_the_training_marginals(self):
+        columns = synthetic.generate(50_000, seed=1)
+        for field, deciles in synthetic.MARGINALS.items():
+            values = columns[field].astype(np.float64)
+            with self.subTest(field=field):
+                self.assertGreaterEqual(values.min(), deciles[0])
+                self.assertLessEqual(values.max(), deciles[-1])
+                spread = deciles[-1] - deciles[0]
+                median = np.median(values)
+                self.assertLess(abs(median - deciles[5]), 0.02 * spread)
+
+        self.assertLessEqual(set(columns["payment_behaviour"]), set(PaymentBehaviour.values))
+        for field, shares in synthetic.CATEGORIES.items():
+            found, counts = np.unique(columns[field], return_counts=True)
+            for value, count in zip(found, counts):
+                self.assertAlmostEqual(count / 50_000, shares[value], delta=0.01)
+
+        salary_ratio = columns["monthly_in_hand_salary"] * 12 / columns["annual_income"]
+        self.assertTrue(((salary_ratio > 0.79) & (salary_ratio < 1.01)).all())
+
+
+class SyntheticLoadTest(TestCase):
+    def test_bulk_create_inserts_valid_rows(self):
+        self.assertEqual(synthetic.load(30, batch_size=8, seed=5, method="bulk_create"), 30)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(CreditParameters.objects.count(), 30)
+
+        record = CreditParameters.objects.select_related("user").get(user__email="synthetic.5.17@example.com")
+        record.full_clean()
+        self.assertFalse(record.user.has_usable_password())
+        self.assertEqual(record.name, f"{record.user.first_name} {record.user.last_name}")
+        expected = synthetic.generate(8, seed=5, batch=2)
+        self.assertEqual(record.pk, expected["id"][1])
+        self.assertEqual(float(record.annual_income), expected["annual_income"][1])
+
+    @skipUnless(connection.vendor == "postgresql", "COPY needs PostgreSQL")
+    def test_copy_matches_bulk_create(self):
+        synthetic.load(30, batch_size=8, seed=6, method="copy")
+        synthetic.load(30, batch_size=8, seed=7, method="bulk_create")
+        copied = CreditParameters.objects.filter(user__email__startswith="synthetic.6.").order_by("user__email")
+        self.assertEqual(copied.count(), 30)
+        for record in copied[:3]:
+            record.full_clean()
+            self.assertFalse(record.user.has_usable_password())
+
+    def test_command(self):
+        out = StringIO()
+        call_command("seed_credit_data", "12", "--batch-size", "5", "--seed", "9", stdout=out)
+        self.assertIn("Inserted 12 synthetic credit parameters", out.getvalue())
+        with self.assertRaisesRegex(CommandError, "already loaded"):
+            call_command("seed_credit_data", "3", "--seed", "9", stdout=StringIO())
+        if connection.vendor != "postgresql":
+            with self.assertRaisesRegex(CommandError, "PostgreSQL"):
+                call_command("seed_credit_data", "3", "--seed", "10", "--method", "copy", stdout=StringIO())
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.api.serializers import CreditParametersSerializer
+from calculate.api.validation import compile_validator
+from calculate.scoring.loader import WARMUP_RECORD
+
+
+def variant(**changes):
+    row = {**WARMUP_RECORD, **changes}
+    return {name: value for name, value in row.items() if value is not Ellipsis}
+
+
+class BatchValidatorTest(TestCase):
+    def setUp(self):
+        self.validator = compile_validator(CreditParametersSerializer)
+
+    def test_matches_serializer_per_record(self):
+        rows = [
+            variant(),
+            variant(age="31", annual_income="61000.456", interest_rate=12.345, credit_score="good"),
+            variant(age=30.4),
+            variant(age=29.999),
+            variant(age="thirty"),
+            variant(age=None),
+            variant(age=True),
+            variant(age=1e16),
+            variant(age=2**40),
+            variant(annual_income="1e400"),
+            variant(annual_income="nan"),
+            variant(annual_income=123456789),
+            variant(interest_rate=1000),
+            variant(monthly_balance=-5),
+            variant(payment_behaviour="LSSV"),
+            variant(credit_score="excellent"),
+            variant(credit_score=None),
+            variant(name=""),
+            variant(name="  Jane Doe  "),
+            variant(name=None),
+            variant(name=["Jane"]),
+            variant(occupation=...),
+            variant(number_of_loans=...),
+        ]
+        validated, errors = self.validator.validate(rows)
+        for index, row in enumerate(rows):
+            serializer = CreditParametersSerializer(data=row)
+            if serializer.is_valid():
+                self.assertNotIn(index, errors, row)
+                self.assertEqual(validated[index], dict(serializer.validated_data), row)
+            else:
+                self.assertIsNone(validated[index], row)
+                for name, messages in serializer.errors.items():
+                    # to_internal_value raises its "Must be a number." error without the list
+                    messages = [messages] if isinstance(messages, str) else messages
+                    self.assertEqual(errors[index][name], messages, row)
+
+    def test_reports_every_error_of_every_row(self):
+        rows = [
+            variant(age="thirty", annual_income="lots", payment_behaviour="LSSV", occupation=...),
+            variant(),
+            "not a record",
+        ]
+        validated, errors = self.validator.validate(rows)
+        self.assertEqual(set(errors), {0, 2})
+        self.assertEqual(set(errors[0]), {"age", "annual_income", "payment_behaviour", "occupation"})
+        self.assertEqual(errors[0]["age"], ["Must be a number."])
+        self.assertEqual(errors[0]["occupation"], ["This field is required."])
+        self.assertEqual(errors[2], {"non_field_errors": ["Invalid data. Expected a dictionary, but got str."]})
+        self.assertEqual(validated[1]["annual_income"], Decimal("50000.00"))
+
+    def test_partial_skips_missing_fields(self):
+        validated, errors = self.validator.validate([{"age": "41"}, {"age": 41.5}], partial=True)
+        self.assertEqual(validated[0], {"age": 41})
+        self.assertEqual(list(errors), [1])
+
+
+class ValidateEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = "/calculate/credit-parameters/validate/"
+
+    def test_reports_errors_by_position(self):
+        rows = [variant(), variant(age="thirty", payment_behaviour="LSSV"), variant()]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["valid"], 2)
+        self.assertEqual(response.json()["invalid"], 1)
+        self.assertEqual(set(response.json()["errors"]["1"]), {"age", "payment_behaviour"})
+
+    def test_rejects_non_list_body(self):
+        response = self.client.post(self.url, variant(), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
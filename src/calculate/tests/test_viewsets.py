@@ -1,4 +1,5 @@
 from unittest.mock import patch, MagicMock
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -10,6 +11,7 @@ from .factories import UserFactory, CreditParametersFactory
 
 class CreditParametersViewSetTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.base_url = "/calculate/credit-parameters/"
         self.user = UserFactory()
@@ -41,13 +43,12 @@ class CreditParametersViewSetTest(TestCase):
         }
 
 
-    @patch("calculate.api.viewsets.open", create=True)
-    @patch("calculate.api.viewsets.pickle.load", create=True)
-    def test_create_credit_parameters_with_existing_user(self, mock_pickle_load, mock_open):
+    @patch("calculate.scoring.loader.load_model")
+    def test_create_credit_parameters_with_existing_user(self, mock_load_model):
         """Test creating credit parameters with an existing user email"""
         mock_model = MagicMock()
         mock_model.predict.return_value = "good"
-        mock_pickle_load.return_value = mock_model
+        mock_load_model.return_value = mock_model
 
         initial_user_count = User.objects.count()
 
@@ -63,13 +64,12 @@ class CreditParametersViewSetTest(TestCase):
         self.assertEqual(obj.user.email, self.user.email)
         self.assertEqual(obj.name, "John Doe")
 
-    @patch("calculate.api.viewsets.open", create=True)
-    @patch("calculate.api.viewsets.pickle.load", create=True)
-    def test_create_credit_parameters_creates_new_user(self, mock_pickle_load, mock_open):
+    @patch("calculate.scoring.loader.load_model")
+    def test_create_credit_parameters_creates_new_user(self, mock_load_model):
         """Test creating credit parameters with a new user email auto-creates the user"""
         mock_model = MagicMock()
         mock_model.predict.return_value = "standard"
-        mock_pickle_load.return_value = mock_model
+        mock_load_model.return_value = mock_model
 
         initial_user_count = User.objects.count()
         new_email = "newuser@example.com"
@@ -96,13 +96,12 @@ class CreditParametersViewSetTest(TestCase):
         self.assertEqual(obj.user.email, new_email)
         self.assertEqual(obj.name, "Jane Smith")
 
-    @patch("calculate.api.viewsets.open", create=True)
-    @patch("calculate.api.viewsets.pickle.load", create=True)
-    def test_create_credit_parameters_single_name(self, mock_pickle_load, mock_open):
+    @patch("calculate.scoring.loader.load_model")
+    def test_create_credit_parameters_single_name(self, mock_load_model):
         """Test creating credit parameters with single name creates user correctly"""
         mock_model = MagicMock()
         mock_model.predict.return_value = "poor"
-        mock_pickle_load.return_value = mock_model
+        mock_load_model.return_value = mock_model
 
         new_email = "singlename@example.com"
         new_user_data = self.valid_data.copy()
@@ -117,13 +116,12 @@ class CreditParametersViewSetTest(TestCase):
         self.assertEqual(new_user.first_name, "Madonna")
         self.assertEqual(new_user.last_name, "")
 
-    @patch("calculate.api.viewsets.open", create=True)
-    @patch("calculate.api.viewsets.pickle.load", create=True)
-    def test_create_duplicate_user_uses_existing(self, mock_pickle_load, mock_open):
+    @patch("calculate.scoring.loader.load_model")
+    def test_create_duplicate_user_uses_existing(self, mock_load_model):
         """Test that creating parameters with existing email fails due to OneToOne constraint"""
         mock_model = MagicMock()
         mock_model.predict.return_value = "good"
-        mock_pickle_load.return_value = mock_model
+        mock_load_model.return_value = mock_model
 
         # Create first credit parameters which creates a user
         email = "duplicate@example.com"
@@ -185,13 +183,12 @@ class CreditParametersViewSetTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 3)
 
-    @patch("calculate.api.viewsets.open", create=True)
-    @patch("calculate.api.viewsets.pickle.load", create=True)
-    def test_create_without_user_email_fails(self, mock_pickle_load, mock_open):
+    @patch("calculate.scoring.loader.load_model")
+    def test_create_without_user_email_fails(self, mock_load_model):
         """Test that creating without user email fails"""
         mock_model = MagicMock()
         mock_model.predict.return_value = "good"
-        mock_pickle_load.return_value = mock_model
+        mock_load_model.return_value = mock_model
 
         invalid_data = self.valid_data.copy()
         invalid_data.pop("user")
@@ -199,3 +196,43 @@ class CreditParametersViewSetTest(TestCase):
         response = self.client.post(self.base_url, invalid_data, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+    def test_retrieve_returns_not_modified_for_matching_etag(self):
+        """Test conditional retrieve answers 304 without serializing"""
+        obj = CreditParametersFactory(credit_score="good")
+        response = self.client.get(f"{self.base_url}{obj.id}/")
+        self.assertIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        with patch("calculate.api.viewsets.CreditParametersSerializer.to_representation") as mock_serialize:
+            response = self.client.get(f"{self.base_url}{obj.id}/", HTTP_IF_NONE_MATCH=etag)
+            mock_serialize.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_retrieve_etag_changes_after_update(self):
+        """Test a stale ETag gets the full representation"""
+        obj = CreditParametersFactory(credit_score="good")
+        etag = self.client.get(f"{self.base_url}{obj.id}/")["ETag"]
+
+        obj.credit_score = "poor"
+        obj.save()
+
+        response = self.client.get(f"{self.base_url}{obj.id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["credit_score"], "poor")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_uses_weak_etag(self):
+        """Test the list is revalidated with a weak ETag that changes on delete"""
+        objs = CreditParametersFactory.create_batch(2)
+        etag = self.client.get(self.base_url)["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        response = self.client.get(self.base_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        objs[0].delete()
+        response = self.client.get(self.base_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from calculate.api.serializers import WHAT_IF_MAX_POINTS
+from calculate.models import CreditParameters
+from calculate.scoring.loader import WARMUP_RECORD, score_records
+
+
+class WhatIfTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = "/calculate/credit-parameters/what-if/"
+        patcher = patch("calculate.scoring.loader.load_model")
+        self.model = MagicMock()
+        self.model.predict.side_effect = ValueError("X has 21 features, but LinearSVC is expecting 18067")
+        patcher.start().return_value = self.model
+        self.addCleanup(patcher.stop)
+
+    def post(self, grid):
+        return self.client.post(self.url, {"applicant": WARMUP_RECORD, "grid": grid}, format="json")
+
+    def test_grid_matches_scoring_each_scenario(self):
+        grid = {
+            "credit_utilization_ratio": [10, 50.005, 90],
+            "number_of_delayed_payment": {"start": 0, "stop": 12, "num": 4},
+        }
+        with self.assertNumQueries(0):
+            response = self.post(grid)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["score_source"], "rules")
+        self.assertEqual(response.data["points"], 12)
+        self.assertEqual(
+            response.data["axes"],
+            [
+                {"field": "credit_utilization_ratio", "values": [10.0, 50.0, 90.0]},
+                {"field": "number_of_delayed_payment", "values": [0.0, 4.0, 8.0, 12.0]},
+            ],
+        )
+
+        labels = response.data["labels"]
+        for i, utilization in enumerate([10, 50.005, 90]):
+            for j, delayed in enumerate([0, 4, 8, 12]):
+                changes = {"credit_utilization_ratio": utilization, "number_of_delayed_payment": delayed}
+                expected, _ = score_records(self.model, [{**WARMUP_RECORD, **changes}])
+                self.assertEqual(labels[response.data["scores"][i][j]], expected[0], (utilization, delayed))
+        self.assertFalse(CreditParameters.objects.exists())
+
+    def test_grid_is_scored_in_one_predict_call(self):
+        model = MagicMock()
+        model.predict.side_effect = lambda frame: np.where(frame["Outstanding_Debt"] > 2500, "Poor", "Good")
+        with patch("calculate.scoring.loader.load_model", return_value=model):
+            response = self.post(
+                {"outstanding_debt": {"start": 0, "stop": 5000, "num": 101}, "age": list(range(20, 70))}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(model.predict.call_count, 1)
+        self.assertEqual(len(model.predict.call_args.args[0]), 101 * 50)
+        self.assertEqual(response.data["score_source"], "model")
+        scores = np.array(response.data["scores"])
+        self.assertEqual(scores.shape, (101, 50))
+        labels = response.data["labels"]
+        self.assertEqual({labels[code] for code in scores[:50].ravel()}, {"good"})
+        self.assertEqual({labels[code] for code in scores[51:].ravel()}, {"poor"})
+
+    def test_invalid_requests_are_rejected(self):
+        too_many = int(WHAT_IF_MAX_POINTS**0.5) + 1
+        oversized = {"age": {"start": 0, "stop": 1, "num": too_many}, "interest_rate": list(range(too_many))}
+        for body, field in (
+            ({"grid": {"occupation": ["Lawyer"]}}, "grid"),
+            ({"grid": {"age": []}}, "grid"),
+            ({"grid": {"age": ["old"]}}, "grid"),
+            ({"grid": {"age": ["1e400"]}}, "grid"),
+            ({"grid": {"age": {"start": 20}}}, "grid"),
+            ({"grid": oversized}, "grid"),
+            ({"grid": {"age": [30]}, "applicant": {**WARMUP_RECORD, "age": "thirty"}}, "applicant"),
+        ):
+            with self.subTest(body=body):
+                response = self.client.post(self.url, {"applicant": WARMUP_RECORD, **body}, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(field, response.data)
+
+    @override_settings(CREDIT_MODELS={}, CREDIT_MODEL_ROUTES={})
+    def test_unknown_model_is_rejected(self):
+        response = self.client.post(
+            self.url, {"applicant": WARMUP_RECORD, "grid": {"age": [30]}}, format="json", HTTP_X_CREDIT_MODEL="eu"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("model", response.data)
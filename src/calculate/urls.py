@@ -1,11 +1,17 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from calculate.api.views import DriftView, MetricsView, OutboxEntryView, OutboxView, PortfolioView
 from calculate.api.viewsets import CreditParametersViewSet
 
 router = DefaultRouter()
 router.register(r"credit-parameters", CreditParametersViewSet)
 
 urlpatterns = [
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("drift/", DriftView.as_view(), name="drift"),
+    path("portfolio/", PortfolioView.as_view(), name="portfolio"),
+    path("outbox/", OutboxView.as_view(), name="outbox"),
+    path("outbox/<uuid:pk>/", OutboxEntryView.as_view(), name="outbox-entry"),
     path("", include(router.urls)),
 ]
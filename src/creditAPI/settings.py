@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -97,6 +98,10 @@ ALLOWED_HOSTS = ["*"]
 
 AUTH_USER_MODEL = "users.User"
 
+# User.email is unique among live users through a partial unique constraint rather than unique=True,
+# so a soft-deleted user's address can be registered again
+SILENCED_SYSTEM_CHECKS = ["auth.E003"]
+
 INSTALLED_APPS = [
     "users",
     "django.contrib.admin",
@@ -154,6 +159,90 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "credit-risk"),
+    }
+}
+
+CREDIT_PARAMETERS_CACHE_ALIAS = "default"
+CREDIT_PARAMETERS_CACHE_TIMEOUT = int(os.environ.get("CREDIT_PARAMETERS_CACHE_TIMEOUT", 300))
+
+# Credit model
+# The model is loaded on first use unless CREDIT_MODEL_PRELOAD is set, in which case it is loaded
+# and warmed when the app registry is ready (gunicorn.conf.py sets it together with preload_app).
+# CREDIT_MODEL_PATH may be a model artifact directory written by export_model_artifact, or a pickle
+
+CREDIT_MODEL_PATH = os.environ.get("CREDIT_MODEL_PATH", str(BASE_DIR / "credit_model.sav"))
+CREDIT_MODEL_PRELOAD = os.environ.get("CREDIT_MODEL_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+# Further named models, as a JSON object of name to path, routed per request by CREDIT_MODEL_ROUTES:
+# {"regions": {"eu-west-2": "eu"}, "tenants": {"acme": "acme"}}. CREDIT_REGION is this deployment's
+# region. Models other than the default are loaded on first use and the least recently used are
+# evicted once they take more than CREDIT_MODEL_MEMORY_BUDGET_MB
+
+CREDIT_MODELS = json.loads(os.environ.get("CREDIT_MODELS", "{}"))
+CREDIT_MODEL_ROUTES = json.loads(os.environ.get("CREDIT_MODEL_ROUTES", "{}"))
+CREDIT_REGION = os.environ.get("CREDIT_REGION", os.environ.get("AWS_REGION", ""))
+CREDIT_MODEL_MEMORY_BUDGET_MB = int(os.environ.get("CREDIT_MODEL_MEMORY_BUDGET_MB", 512))
+
+# Scored inputs are compared with the training data of models exported with --training-data. Every
+# CREDIT_DRIFT_INTERVAL seconds the scoring path logs the features whose PSI exceeds CREDIT_DRIFT_PSI_ALERT
+CREDIT_DRIFT_INTERVAL = float(os.environ.get("CREDIT_DRIFT_INTERVAL", 300))
+CREDIT_DRIFT_PSI_ALERT = float(os.environ.get("CREDIT_DRIFT_PSI_ALERT", 0.25))
+
+# Model scores are cached in a table of CREDIT_PREDICTION_CACHE_SLOTS 32-byte slots in shared memory,
+# shared by every gunicorn worker forked from a preloading master; 0 disables the cache
+CREDIT_PREDICTION_CACHE_SLOTS = int(os.environ.get("CREDIT_PREDICTION_CACHE_SLOTS", 2**16))
+
+# Admission control for scoring requests, per worker process. Requests beyond the concurrency limit
+# wait in a bounded queue; a full queue or a wait past the timeout is answered with 503 Retry-After
+
+CREDIT_SCORING_MAX_CONCURRENCY = int(os.environ.get("CREDIT_SCORING_MAX_CONCURRENCY", 4))
+CREDIT_SCORING_MAX_QUEUE = int(os.environ.get("CREDIT_SCORING_MAX_QUEUE", 16))
+CREDIT_SCORING_QUEUE_TIMEOUT = float(os.environ.get("CREDIT_SCORING_QUEUE_TIMEOUT", 2.0))
+CREDIT_SCORING_RETRY_AFTER = int(os.environ.get("CREDIT_SCORING_RETRY_AFTER", 1))
+
+# Latency budget for model scoring in seconds. Slower scores fall back to the rule engine and the
+# model result is written back when it arrives; CREDIT_SCORING_WORKERS threads run the model, and
+# once CREDIT_SCORING_BACKLOG more runs wait behind them requests go to the rule engine directly
+
+CREDIT_SCORING_BUDGET = float(os.environ.get("CREDIT_SCORING_BUDGET", 1.0))
+CREDIT_SCORING_WORKERS = int(os.environ.get("CREDIT_SCORING_WORKERS", 4))
+CREDIT_SCORING_BACKLOG = int(os.environ.get("CREDIT_SCORING_BACKLOG", 4))
+
+# Scoring history events are written in batches of CREDIT_SCORE_EVENT_BATCH_SIZE, or once the oldest
+# has waited CREDIT_SCORE_EVENT_FLUSH_INTERVAL seconds; prune_score_history keeps the retention period
+
+CREDIT_SCORE_EVENT_BATCH_SIZE = int(os.environ.get("CREDIT_SCORE_EVENT_BATCH_SIZE", 100))
+CREDIT_SCORE_EVENT_FLUSH_INTERVAL = float(os.environ.get("CREDIT_SCORE_EVENT_FLUSH_INTERVAL", 5.0))
+CREDIT_SCORE_EVENT_RETENTION_DAYS = int(os.environ.get("CREDIT_SCORE_EVENT_RETENTION_DAYS", 365))
+
+# Write-behind creates respond once the record is scored and queue it in a SQLite outbox at
+# CREDIT_OUTBOX_PATH, which a thread in each worker drains in batches of CREDIT_OUTBOX_BATCH_SIZE.
+# Claimed entries are retried after CREDIT_OUTBOX_LEASE seconds, and parked after CREDIT_OUTBOX_MAX_ATTEMPTS
+# failures other than the database being unreachable, which is retried with backoff of at most
+# CREDIT_OUTBOX_MAX_BACKOFF seconds for as long as it lasts
+
+CREDIT_WRITE_BEHIND = os.environ.get("CREDIT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+CREDIT_OUTBOX_PATH = os.environ.get("CREDIT_OUTBOX_PATH", str(BASE_DIR / "outbox.sqlite3"))
+CREDIT_OUTBOX_WORKER = os.environ.get("CREDIT_OUTBOX_WORKER", "true").lower() in ("1", "true", "yes")
+CREDIT_OUTBOX_BATCH_SIZE = int(os.environ.get("CREDIT_OUTBOX_BATCH_SIZE", 200))
+CREDIT_OUTBOX_POLL_INTERVAL = float(os.environ.get("CREDIT_OUTBOX_POLL_INTERVAL", 1.0))
+CREDIT_OUTBOX_LEASE = int(os.environ.get("CREDIT_OUTBOX_LEASE", 30))
+CREDIT_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("CREDIT_OUTBOX_MAX_ATTEMPTS", 5))
+CREDIT_OUTBOX_MAX_BACKOFF = int(os.environ.get("CREDIT_OUTBOX_MAX_BACKOFF", 60))
+
+# Responses stored for Idempotency-Key replays are kept this many seconds. A request that has not
+# finished IDEMPOTENCY_KEY_LEASE seconds after it claimed its key is taken to have died with its
+# worker, and a retry runs it again; keep it above the gunicorn timeout
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+IDEMPOTENCY_KEY_LEASE = int(os.environ.get("IDEMPOTENCY_KEY_LEASE", 120))
+
 # REST Framework
 
 REST_FRAMEWORK = {
@@ -196,7 +285,7 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Documentation
-with open("README.md") as file:
+with open(BASE_DIR / "README.md") as file:
     description = file.read()
 
 SPECTACULAR_SETTINGS = {
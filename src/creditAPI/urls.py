@@ -2,8 +2,12 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularSwaggerView
 
+from calculate.api.views import LivenessView, ReadinessView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("calculate/", include("calculate.urls")),
+    path("health/live/", LivenessView.as_view(), name="health-live"),
+    path("health/ready/", ReadinessView.as_view(), name="health-ready"),
     path("", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger"),
 ]
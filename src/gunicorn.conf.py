@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for the credit risk API.
+
+The application, and with it the warmed credit model, is loaded once in the master process before
+workers are forked, so every worker starts ready and shares the model's memory pages.
+
+    gunicorn -c gunicorn.conf.py creditAPI.wsgi
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault("CREDIT_MODEL_PRELOAD", "true")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# Threaded workers, so the scoring admission limit applies to concurrent requests within a worker
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading must not be shared between processes
+    from django.conf import settings
+    from django.db import connections
+
+    connections.close_all()
+    # Each worker drains the shared write-behind outbox, picking up entries left by earlier runs
+    if settings.CREDIT_WRITE_BEHIND and settings.CREDIT_OUTBOX_WORKER:
+        from calculate import outbox
+
+        outbox.start_worker()
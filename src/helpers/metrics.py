@@ -0,0 +1,42 @@
+import threading
+from collections import Counter
+
+
+class Counters:
+    """
+    Thread-safe named counters kept in process memory.
+
+    Each gunicorn worker keeps its own set, values are per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def counters(namespace):
+    """Return the Counters for ``namespace``, creating them on first use"""
+    with _registry_lock:
+        return _registry.setdefault(namespace, Counters())
+
+
+def snapshot():
+    with _registry_lock:
+        namespaces = dict(_registry)
+    return {namespace: values.snapshot() for namespace, values in namespaces.items()}
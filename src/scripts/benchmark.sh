@@ -0,0 +1,5 @@
+python -m benchmarks.imputation
+python -m benchmarks.serialization
+python -m benchmarks.startup
+python -m benchmarks.validation
+python -m benchmarks.what_if
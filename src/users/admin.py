@@ -1,2 +1,23 @@
+from django.contrib import admin
 
-# Register your models here.
+from users.deletion import restore_users, soft_delete_users
+from users.models import User
+
+
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    """Users, soft-deleted ones included; deletes and restores are set-based, see users.deletion"""
+
+    list_display = ("email", "first_name", "last_name", "is_active", "deleted")
+    list_filter = ("is_active", "is_staff")
+    search_fields = ("email", "first_name", "last_name")
+    fields = ("email", "title", "first_name", "middle_name", "last_name", "phone_number", "is_active", "is_staff")
+    actions = ["restore_selected"]
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_users(queryset.values_list("pk", flat=True))
+
+    @admin.action(description="Restore selected users")
+    def restore_selected(self, request, queryset):
+        total, counts = restore_users(queryset.values_list("pk", flat=True))
+        self.message_user(request, f"Restored {counts.get(User._meta.label, 0)} users and {total} rows in all.")
@@ -0,0 +1,90 @@
+"""
+Set-based soft delete and restore of users and the rows that cascade from them.
+
+safedelete soft-deletes through its collector, one query per related object. These functions
+do the same work with one UPDATE per model: every safedelete model reachable from User through
+CASCADE relations is updated by a join on the user ids. ``User.delete()`` and ``undelete()`` and
+the user admin go through them.
+"""
+from django.db import models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from safedelete.config import DELETED_VISIBLE
+from safedelete.models import is_safedelete_cls
+
+from users.models import User
+
+# Sent once per cascaded model with the primary keys that were soft-deleted or restored
+bulk_soft_deleted = Signal()
+bulk_restored = Signal()
+
+
+def _cascade_paths(model, prefix="", seen=None):
+    """Yield ``(related_model, lookup_prefix)`` for safedelete models that cascade from ``model``"""
+    seen = seen or {model}
+    for relation in model._meta.related_objects:
+        related = relation.related_model
+        if relation.on_delete is not models.CASCADE or not is_safedelete_cls(related) or related in seen:
+            continue
+        path = f"{relation.field.name}__{prefix}"
+        yield related, path
+        yield from _cascade_paths(related, path, seen | {related})
+
+
+def _mark(model, pks, values, now):
+    if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+        values = {**values, "updated_at": now}
+    if pks:
+        # Bulk updates are limited to live rows unless soft-deleted rows are made visible explicitly
+        model.all_objects.all(force_visibility=DELETED_VISIBLE).filter(pk__in=pks).update(**values)
+
+
+def soft_delete_users(user_ids):
+    """
+    Soft-delete the live users in ``user_ids`` and everything that cascades from them.
+
+    Returns ``(total, {model label: count})`` like ``Model.delete()``.
+    """
+    now = timezone.now()
+    counts = {}
+    with transaction.atomic():
+        pks = list(User.objects.filter(pk__in=list(user_ids), deleted__isnull=True).values_list("pk", flat=True))
+        if not pks:
+            return 0, {}
+        for related, path in _cascade_paths(User):
+            live = related.all_objects.filter(**{f"{path}in": pks}, deleted__isnull=True)
+            related_pks = list(live.values_list("pk", flat=True))
+            _mark(related, related_pks, {"deleted": now, "deleted_by_cascade": True}, now)
+            if related_pks:
+                counts[related._meta.label] = len(related_pks)
+                bulk_soft_deleted.send(sender=related, pks=related_pks)
+        _mark(User, pks, {"deleted": now, "deleted_by_cascade": False}, now)
+        counts[User._meta.label] = len(pks)
+        bulk_soft_deleted.send(sender=User, pks=pks)
+    return sum(counts.values()), counts
+
+
+def restore_users(user_ids):
+    """
+    Restore the soft-deleted users in ``user_ids`` and the rows that were deleted by cascade.
+
+    Rows deleted on their own are left deleted, as safedelete's undelete does. Raises
+    IntegrityError if a live user has taken the email address in the meantime.
+    """
+    now = timezone.now()
+    counts = {}
+    with transaction.atomic():
+        pks = list(User.deleted_objects.filter(pk__in=list(user_ids)).values_list("pk", flat=True))
+        if not pks:
+            return 0, {}
+        _mark(User, pks, {"deleted": None, "deleted_by_cascade": False}, now)
+        counts[User._meta.label] = len(pks)
+        for related, path in _cascade_paths(User):
+            cascaded = related.all_objects.filter(**{f"{path}in": pks}, deleted_by_cascade=True)
+            related_pks = list(cascaded.values_list("pk", flat=True))
+            _mark(related, related_pks, {"deleted": None, "deleted_by_cascade": False}, now)
+            if related_pks:
+                counts[related._meta.label] = len(related_pks)
+                bulk_restored.send(sender=related, pks=related_pks)
+        bulk_restored.send(sender=User, pks=pks)
+    return sum(counts.values()), counts
@@ -4,6 +4,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
 from safedelete import SOFT_DELETE_CASCADE
 from safedelete.models import SafeDeleteModel
 
@@ -19,7 +20,19 @@ class Title(models.TextChoices):
     OTHER = "Other", _("Other")
 
 
+def split_name(name):
+    """Split a full name into ``(first_name, last_name)`` at the first space"""
+    name_parts = (name or "").split(" ", 1)
+    first_name = name_parts[0] or "User"
+    last_name = name_parts[1] if len(name_parts) > 1 else ""
+    return first_name, last_name
+
+
 class UserManager(BaseUserManager):
+    def get_by_natural_key(self, email):
+        # A soft-deleted user may share the address of the live one, see User.Meta.constraints
+        return self.get(**{self.model.USERNAME_FIELD: email, "deleted__isnull": True})
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError(_("The Email must be set"))
@@ -32,6 +45,44 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def resolve_many(self, applicants, phone_number="0000000000"):
+        """
+        Return an ``{email: user}`` map for ``(email, name)`` pairs, creating the missing users.
+
+        Existing users are fetched with one query and the missing ones inserted with one
+        ``bulk_create``, with unusable passwords and names split as in ``split_name``. The insert
+        uses ON CONFLICT DO NOTHING, so a concurrent batch creating the same address is not an
+        error: its users are picked up by the final lookup. Emails are normalized, and the first
+        name given for a repeated email wins. Only live users are returned, soft-deleted users'
+        addresses get new users.
+        """
+        names = {}
+        for email, name in applicants:
+            if not email:
+                raise ValueError(_("The Email must be set"))
+            names.setdefault(self.normalize_email(email), name)
+
+        users = {user.email: user for user in self.filter(email__in=list(names), deleted__isnull=True)}
+        missing = [email for email in names if email not in users]
+        if missing:
+            self.bulk_create(
+                [
+                    self.model(
+                        email=email,
+                        first_name=first_name,
+                        last_name=last_name,
+                        phone_number=phone_number,
+                        password=make_password(None),
+                        is_active=True,
+                    )
+                    for email in missing
+                    for first_name, last_name in [split_name(names[email])]
+                ],
+                ignore_conflicts=True,
+            )
+            users.update((user.email, user) for user in self.filter(email__in=missing, deleted__isnull=True))
+        return users
+
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault("is_staff", True)
         extra_fields.setdefault("is_superuser", True)
@@ -44,7 +95,8 @@ class User(SafeDeleteModel, AbstractUser, BaseModel):
     _safedelete_policy = SOFT_DELETE_CASCADE
 
     username = None
-    email = models.EmailField(unique=True)
+    # Unique among live users only, see Meta.constraints
+    email = models.EmailField(db_index=True)
 
     USERNAME_FIELD = "email"
     EMAIL_FIELD = "email"
@@ -67,5 +119,34 @@ class User(SafeDeleteModel, AbstractUser, BaseModel):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # A partial unique index: it also serves every "email = ... AND deleted IS NULL" lookup,
+            # and lets an address be registered again after its user was soft-deleted
+            models.UniqueConstraint(
+                fields=["email"], condition=models.Q(deleted__isnull=True), name="users_user_email_live_unique"
+            ),
+        ]
+
     def __str__(self):
         return self.email
+
+    def delete(self, force_policy=None, **kwargs):
+        """Soft-delete with users.deletion.soft_delete_users, unless another policy is forced"""
+        if force_policy not in (None, SOFT_DELETE_CASCADE):
+            return super().delete(force_policy=force_policy, **kwargs)
+        from users.deletion import soft_delete_users
+
+        result = soft_delete_users([self.pk])
+        self.refresh_from_db(fields=["deleted", "deleted_by_cascade"])
+        return result
+
+    def undelete(self, force_policy=None, **kwargs):
+        """Restore with users.deletion.restore_users, unless another policy is forced"""
+        if force_policy not in (None, SOFT_DELETE_CASCADE):
+            return super().undelete(force_policy=force_policy, **kwargs)
+        from users.deletion import restore_users
+
+        result = restore_users([self.pk])
+        self.refresh_from_db(fields=["deleted", "deleted_by_cascade"])
+        return result
@@ -1,2 +1,63 @@
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.hashers import is_password_usable
+from django.test import TestCase
+
+from users.models import User, split_name
+
+
+class SplitNameTest(TestCase):
+    def test_split_name(self):
+        self.assertEqual(split_name("Jane Ann Doe"), ("Jane", "Ann Doe"))
+        self.assertEqual(split_name("Madonna"), ("Madonna", ""))
+        self.assertEqual(split_name(""), ("User", ""))
+
+
+class ResolveManyTest(TestCase):
+    def setUp(self):
+        self.existing = User.objects.create_user(
+            email="existing@example.com", first_name="Old", last_name="Name", phone_number="0000000000"
+        )
+
+    def test_fetches_existing_and_creates_missing_in_three_queries(self):
+        applicants = [
+            ("existing@example.com", "Ignored Name"),
+            ("new@EXAMPLE.com", "Jane Doe"),
+            ("new@example.com", "Second Spelling"),
+            ("other@example.com", "Madonna"),
+        ]
+        with self.assertNumQueries(3):
+            users = User.objects.resolve_many(applicants)
+
+        self.assertEqual(set(users), {"existing@example.com", "new@example.com", "other@example.com"})
+        self.assertEqual(users["existing@example.com"], self.existing)
+        self.assertEqual(users["existing@example.com"].first_name, "Old")
+        self.assertEqual((users["new@example.com"].first_name, users["new@example.com"].last_name), ("Jane", "Doe"))
+        self.assertEqual(users["other@example.com"].last_name, "")
+        self.assertFalse(is_password_usable(users["new@example.com"].password))
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_all_existing_takes_one_query(self):
+        with self.assertNumQueries(1):
+            users = User.objects.resolve_many([("existing@example.com", "Old Name")])
+        self.assertEqual(users, {"existing@example.com": self.existing})
+
+    def test_conflicting_insert_is_not_an_error(self):
+        manager = User.objects
+        bulk_create = manager.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            # A concurrent batch inserts the address between the lookup and the insert
+            User.objects.create_user(email="race@example.com", first_name="Winner", phone_number="0")
+            return bulk_create(objs, **kwargs)
+
+        with patch.object(manager, "bulk_create", side_effect=racing_bulk_create):
+            users = User.objects.resolve_many([("race@example.com", "Loser Name"), ("calm@example.com", "Calm")])
+        self.assertEqual(users["race@example.com"].first_name, "Winner")
+        self.assertEqual(users["calm@example.com"].first_name, "Calm")
+        self.assertEqual(User.objects.filter(email="race@example.com").count(), 1)
+
+    def test_soft_deleted_users_are_not_resolved(self):
+        self.existing.delete()
+        users = User.objects.resolve_many([("existing@example.com", "New Person")])
+        self.assertNotEqual(users["existing@example.com"].pk, self.existing.pk)